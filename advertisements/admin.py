@@ -1,3 +1,18 @@
 from django.contrib import admin
+from .models import Advertisement, AdDailyStat
 
-# Register your models here.
+
+class AdDailyStatInline(admin.TabularInline):
+    model = AdDailyStat
+    extra = 0
+    readonly_fields = ['day', 'impressions', 'clicks', 'spend']
+    can_delete = False
+
+
+@admin.register(Advertisement)
+class AdvertisementAdmin(admin.ModelAdmin):
+    list_display = ['id', 'owner', 'property', 'budget', 'start_date', 'end_date', 'impressions', 'clicks', 'is_active']
+    list_filter = ['is_active', 'start_date']
+    readonly_fields = ['impressions', 'clicks', 'created_at']
+    raw_id_fields = ['owner', 'property']
+    inlines = [AdDailyStatInline]
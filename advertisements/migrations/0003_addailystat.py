@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisements', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('impressions', models.PositiveIntegerField(default=0, verbose_name='Показы')),
+                ('clicks', models.PositiveIntegerField(default=0, verbose_name='Клики')),
+                ('spend', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Расход')),
+                ('ad', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='advertisements.advertisement', verbose_name='Реклама')),
+            ],
+            options={
+                'verbose_name': 'Статистика рекламы за день',
+                'verbose_name_plural': 'Статистика рекламы по дням',
+                'ordering': ['day'],
+                'constraints': [models.UniqueConstraint(fields=('ad', 'day'), name='unique_ad_daily_stat')],
+            },
+        ),
+    ]
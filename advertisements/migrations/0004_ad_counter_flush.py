@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisements', '0003_addailystat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdCounterFlush',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('flush_id', models.CharField(max_length=32, unique=True, verbose_name='ID снимка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата переноса')),
+            ],
+            options={
+                'verbose_name': 'Перенос счетчиков рекламы',
+                'verbose_name_plural': 'Переносы счетчиков рекламы',
+            },
+        ),
+    ]
@@ -22,8 +22,70 @@ class Advertisement(models.Model):
     def __str__(self):
         return f"Реклама для {self.property.title if self.property else 'общей кампании'}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .serving import invalidate
+        invalidate()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        from .serving import invalidate
+        invalidate()
+        return result
+
     def ctr(self):
         """Click-through rate"""
         if self.impressions == 0:
             return 0
         return (self.clicks / self.impressions) * 100
+
+    def daily_budget(self):
+        """Бюджет, равномерно распределенный по дням кампании"""
+        from decimal import Decimal
+
+        days = max((self.end_date - self.start_date).days + 1, 1)
+        return (self.budget / days).quantize(Decimal('0.01'))
+
+
+class AdDailyStat(models.Model):
+    """
+    Показы, клики и расход объявления за день
+
+    Заполняется задачей flush_ad_counters вместе с итогами в Advertisement,
+    графики по дням читают этот небольшой набор строк.
+    """
+    ad = models.ForeignKey(Advertisement, on_delete=models.CASCADE, related_name='daily_stats', verbose_name='Реклама')
+    day = models.DateField(verbose_name='День')
+    impressions = models.PositiveIntegerField(default=0, verbose_name='Показы')
+    clicks = models.PositiveIntegerField(default=0, verbose_name='Клики')
+    spend = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name='Расход')
+
+    class Meta:
+        verbose_name = 'Статистика рекламы за день'
+        verbose_name_plural = 'Статистика рекламы по дням'
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(fields=['ad', 'day'], name='unique_ad_daily_stat'),
+        ]
+
+    def __str__(self):
+        return f"Реклама #{self.ad_id} за {self.day}"
+
+
+class AdCounterFlush(models.Model):
+    """
+    Снимок счетчиков показов/кликов, уже перенесенный в БД
+
+    Создается в той же транзакции, что и прирост. Если снимок не удалился
+    из Redis после коммита, следующий сброс найдет его flush_id здесь и
+    не начислит прирост второй раз. Хранится FLUSH_ID_RETENTION (tracking.py).
+    """
+    flush_id = models.CharField(max_length=32, unique=True, verbose_name='ID снимка')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата переноса')
+
+    class Meta:
+        verbose_name = 'Перенос счетчиков рекламы'
+        verbose_name_plural = 'Переносы счетчиков рекламы'
+
+    def __str__(self):
+        return self.flush_id
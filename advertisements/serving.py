@@ -0,0 +1,227 @@
+"""
+Выбор рекламы для показа (продвигаемые места в списке недвижимости)
+
+Каждый процесс держит в памяти снимок подходящих объявлений:
+активные, в датах кампании, с активной недвижимостью. Вместе со
+снимком хранятся готовые карточки недвижимости, поэтому выбор
+не делает запросов к БД.
+
+Снимок перечитывается, когда меняется версия в Redis
+(ads:serving:version - увеличивается при сохранении/удалении
+объявления), при смене дня и не реже раза в SNAPSHOT_TTL секунд.
+
+Объявление выбирается случайно с весом = дневной бюджет: префиксные
+суммы весов + bisect, O(log n). Пейсинг - в Redis, общий для всех
+процессов:
+
+    ads:served:<день>   - hash: ad_id -> показов за день, "_total" -> всего
+
+Объявление, получившее больше своей доли дневных показов
+(доля = вес / сумма весов), пропускается до конца дня.
+"""
+import random
+import threading
+import time
+from bisect import bisect_right
+from itertools import accumulate
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from redis.exceptions import RedisError
+
+from core.redis_client import get_redis
+from . import tracking
+
+
+VERSION_KEY = 'ads:serving:version'
+VERSION_CHECK_INTERVAL = 5
+SNAPSHOT_TTL = 300
+
+MAX_SLOTS = 3
+
+# Допуск пейсинга: доля показов может превышать долю бюджета на 20%
+# плюс PACING_SLACK показов (чтобы утром не отсекать все объявления)
+PACING_TOLERANCE = 1.2
+PACING_SLACK = 10
+SERVED_TTL = 2 * 24 * 3600
+
+
+class _Snapshot:
+    def __init__(self, ads, cards, day, version):
+        self.ads = ads  # [(ad_id, property_id, weight), ...]
+        self.cards = cards  # property_id -> карточка
+        self.cumulative = list(accumulate(weight for _, _, weight in ads))
+        self.total_weight = self.cumulative[-1] if self.cumulative else 0
+        self.day = day
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.checked_at = self.loaded_at
+
+    def pick_index(self):
+        return bisect_right(self.cumulative, random.random() * self.total_weight)
+
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+def served_key(day):
+    return f'ads:served:{day.isoformat()}'
+
+
+def invalidate():
+    """Объявления изменились - снимки во всех процессах перечитаются после коммита"""
+    def bump():
+        cache.delete(tracking.ACTIVE_IDS_CACHE_KEY)
+        try:
+            get_redis().incr(VERSION_KEY)
+        except RedisError as e:
+            print(f'Ad serving version error: {e}')
+
+    transaction.on_commit(bump)
+
+
+def _get_version():
+    try:
+        return get_redis().get(VERSION_KEY)
+    except RedisError as e:
+        print(f'Ad serving version error: {e}')
+        return None
+
+
+def _load(version):
+    from properties.models import PropertyImage
+    from properties.serializers import PropertyCardSerializer
+    from .models import Advertisement
+
+    today = timezone.localdate()
+    eligible = list(
+        Advertisement.objects.filter(
+            is_active=True,
+            start_date__lte=today,
+            end_date__gte=today,
+            property__status='active',
+            budget__gt=0,
+        ).select_related('property').prefetch_related(
+            Prefetch(
+                'property__images',
+                queryset=PropertyImage.objects.filter(is_cover=True),
+                to_attr='cover_images'
+            )
+        )
+    )
+
+    # Бюджет, округлившийся до 0, не участвует в выборе (вес 0)
+    eligible = [ad for ad in eligible if ad.daily_budget() > 0]
+    ads = [(ad.id, ad.property_id, float(ad.daily_budget())) for ad in eligible]
+    cards = {ad.property_id: PropertyCardSerializer(ad.property).data for ad in eligible}
+    return _Snapshot(ads, cards, today, version)
+
+
+def get_snapshot():
+    """Текущий снимок; перечитывается из БД только если он устарел"""
+    global _snapshot
+
+    snapshot = _snapshot
+    now = time.monotonic()
+    if snapshot is not None and snapshot.day == timezone.localdate() and now - snapshot.loaded_at < SNAPSHOT_TTL:
+        if now - snapshot.checked_at < VERSION_CHECK_INTERVAL:
+            return snapshot
+        version = _get_version()
+        snapshot.checked_at = now
+        if version == snapshot.version:
+            return snapshot
+
+    with _lock:
+        if _snapshot is snapshot:
+            _snapshot = _load(_get_version())
+        return _snapshot
+
+
+def pick(slots, snapshot=None):
+    """
+    Выбирает до `slots` разных объявлений и учитывает их показ
+
+    Returns:
+        [(ad_id, property_id), ...]
+    """
+    snapshot = snapshot or get_snapshot()
+    if not snapshot.ads or snapshot.total_weight <= 0 or slots <= 0:
+        return []
+
+    # Кандидаты с запасом: часть может отсеять пейсинг
+    candidates = []
+    seen = set()
+    for _ in range(slots * 4):
+        index = snapshot.pick_index()
+        if index not in seen:
+            seen.add(index)
+            candidates.append(snapshot.ads[index])
+        if len(seen) == len(snapshot.ads):
+            break
+
+    key = served_key(snapshot.day)
+    r = get_redis()
+    try:
+        counts = r.hmget(key, [ad_id for ad_id, _, _ in candidates] + ['_total'])
+    except RedisError as e:
+        print(f'Ad pacing error: {e}')
+        return [(ad_id, property_id) for ad_id, property_id, _ in candidates[:slots]]
+
+    total_served = int(counts[-1] or 0)
+    chosen = []
+    for (ad_id, property_id, weight), served in zip(candidates, counts):
+        allowed = weight / snapshot.total_weight * total_served * PACING_TOLERANCE + PACING_SLACK
+        # Одна недвижимость с несколькими кампаниями занимает одно место
+        if int(served or 0) <= allowed and property_id not in {p for _, p in chosen}:
+            chosen.append((ad_id, property_id))
+        if len(chosen) == slots:
+            break
+
+    if chosen:
+        try:
+            pipe = r.pipeline(transaction=False)
+            for ad_id, _ in chosen:
+                pipe.hincrby(key, ad_id, 1)
+            pipe.hincrby(key, '_total', len(chosen))
+            pipe.expire(key, SERVED_TTL)
+            pipe.execute()
+        except RedisError as e:
+            print(f'Ad pacing error: {e}')
+
+    for ad_id, _ in chosen:
+        tracking.record(ad_id, 'impressions')
+
+    return chosen
+
+
+def requested_slots(request):
+    """Количество продвигаемых мест из ?promoted=N (0 - не нужны)"""
+    try:
+        slots = int(request.query_params.get('promoted', 0))
+    except ValueError:
+        return 0
+    return min(max(slots, 0), MAX_SLOTS)
+
+
+def promoted_cards(request, slots):
+    """
+    Карточки для продвигаемых мест списка
+
+    Returns:
+        [{"ad_id": id, "property": карточка}, ...]
+    """
+    snapshot = get_snapshot()
+    result = []
+    for ad_id, property_id in pick(slots, snapshot):
+        card = dict(snapshot.cards[property_id])
+        if card.get('cover'):
+            card['cover'] = {
+                **card['cover'],
+                'image': request.build_absolute_uri(card['cover']['image']),
+                'thumb': request.build_absolute_uri(card['cover']['thumb']) if card['cover']['thumb'] else None,
+            }
+        result.append({'ad_id': ad_id, 'property': card})
+    return result
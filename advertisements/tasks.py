@@ -0,0 +1,18 @@
+from celery import shared_task
+from redis.exceptions import RedisError
+
+from . import tracking
+
+
+@shared_task
+def flush_ad_counters():
+    """
+    Переносит показы и клики из Redis в БД
+    Запускается каждые 10 секунд через Celery Beat
+    """
+    try:
+        updated_count = tracking.flush()
+    except RedisError as e:
+        print(f'Ad counters flush error: {e}')
+        return 'Redis недоступен'
+    return f"Обновлено объявлений: {updated_count}"
@@ -1,3 +1,11 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
+from django.utils import timezone
 
-# Create your tests here.
+from . import serving
+
+
+class PickTests(SimpleTestCase):
+    def test_zero_total_weight_picks_nothing(self):
+        snapshot = serving._Snapshot([(1, 10, 0.0), (2, 20, 0.0)], {}, timezone.localdate(), None)
+
+        self.assertEqual(serving.pick(2, snapshot), [])
@@ -0,0 +1,23 @@
+"""
+Ограничение частоты показов и кликов (публичные эндпоинты без авторизации)
+
+Ключ - пользователь (или IP для анонимных) + объявление + событие:
+один клиент не может накрутить счетчики конкретного объявления.
+Частота - REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']['ad_tracking'].
+"""
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class AdTrackingThrottle(SimpleRateThrottle):
+    scope = 'ad_tracking'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = self.get_ident(request)
+        event = request.resolver_match.url_name if request.resolver_match else ''
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': f"{ident}:{view.kwargs.get('ad_id')}:{event}",
+        }
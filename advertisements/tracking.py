@@ -0,0 +1,266 @@
+"""
+Счетчики показов и кликов рекламы
+
+Показы и клики не пишутся в Advertisement на каждый запрос (одна
+"горячая" строка сериализовала бы весь трафик). Вместо этого:
+
+    ads:counters                - hash: "<ad_id>:<день>:impressions" / ":clicks" -> прирост
+                                  с последнего сброса в БД
+    ad:<id>:hourly              - hash: "<начало часа unix>:impressions" / ":clicks" -> количество
+                                  за час (для CTR за последние сутки, живет HOURLY_TTL)
+
+Задача flush_ad_counters раз в 10 секунд (Celery Beat) переносит прирост
+в БД одним UPDATE ... SET impressions = impressions + N на объявление
+и в дневную статистику AdDailyStat.
+
+Перенос идемпотентен: снимок счетчиков получает flush_id, который
+записывается в AdCounterFlush в той же транзакции, что и прирост.
+"""
+import time
+import uuid
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from redis.exceptions import RedisError
+
+from core.redis_client import get_redis, redis_lock
+
+
+COUNTERS_KEY = 'ads:counters'
+# Снимок счетчиков, который сейчас переносится в БД
+FLUSHING_KEY = 'ads:counters:flushing'
+# Не даем двум сбросам обработать один снимок
+FLUSH_LOCK_KEY = 'ads:counters:lock'
+FLUSH_LOCK_TTL = 60
+# Служебные поля снимка: его id и число попыток переноса
+FLUSH_ID_FIELD = '_flush_id'
+ATTEMPTS_FIELD = '_attempts'
+# После стольких неудачных попыток снимок откладывается в FAILED_KEY_PREFIX<flush_id>,
+# чтобы он не блокировал перенос новых счетчиков
+MAX_FLUSH_ATTEMPTS = 5
+FAILED_KEY_PREFIX = 'ads:counters:failed:'
+FLUSH_ID_RETENTION = timedelta(days=1)
+
+# Счетчики -> снимок (если прошлый снимок не перенесен - берем его)
+# и id снимка одной атомарной операцией
+SNAPSHOT_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    if redis.call('EXISTS', KEYS[1]) == 0 then
+        return 0
+    end
+    redis.call('RENAME', KEYS[1], KEYS[2])
+end
+redis.call('HSETNX', KEYS[2], ARGV[1], ARGV[2])
+return 1
+"""
+
+HOURLY_TTL = 48 * 3600
+
+ACTIVE_IDS_CACHE_KEY = 'ads:active_ids'
+ACTIVE_IDS_CACHE_TTL = 60
+
+EVENTS = ('impressions', 'clicks')
+
+_snapshot_script = None
+
+
+def hourly_key(ad_id):
+    return f'ad:{ad_id}:hourly'
+
+
+def is_trackable(ad_id):
+    """Объявление существует и активно (список id кэшируется на минуту)"""
+    from .models import Advertisement
+
+    active_ids = cache.get(ACTIVE_IDS_CACHE_KEY)
+    if active_ids is None:
+        active_ids = set(Advertisement.objects.filter(is_active=True).values_list('id', flat=True))
+        cache.set(ACTIVE_IDS_CACHE_KEY, active_ids, ACTIVE_IDS_CACHE_TTL)
+    return ad_id in active_ids
+
+
+def record(ad_id, event, count=1):
+    """
+    Учитывает показ или клик
+
+    Args:
+        event: 'impressions' или 'clicks'
+
+    Returns:
+        bool - учтено ли событие (False, если Redis недоступен)
+    """
+    hour = int(time.time() // 3600 * 3600)
+    day = timezone.localdate().isoformat()
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.hincrby(COUNTERS_KEY, f'{ad_id}:{day}:{event}', count)
+        pipe.hincrby(hourly_key(ad_id), f'{hour}:{event}', count)
+        pipe.expire(hourly_key(ad_id), HOURLY_TTL)
+        pipe.execute()
+    except RedisError as e:
+        print(f'Ad counter error: {e}')
+        return False
+    return True
+
+
+def flush():
+    """
+    Переносит накопленные счетчики в БД
+
+    Хэш счетчиков атомарно переименовывается в снимок, новые события
+    копятся в новом хэше. Снимок удаляется только после коммита; если
+    сброс упал, снимок будет перенесен при следующем запуске, а если
+    упало только удаление - повторно не начислится (AdCounterFlush).
+
+    Returns:
+        int - количество обновленных объявлений
+    """
+    # Блокировка с токеном: сброс дольше FLUSH_LOCK_TTL не снимет чужую
+    with redis_lock(FLUSH_LOCK_KEY, FLUSH_LOCK_TTL) as acquired:
+        if not acquired:
+            return 0
+        return _flush(get_redis())
+
+
+def _flush(r):
+    from .models import AdCounterFlush
+
+    global _snapshot_script
+    if _snapshot_script is None:
+        _snapshot_script = r.register_script(SNAPSHOT_SCRIPT)
+    if not _snapshot_script(keys=[COUNTERS_KEY, FLUSHING_KEY], args=[FLUSH_ID_FIELD, uuid.uuid4().hex]):
+        # Нет ключа - нечего сбрасывать
+        return 0
+
+    attempts = r.hincrby(FLUSHING_KEY, ATTEMPTS_FIELD, 1)
+    snapshot = r.hgetall(FLUSHING_KEY)
+    flush_id = snapshot.pop(FLUSH_ID_FIELD)
+    snapshot.pop(ATTEMPTS_FIELD, None)
+
+    if attempts > MAX_FLUSH_ATTEMPTS:
+        r.rename(FLUSHING_KEY, FAILED_KEY_PREFIX + flush_id)
+        print(f'Ad counters snapshot {flush_id} failed {attempts - 1} times, moved to {FAILED_KEY_PREFIX}{flush_id}')
+        return 0
+
+    # (ad_id, день) -> {'impressions': n, 'clicks': n}
+    deltas = {}
+    for field, value in snapshot.items():
+        try:
+            ad_id, day, event = _parse_field(field)
+            count = int(value)
+        except ValueError:
+            print(f'Ad counters: skipped invalid field {field!r}={value!r}')
+            continue
+        if event in EVENTS and count:
+            counts = deltas.setdefault((ad_id, day), {})
+            counts[event] = counts.get(event, 0) + count
+
+    updated = 0
+    with transaction.atomic():
+        _, created = AdCounterFlush.objects.get_or_create(flush_id=flush_id)
+        # Иначе снимок уже перенесен - не удалось только удалить его из Redis
+        if created:
+            updated = _apply(deltas)
+        AdCounterFlush.objects.filter(created_at__lt=timezone.now() - FLUSH_ID_RETENTION).delete()
+
+    r.delete(FLUSHING_KEY)
+    return updated
+
+
+def _parse_field(field):
+    """
+    "<ad_id>:<день>:<event>" -> (ad_id, date, event)
+
+    Поля старого формата "<ad_id>:<event>" (до дневной статистики)
+    относятся к текущему дню.
+    """
+    parts = field.split(':')
+    if len(parts) == 2:
+        ad_id, event = parts
+        return int(ad_id), timezone.localdate(), event
+    if len(parts) == 3:
+        ad_id, day, event = parts
+        return int(ad_id), date.fromisoformat(day), event
+    raise ValueError(field)
+
+
+def _apply(deltas):
+    """Начисляет прирост в Advertisement и AdDailyStat; вызывать в транзакции"""
+    from .models import Advertisement, AdDailyStat
+
+    totals = {}
+    for (ad_id, _), counts in deltas.items():
+        for event, count in counts.items():
+            totals.setdefault(ad_id, dict.fromkeys(EVENTS, 0))[event] += count
+
+    ads = Advertisement.objects.in_bulk(list(totals))
+
+    for ad_id, counts in totals.items():
+        Advertisement.objects.filter(id=ad_id).update(**{
+            event: F(event) + count for event, count in counts.items()
+        })
+
+    for (ad_id, day), counts in deltas.items():
+        if ad_id not in ads:
+            continue
+        # Расход дня начисляется один раз - при первом показе за день
+        stat, created = AdDailyStat.objects.select_for_update().get_or_create(
+            ad_id=ad_id, day=day,
+            defaults={'spend': ads[ad_id].daily_budget()}
+        )
+        AdDailyStat.objects.filter(id=stat.id).update(**{
+            event: F(event) + count for event, count in counts.items()
+        })
+
+    return len(totals)
+
+
+def get_pending(ad_id):
+    """Прирост, еще не перенесенный в БД: {'impressions': n, 'clicks': n}"""
+    # Прирост копится максимум несколько секунд - хватает сегодня и вчера
+    today = timezone.localdate()
+    days = [today.isoformat(), (today - timedelta(days=1)).isoformat()]
+    fields = [f'{ad_id}:{day}:{event}' for event in EVENTS for day in days]
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.hmget(COUNTERS_KEY, fields)
+        pipe.hmget(FLUSHING_KEY, fields)
+        current, flushing = pipe.execute()
+    except RedisError as e:
+        print(f'Ad counter error: {e}')
+        return dict.fromkeys(EVENTS, 0)
+
+    pending = dict.fromkeys(EVENTS, 0)
+    for index, field in enumerate(fields):
+        event = field.rsplit(':', 1)[1]
+        pending[event] += int(current[index] or 0) + int(flushing[index] or 0)
+    return pending
+
+
+def get_hourly(ad_id, hours=24):
+    """
+    Показы, клики и CTR по часам за последние N часов
+
+    Returns:
+        [{"hour": unix, "impressions": n, "clicks": n, "ctr": float}, ...]
+    """
+    current_hour = int(time.time() // 3600 * 3600)
+    hour_keys = [current_hour - 3600 * i for i in range(hours - 1, -1, -1)]
+    fields = [f'{hour}:{event}' for hour in hour_keys for event in EVENTS]
+
+    values = get_redis().hmget(hourly_key(ad_id), fields)
+
+    result = []
+    for index, hour in enumerate(hour_keys):
+        impressions = int(values[index * 2] or 0)
+        clicks = int(values[index * 2 + 1] or 0)
+        result.append({
+            'hour': hour,
+            'impressions': impressions,
+            'clicks': clicks,
+            'ctr': (clicks / impressions * 100) if impressions > 0 else 0,
+        })
+    return result
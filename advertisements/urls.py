@@ -1,5 +1,8 @@
 from django.urls import path
-from .views import AdvertisementListCreateView, AdvertisementDetailView, activate_advertisement, advertisement_stats
+from .views import (
+    AdvertisementListCreateView, AdvertisementDetailView, activate_advertisement, advertisement_stats,
+    track_impression, track_click, advertisement_hourly_stats, advertisement_daily_stats
+)
 
 app_name = 'advertisements'
 
@@ -8,4 +11,8 @@ urlpatterns = [
     path('<int:pk>/', AdvertisementDetailView.as_view(), name='advertisement-detail'),
     path('<int:ad_id>/activate/', activate_advertisement, name='activate-advertisement'),
     path('stats/', advertisement_stats, name='advertisement-stats'),
+    path('stats/daily/', advertisement_daily_stats, name='advertisement-daily-stats'),
+    path('<int:ad_id>/impression/', track_impression, name='track-impression'),
+    path('<int:ad_id>/click/', track_click, name='track-click'),
+    path('<int:ad_id>/hourly/', advertisement_hourly_stats, name='advertisement-hourly-stats'),
 ]
\ No newline at end of file
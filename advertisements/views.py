@@ -1,12 +1,21 @@
 from rest_framework import generics, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, AllowAny
+from django.db.models import DecimalField, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import timedelta
+from decimal import Decimal
+from redis.exceptions import RedisError
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 
-from .models import Advertisement
+from .models import Advertisement, AdDailyStat
 from .serializers import AdvertisementSerializer
+from . import tracking
+from .throttling import AdTrackingThrottle
 
 
 class AdvertisementListCreateView(generics.ListCreateAPIView):
@@ -50,15 +59,121 @@ def activate_advertisement(request, ad_id):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def advertisement_stats(request):
-    ads = Advertisement.objects.filter(owner=request.user)
-    total_budget = sum(ad.budget for ad in ads)
-    total_impressions = sum(ad.impressions for ad in ads)
-    total_clicks = sum(ad.clicks for ad in ads)
-    avg_ctr = (total_clicks / total_impressions * 100) if total_impressions > 0 else 0
+    totals = Advertisement.objects.filter(owner=request.user).aggregate(
+        total_budget=Coalesce(Sum('budget'), Value(Decimal('0')), output_field=DecimalField()),
+        total_impressions=Coalesce(Sum('impressions'), 0),
+        total_clicks=Coalesce(Sum('clicks'), 0),
+    )
+    total_impressions = totals['total_impressions']
+    avg_ctr = (totals['total_clicks'] / total_impressions * 100) if total_impressions > 0 else 0
 
     return Response({
-        'total_budget': total_budget,
-        'total_impressions': total_impressions,
-        'total_clicks': total_clicks,
+        **totals,
         'average_ctr': avg_ctr,
     })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def advertisement_daily_stats(request):
+    """
+    Показы, клики и расход по дням
+    GET /api/ads/stats/daily/?ad=<id>&date_from=YYYY-MM-DD&date_to=YYYY-MM-DD
+
+    Без ad - сумма по всем объявлениям пользователя. По умолчанию - 30 дней.
+    """
+    try:
+        date_to = parse_date(request.query_params.get('date_to', '')) or timezone.localdate()
+        date_from = parse_date(request.query_params.get('date_from', '')) or date_to - timedelta(days=29)
+    except ValueError:
+        # Формат верный, но такой даты нет (2024-02-30)
+        return Response({'error': 'Неверная дата'}, status=status.HTTP_400_BAD_REQUEST)
+
+    stats = AdDailyStat.objects.filter(
+        ad__owner=request.user,
+        day__range=(date_from, date_to)
+    )
+    ad_id = request.query_params.get('ad')
+    if ad_id:
+        if not ad_id.isdigit():
+            return Response({'error': 'Неверный id рекламы'}, status=status.HTTP_400_BAD_REQUEST)
+        stats = stats.filter(ad_id=int(ad_id))
+
+    days = stats.values('day').annotate(
+        impressions=Sum('impressions'),
+        clicks=Sum('clicks'),
+        spend=Sum('spend'),
+    ).order_by('day')
+
+    return Response({
+        'date_from': date_from,
+        'date_to': date_to,
+        'days': [
+            {
+                **row,
+                'ctr': (row['clicks'] / row['impressions'] * 100) if row['impressions'] > 0 else 0,
+            }
+            for row in days
+        ],
+    })
+
+
+# ==================== ПОКАЗЫ И КЛИКИ ====================
+
+def _track(ad_id, event):
+    if not tracking.is_trackable(ad_id):
+        return Response({'error': 'Реклама не найдена'}, status=status.HTTP_404_NOT_FOUND)
+    tracking.record(ad_id, event)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@throttle_classes([AdTrackingThrottle])
+def track_impression(request, ad_id):
+    """Показ объявления (счетчик в Redis, в БД переносится задачей)"""
+    return _track(ad_id, 'impressions')
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@throttle_classes([AdTrackingThrottle])
+def track_click(request, ad_id):
+    """Клик по объявлению"""
+    return _track(ad_id, 'clicks')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def advertisement_hourly_stats(request, ad_id):
+    """
+    Показы, клики и CTR по часам за последние сутки
+    GET /api/ads/<id>/hourly/?hours=24
+    """
+    try:
+        ad = Advertisement.objects.get(id=ad_id, owner=request.user)
+    except Advertisement.DoesNotExist:
+        return Response({'error': 'Реклама не найдена'}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        hours = min(max(int(request.query_params.get('hours', 24)), 1), 48)
+    except ValueError:
+        hours = 24
+
+    try:
+        hourly = tracking.get_hourly(ad.id, hours)
+    except RedisError as e:
+        print(f'Ad hourly stats error: {e}')
+        return Response({'error': 'Статистика временно недоступна'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    # Итоги: БД + еще не перенесенный прирост
+    pending = tracking.get_pending(ad.id)
+    impressions = ad.impressions + pending['impressions']
+    clicks = ad.clicks + pending['clicks']
+
+    return Response({
+        'impressions': impressions,
+        'clicks': clicks,
+        'ctr': (clicks / impressions * 100) if impressions > 0 else 0,
+        'hourly': hourly,
+    })
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Auction, Bid, AuctionPayment, ManualPayment
+from .models import Auction, Bid, AuctionPayment, ClickTransaction, ManualPayment, TelegramOutbox
 
 
 class BidInline(admin.TabularInline):
@@ -21,12 +21,13 @@ class AuctionAdmin(admin.ModelAdmin):
     search_fields = ['property__title', 'organizer__full_name']
     readonly_fields = [
         'current_price', 'winner', 'winning_bid',
+        'highest_bid', 'bid_count', 'last_bid_at',
         'is_paid', 'created_at', 'updated_at'
     ]
     inlines = [BidInline]
     fieldsets = (
         ('Основная информация', {
-            'fields': ('property', 'organizer', 'start_price', 'current_price')
+            'fields': ('property', 'organizer', 'start_price', 'current_price', 'min_bid_increment')
         }),
         ('Условия окончания', {
             'fields': ('end_type', 'start_time', 'end_time', 'target_price')
@@ -34,6 +35,9 @@ class AuctionAdmin(admin.ModelAdmin):
         ('Статус и результаты', {
             'fields': ('status', 'is_paid', 'winner', 'winning_bid')
         }),
+        ('Ставки', {
+            'fields': ('highest_bid', 'bid_count', 'last_bid_at')
+        }),
         ('Даты', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
@@ -95,6 +99,14 @@ class AuctionPaymentAdmin(admin.ModelAdmin):
         )
 
 
+@admin.register(ClickTransaction)
+class ClickTransactionAdmin(admin.ModelAdmin):
+    list_display = ['id', 'click_trans_id', 'action', 'payment', 'created_at']
+    list_filter = ['action', 'created_at']
+    search_fields = ['click_trans_id', 'payment__merchant_trans_id']
+    readonly_fields = ['click_trans_id', 'action', 'payment', 'response', 'created_at']
+
+
 @admin.register(ManualPayment)
 class ManualPaymentAdmin(admin.ModelAdmin):
     list_display = [
@@ -170,3 +182,22 @@ class ManualPaymentAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related(
             'auction', 'auction__property', 'user'
         )
+
+
+@admin.register(TelegramOutbox)
+class TelegramOutboxAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'chat_id', 'payment', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['kind', 'status']
+    search_fields = ['chat_id', 'last_error']
+    readonly_fields = ['created_at', 'sent_at']
+    raw_id_fields = ['payment']
+    actions = ['retry_now']
+
+    def retry_now(self, request, queryset):
+        from django.utils import timezone
+
+        updated = queryset.exclude(status='sent').update(
+            status='pending', attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f'Поставлено в очередь повторно: {updated}')
+    retry_now.short_description = 'Отправить повторно'
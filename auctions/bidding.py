@@ -0,0 +1,123 @@
+"""
+Прием ставок на аукционе
+
+Вся проверка и запись ставки идут в одной транзакции под блокировкой
+строки аукциона (SELECT ... FOR UPDATE), поэтому параллельные участники
+не могут обе пройти проверку "ставка выше текущей цены" и затереть
+друг друга. Завершение по целевой цене решается в той же транзакции.
+Лучшая ставка, счетчик и время последней ставки пишутся в аукцион тем же UPDATE.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Auction, Bid
+from .leaderboard import record_bid
+from .realtime import bid_event, publish_on_commit, status_event
+
+
+class BidError(Exception):
+    """Ставка отклонена; message уходит клиенту"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def get_min_bid_amount(auction):
+    """Минимальная допустимая ставка с учетом шага"""
+    return auction.current_price + auction.min_bid_increment
+
+
+def place_bid(auction_id, user, amount):
+    """
+    Принимает ставку или бросает BidError
+
+    Returns:
+        (Bid, Auction) - созданная ставка и аукцион с обновленными полями
+    """
+    with transaction.atomic():
+        try:
+            auction = Auction.objects.select_for_update().get(id=auction_id)
+        except Auction.DoesNotExist:
+            raise BidError('Аукцион не найден', status_code=404)
+
+        # Аукцион перевели в Redis, пока мы ждали блокировку - ставка через БД
+        # разошлась бы с текущей ценой в Redis
+        from . import hot_bidding
+        if hot_bidding.is_enabled() and hot_bidding.is_hot(auction_id):
+            raise BidError('Аукцион перешел в быстрый режим, повторите ставку', status_code=409)
+
+        validate_bid(auction, user, amount)
+
+        bid = Bid.objects.create(
+            auction=auction,
+            bidder=user,
+            amount=amount
+        )
+
+        updates = {
+            'current_price': amount,
+            'highest_bid': bid,
+            'last_bid_at': bid.bid_time,
+            'updated_at': timezone.now(),
+        }
+
+        # Достигнута целевая цена - аукцион завершается этой же ставкой
+        if reaches_target_price(auction, amount):
+            updates.update(
+                status='completed',
+                winner=user,
+                winning_bid=bid,
+            )
+
+        Auction.objects.filter(pk=auction.pk).update(bid_count=F('bid_count') + 1, **updates)
+        for field, value in updates.items():
+            setattr(auction, field, value)
+        auction.bid_count += 1
+
+        publish_on_commit(auction.id, 'bid', bid_event(bid))
+        transaction.on_commit(lambda: record_bid(
+            auction.id, user.id, user.full_name, amount, bid.bid_time.timestamp()
+        ))
+        if auction.status == 'completed':
+            publish_on_commit(auction.id, 'status', status_event(auction))
+
+    return bid, auction
+
+
+def validate_bid(auction, user, amount):
+    """Проверки ставки; аукцион должен быть заблокирован вызывающим кодом"""
+    # Проверяем, что аукцион оплачен
+    if not auction.is_paid:
+        raise BidError('Аукцион еще не оплачен организатором')
+
+    # Проверяем статус аукциона
+    if auction.status not in ['active', 'scheduled']:
+        raise BidError(f'Нельзя делать ставки. Статус аукциона: {auction.get_status_display()}')
+
+    # Проверяем, что аукцион активен
+    if not auction.is_active():
+        raise BidError('Аукцион не активен')
+
+    # Проверяем, что это не организатор
+    if user.id == auction.organizer_id:
+        raise BidError('Организатор не может делать ставки на своем аукционе')
+
+    if amount <= auction.current_price:
+        raise BidError(f'Ставка должна быть выше текущей цены ({auction.current_price})')
+
+    min_amount = get_min_bid_amount(auction)
+    if amount < min_amount:
+        raise BidError(
+            f'Минимальная ставка: {min_amount} (шаг {auction.min_bid_increment})'
+        )
+
+
+def reaches_target_price(auction, amount):
+    return (
+        auction.end_type in ('price', 'both')
+        and auction.target_price is not None
+        and amount >= auction.target_price
+    )
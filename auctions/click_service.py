@@ -2,7 +2,8 @@ import hashlib
 import uuid
 from decimal import Decimal
 from django.conf import settings
-from .models import AuctionPayment
+from django.db import transaction
+from .models import AuctionPayment, ClickTransaction
 
 
 class ClickService:
@@ -23,6 +24,75 @@ class ClickService:
 
         return hashlib.md5(sign_string.encode('utf-8')).hexdigest()
 
+    @staticmethod
+    def _response(click_trans_id, merchant_trans_id, error, error_note, **extra):
+        return {
+            'click_trans_id': click_trans_id,
+            'merchant_trans_id': merchant_trans_id,
+            **extra,
+            'error': error,
+            'error_note': error_note,
+        }
+
+    @staticmethod
+    def _check_request(click_trans_id, service_id, merchant_trans_id, action,
+                       expected_action, sign_string):
+        """Проверки без обращения к БД; возвращает ответ с ошибкой или None"""
+        click_service_id = getattr(settings, 'CLICK_SERVICE_ID', '')
+        click_secret_key = getattr(settings, 'CLICK_SECRET_KEY', '')
+
+        # Проверяем service_id
+        if str(service_id) != str(click_service_id):
+            return ClickService._response(click_trans_id, merchant_trans_id, -5, 'Service ID is incorrect')
+
+        # Проверяем подпись
+        expected_sign = ClickService.verify_signature(
+            merchant_trans_id, service_id, click_secret_key, click_trans_id
+        )
+        if sign_string != expected_sign:
+            return ClickService._response(click_trans_id, merchant_trans_id, -1, 'Sign check failed')
+
+        # Проверяем действие (в form-urlencoded приходит строкой)
+        if str(action) != str(expected_action):
+            return ClickService._response(click_trans_id, merchant_trans_id, -3, 'Action not found')
+
+        return None
+
+    @staticmethod
+    def _process(click_trans_id, merchant_trans_id, action, payment_filter, handler):
+        """
+        Общая часть prepare/complete
+
+        Платеж блокируется (SELECT ... FOR UPDATE), поэтому повторные и
+        параллельные запросы по одному платежу выполняются по очереди.
+        Под блокировкой ищем уже обработанный запрос с тем же
+        click_trans_id и action - его ответ возвращается как есть.
+        """
+        with transaction.atomic():
+            payment = AuctionPayment.objects.select_for_update().select_related(
+                'auction'
+            ).filter(merchant_trans_id=merchant_trans_id, **payment_filter).first()
+            if payment is None:
+                return ClickService._response(
+                    click_trans_id, merchant_trans_id, -5, 'Transaction does not exist'
+                )
+
+            processed = ClickTransaction.objects.filter(
+                click_trans_id=str(click_trans_id), action=action
+            ).values_list('response', flat=True).first()
+            if processed is not None:
+                return processed
+
+            response = handler(payment)
+
+            ClickTransaction.objects.create(
+                click_trans_id=str(click_trans_id),
+                action=action,
+                payment=payment,
+                response=response,
+            )
+            return response
+
     @staticmethod
     def prepare(click_trans_id, service_id, click_paydoc_id, merchant_trans_id,
                 amount, action, sign_time, sign_string):
@@ -31,98 +101,36 @@ class ClickService:
         Это первый этап - проверка возможности платежа
         """
         try:
-            # Получаем настройки Click из Django settings
-            click_service_id = getattr(settings, 'CLICK_SERVICE_ID', '')
-            click_secret_key = getattr(settings, 'CLICK_SECRET_KEY', '')
-
-            # Проверяем service_id
-            if str(service_id) != str(click_service_id):
-                return {
-                    'click_trans_id': click_trans_id,
-                    'merchant_trans_id': merchant_trans_id,
-                    'error': -5,
-                    'error_note': 'Service ID is incorrect'
-                }
-
-            # Проверяем подпись
-            expected_sign = ClickService.verify_signature(
-                merchant_trans_id, service_id, click_secret_key, click_trans_id
+            error = ClickService._check_request(
+                click_trans_id, service_id, merchant_trans_id, action, 0, sign_string
             )
-            if sign_string != expected_sign:
-                return {
-                    'click_trans_id': click_trans_id,
-                    'merchant_trans_id': merchant_trans_id,
-                    'error': -1,
-                    'error_note': 'Sign check failed'
-                }
-
-            # Проверяем действие
-            if action != 0:
-                return {
-                    'click_trans_id': click_trans_id,
-                    'merchant_trans_id': merchant_trans_id,
-                    'error': -3,
-                    'error_note': 'Action not found'
-                }
-
-            # Ищем платеж
-            try:
-                payment = AuctionPayment.objects.get(merchant_trans_id=merchant_trans_id)
-            except AuctionPayment.DoesNotExist:
-                return {
-                    'click_trans_id': click_trans_id,
-                    'merchant_trans_id': merchant_trans_id,
-                    'error': -5,
-                    'error_note': 'Transaction does not exist'
-                }
-
-            # Проверяем статус платежа
-            if payment.status == 'completed':
-                return {
-                    'click_trans_id': click_trans_id,
-                    'merchant_trans_id': merchant_trans_id,
-                    'error': -4,
-                    'error_note': 'Already paid'
-                }
-
-            if payment.status == 'cancelled':
-                return {
-                    'click_trans_id': click_trans_id,
-                    'merchant_trans_id': merchant_trans_id,
-                    'error': -9,
-                    'error_note': 'Transaction cancelled'
-                }
-
-            # Проверяем сумму
-            if Decimal(str(amount)) != payment.amount:
-                return {
-                    'click_trans_id': click_trans_id,
-                    'merchant_trans_id': merchant_trans_id,
-                    'error': -2,
-                    'error_note': 'Incorrect amount'
-                }
-
-            # Обновляем статус на processing
-            payment.click_trans_id = click_trans_id
-            payment.click_paydoc_id = click_paydoc_id
-            payment.status = 'processing'
-            payment.save()
-
-            return {
-                'click_trans_id': click_trans_id,
-                'merchant_trans_id': merchant_trans_id,
-                'merchant_prepare_id': payment.id,
-                'error': 0,
-                'error_note': 'Success'
-            }
+            if error:
+                return error
+
+            def handle(payment):
+                # Проверяем статус платежа
+                if payment.status == 'completed':
+                    return ClickService._response(click_trans_id, merchant_trans_id, -4, 'Already paid')
+
+                if payment.status == 'cancelled':
+                    return ClickService._response(click_trans_id, merchant_trans_id, -9, 'Transaction cancelled')
+
+                # Проверяем сумму
+                if Decimal(str(amount)) != payment.amount:
+                    return ClickService._response(click_trans_id, merchant_trans_id, -2, 'Incorrect amount')
+
+                # Обновляем статус на processing
+                payment.mark_processing(click_trans_id, click_paydoc_id)
+
+                return ClickService._response(
+                    click_trans_id, merchant_trans_id, 0, 'Success',
+                    merchant_prepare_id=payment.id
+                )
+
+            return ClickService._process(click_trans_id, merchant_trans_id, 0, {}, handle)
 
         except Exception as e:
-            return {
-                'click_trans_id': click_trans_id,
-                'merchant_trans_id': merchant_trans_id,
-                'error': -8,
-                'error_note': f'Error: {str(e)}'
-            }
+            return ClickService._response(click_trans_id, merchant_trans_id, -8, f'Error: {str(e)}')
 
     @staticmethod
     def complete(click_trans_id, service_id, click_paydoc_id, merchant_trans_id,
@@ -132,106 +140,44 @@ class ClickService:
         Это второй этап - подтверждение платежа
         """
         try:
-            # Получаем настройки Click из Django settings
-            click_service_id = getattr(settings, 'CLICK_SERVICE_ID', '')
-            click_secret_key = getattr(settings, 'CLICK_SECRET_KEY', '')
-
-            # Проверяем service_id
-            if str(service_id) != str(click_service_id):
-                return {
-                    'click_trans_id': click_trans_id,
-                    'merchant_trans_id': merchant_trans_id,
-                    'error': -5,
-                    'error_note': 'Service ID is incorrect'
-                }
-
-            # Проверяем подпись
-            expected_sign = ClickService.verify_signature(
-                merchant_trans_id, service_id, click_secret_key, click_trans_id
+            check_error = ClickService._check_request(
+                click_trans_id, service_id, merchant_trans_id, action, 1, sign_string
             )
-            if sign_string != expected_sign:
-                return {
-                    'click_trans_id': click_trans_id,
-                    'merchant_trans_id': merchant_trans_id,
-                    'error': -1,
-                    'error_note': 'Sign check failed'
-                }
-
-            # Проверяем действие
-            if action != 1:
-                return {
-                    'click_trans_id': click_trans_id,
-                    'merchant_trans_id': merchant_trans_id,
-                    'error': -3,
-                    'error_note': 'Action not found'
-                }
-
-            # Ищем платеж
-            try:
-                payment = AuctionPayment.objects.get(
-                    merchant_trans_id=merchant_trans_id,
-                    id=merchant_prepare_id
+            if check_error:
+                return check_error
+
+            def handle(payment):
+                # Проверяем статус платежа
+                if payment.status == 'completed':
+                    return ClickService._response(
+                        click_trans_id, merchant_trans_id, 0, 'Already confirmed',
+                        merchant_confirm_id=payment.id
+                    )
+
+                if payment.status == 'cancelled':
+                    return ClickService._response(click_trans_id, merchant_trans_id, -9, 'Transaction cancelled')
+
+                # Проверяем сумму
+                if Decimal(str(amount)) != payment.amount:
+                    return ClickService._response(click_trans_id, merchant_trans_id, -2, 'Incorrect amount')
+
+                # Проверяем ошибку от Click
+                if int(error) < 0:
+                    if payment.can_transition('failed'):
+                        payment.mark_failed(f'Click error: {error}')
+                    return ClickService._response(click_trans_id, merchant_trans_id, -6, 'Transaction cancelled')
+
+                # Завершаем платеж
+                payment.mark_completed()
+
+                return ClickService._response(
+                    click_trans_id, merchant_trans_id, 0, 'Success',
+                    merchant_confirm_id=payment.id
                 )
-            except AuctionPayment.DoesNotExist:
-                return {
-                    'click_trans_id': click_trans_id,
-                    'merchant_trans_id': merchant_trans_id,
-                    'error': -5,
-                    'error_note': 'Transaction does not exist'
-                }
-
-            # Проверяем статус платежа
-            if payment.status == 'completed':
-                return {
-                    'click_trans_id': click_trans_id,
-                    'merchant_trans_id': merchant_trans_id,
-                    'merchant_confirm_id': payment.id,
-                    'error': 0,
-                    'error_note': 'Already confirmed'
-                }
-
-            if payment.status == 'cancelled':
-                return {
-                    'click_trans_id': click_trans_id,
-                    'merchant_trans_id': merchant_trans_id,
-                    'error': -9,
-                    'error_note': 'Transaction cancelled'
-                }
-
-            # Проверяем сумму
-            if Decimal(str(amount)) != payment.amount:
-                return {
-                    'click_trans_id': click_trans_id,
-                    'merchant_trans_id': merchant_trans_id,
-                    'error': -2,
-                    'error_note': 'Incorrect amount'
-                }
-
-            # Проверяем ошибку от Click
-            if error < 0:
-                payment.mark_failed(f'Click error: {error}')
-                return {
-                    'click_trans_id': click_trans_id,
-                    'merchant_trans_id': merchant_trans_id,
-                    'error': -6,
-                    'error_note': 'Transaction cancelled'
-                }
-
-            # Завершаем платеж
-            payment.mark_completed()
-
-            return {
-                'click_trans_id': click_trans_id,
-                'merchant_trans_id': merchant_trans_id,
-                'merchant_confirm_id': payment.id,
-                'error': 0,
-                'error_note': 'Success'
-            }
+
+            return ClickService._process(
+                click_trans_id, merchant_trans_id, 1, {'id': merchant_prepare_id}, handle
+            )
 
         except Exception as e:
-            return {
-                'click_trans_id': click_trans_id,
-                'merchant_trans_id': merchant_trans_id,
-                'error': -8,
-                'error_note': f'Error: {str(e)}'
-            }
+            return ClickService._response(click_trans_id, merchant_trans_id, -8, f'Error: {str(e)}')
@@ -0,0 +1,369 @@
+"""
+Быстрый режим ставок для "горячих" аукционов (последние минуты)
+
+Обычная ставка - это несколько запросов в PostgreSQL под блокировкой строки.
+Когда до конца аукциона остается AUCTION_HOT_PATH_WINDOW секунд, задача
+warm_hot_auctions переносит состояние аукциона в Redis:
+
+    auction:<id>:state   - hash: текущая цена, шаг, цель, время окончания
+    auction:<id>:bids    - stream принятых ставок
+    auctions:hot         - set id горячих аукционов
+
+Ставка проверяется и записывается одним Lua-скриптом (атомарно в Redis),
+а задача persist_hot_bids пачками переносит поток в таблицу Bid.
+Суммы в Redis хранятся в тийинах (целое число), чтобы не терять копейки.
+
+Режим включается настройкой AUCTION_HOT_PATH_ENABLED.
+"""
+import time
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from redis.exceptions import ResponseError
+
+from core.redis_client import get_redis, redis_lock
+from .bidding import BidError
+from .leaderboard import record_bid
+from .realtime import publish_auction_events
+
+
+HOT_SET_KEY = 'auctions:hot'
+CONSUMER_GROUP = 'persist'
+CONSUMER_NAME = 'worker'
+# Перенос ставок аукциона в БД - не больше одного воркера одновременно
+PERSIST_LOCK_TTL = 60
+
+PLACE_BID_SCRIPT = """
+local state = KEYS[1]
+local stream = KEYS[2]
+local amount = tonumber(ARGV[1])
+local bidder = ARGV[2]
+local now = tonumber(ARGV[3])
+
+if redis.call('EXISTS', state) == 0 then
+    return {'not_hot'}
+end
+
+local s = redis.call('HMGET', state, 'status', 'current_price', 'min_increment', 'end_ts', 'target', 'organizer_id')
+if s[1] ~= 'active' then
+    return {'inactive'}
+end
+if s[6] == bidder then
+    return {'organizer'}
+end
+
+local end_ts = tonumber(s[4])
+if end_ts and end_ts > 0 and now > end_ts then
+    return {'inactive'}
+end
+
+local current = tonumber(s[2])
+if amount <= current then
+    return {'too_low', s[2]}
+end
+local min_amount = current + tonumber(s[3])
+if amount < min_amount then
+    return {'increment', string.format('%d', min_amount)}
+end
+
+local final = '0'
+local target = tonumber(s[5])
+if target and amount >= target then
+    final = '1'
+    redis.call('HSET', state, 'status', 'completed')
+end
+redis.call('HSET', state, 'current_price', ARGV[1])
+
+local id = redis.call('XADD', stream, '*', 'amount', ARGV[1], 'bidder', bidder, 'ts', ARGV[3], 'final', final)
+return {'ok', id, final}
+"""
+
+_place_bid_script = None
+
+
+def is_enabled():
+    return getattr(settings, 'AUCTION_HOT_PATH_ENABLED', False)
+
+
+def get_window_seconds():
+    return getattr(settings, 'AUCTION_HOT_PATH_WINDOW', 300)
+
+
+def state_key(auction_id):
+    return f'auction:{auction_id}:state'
+
+
+def stream_key(auction_id):
+    return f'auction:{auction_id}:bids'
+
+
+def persist_lock_key(auction_id):
+    return f'auction:{auction_id}:persist_lock'
+
+
+def to_cents(amount):
+    return int((Decimal(amount) * 100).to_integral_value())
+
+
+def from_cents(value):
+    return (Decimal(int(value)) / 100).quantize(Decimal('0.01'))
+
+
+def is_hot(auction_id):
+    return bool(get_redis().exists(state_key(auction_id)))
+
+
+def warm_up(auction):
+    """
+    Переносит состояние аукциона в Redis
+
+    Вызывать под блокировкой строки аукциона (select_for_update),
+    чтобы параллельная ставка через PostgreSQL не потерялась.
+    """
+    r = get_redis()
+    end_ts = auction.end_time.timestamp() if auction.end_time else 0
+    reaches_target_enabled = (
+        auction.end_type in ('price', 'both') and auction.target_price is not None
+    )
+
+    pipe = r.pipeline()
+    pipe.hset(state_key(auction.id), mapping={
+        'status': 'active',
+        'current_price': to_cents(auction.current_price),
+        'min_increment': to_cents(auction.min_bid_increment),
+        'end_ts': end_ts,
+        'target': to_cents(auction.target_price) if reaches_target_enabled else '',
+        'organizer_id': auction.organizer_id,
+    })
+    pipe.sadd(HOT_SET_KEY, auction.id)
+    pipe.execute()
+
+    try:
+        r.xgroup_create(stream_key(auction.id), CONSUMER_GROUP, id='0', mkstream=True)
+    except ResponseError as e:
+        if 'BUSYGROUP' not in str(e):
+            raise
+
+
+def retire(auction_id):
+    """Удаляет состояние аукциона из Redis (после переноса всех ставок)"""
+    r = get_redis()
+    pipe = r.pipeline()
+    pipe.delete(state_key(auction_id), stream_key(auction_id))
+    pipe.srem(HOT_SET_KEY, auction_id)
+    pipe.execute()
+
+
+def get_current_price(auction_id):
+    value = get_redis().hget(state_key(auction_id), 'current_price')
+    return from_cents(value) if value is not None else None
+
+
+def place_bid(auction_id, user, amount):
+    """
+    Ставка через Redis
+
+    Returns:
+        None - аукцион не горячий, нужно идти обычным путем (bidding.place_bid)
+        dict - ставка принята и поставлена в очередь на запись в БД
+    Raises:
+        BidError - ставка отклонена
+    """
+    global _place_bid_script
+    if _place_bid_script is None:
+        _place_bid_script = get_redis().register_script(PLACE_BID_SCRIPT)
+
+    now = time.time()
+    result = _place_bid_script(
+        keys=[state_key(auction_id), stream_key(auction_id)],
+        args=[to_cents(amount), user.id, now],
+    )
+
+    code = result[0]
+    if code == 'not_hot':
+        return None
+    if code == 'inactive':
+        raise BidError('Аукцион не активен')
+    if code == 'organizer':
+        raise BidError('Организатор не может делать ставки на своем аукционе')
+    if code == 'too_low':
+        raise BidError(f'Ставка должна быть выше текущей цены ({from_cents(result[1])})')
+    if code == 'increment':
+        raise BidError(f'Минимальная ставка: {from_cents(result[1])}')
+
+    bid_time = datetime.fromtimestamp(now, tz=dt_timezone.utc).isoformat()
+    completed = result[2] == '1'
+
+    events = [(auction_id, 'bid', {
+        'amount': str(amount),
+        'current_price': str(amount),
+        'bidder_name': user.full_name,
+        'bid_time': bid_time,
+    })]
+    if completed:
+        events.append((auction_id, 'status', {
+            'status': 'completed',
+            'current_price': str(amount),
+            'winner_name': user.full_name,
+        }))
+    publish_auction_events(events)
+    record_bid(auction_id, user.id, user.full_name, amount, now)
+
+    return {
+        'id': None,
+        'bidder': user.id,
+        'bidder_name': user.full_name,
+        'amount': str(amount),
+        'bid_time': bid_time,
+        'stream_id': result[1],
+        'auction_completed': completed,
+        'queued': True,
+    }
+
+
+def persist_bids(auction_id, batch_size=500):
+    """
+    Переносит принятые ставки из потока Redis в таблицу Bid пачками
+
+    Все воркеры читают поток одним consumer, поэтому перенос идет под
+    блокировкой аукциона: иначе запуск, наложившийся на предыдущий,
+    перечитал бы его еще не подтвержденные сообщения.
+
+    Returns:
+        int - сколько ставок перенесено (0, если перенос уже идет)
+    """
+    with redis_lock(persist_lock_key(auction_id), PERSIST_LOCK_TTL) as acquired:
+        if not acquired:
+            return 0
+        return _persist_bids(auction_id, batch_size)
+
+
+def _persist_bids(auction_id, batch_size=500):
+    """
+    Сначала дочитываются сообщения, которые были выданы, но не подтверждены
+    (воркер упал между записью и XACK), затем новые. Уже записанные
+    ставки определяются по сумме (уникальна в аукционе).
+    """
+    from .models import Auction, Bid
+
+    r = get_redis()
+    key = stream_key(auction_id)
+    persisted = 0
+
+    for start_id in ('0', '>'):
+        while True:
+            response = r.xreadgroup(
+                CONSUMER_GROUP, CONSUMER_NAME, {key: start_id}, count=batch_size
+            )
+            received = response[0][1] if response else []
+            if not received:
+                break
+
+            # Сообщение удалено (XDEL) после выдачи - в PEL остался только id
+            deleted_ids = [message_id for message_id, fields in received if not fields]
+            if deleted_ids:
+                r.xack(key, CONSUMER_GROUP, *deleted_ids)
+            messages = [(message_id, fields) for message_id, fields in received if fields]
+            if not messages:
+                if start_id == '0' and len(received) < batch_size:
+                    break
+                continue
+
+            bids = [
+                Bid(
+                    auction_id=auction_id,
+                    bidder_id=int(fields['bidder']),
+                    amount=from_cents(fields['amount']),
+                    # Время приема ставки скриптом, а не время переноса в БД
+                    bid_time=datetime.fromtimestamp(float(fields['ts']), tz=dt_timezone.utc),
+                )
+                for _, fields in messages
+            ]
+            final = next((fields for _, fields in messages if fields.get('final') == '1'), None)
+
+            with transaction.atomic():
+                # Сообщения, записанные до падения воркера (до XACK), повторно не пишем;
+                # суммы ставок в аукционе уникальны, т.к. каждая выше предыдущей
+                existing = set(
+                    Bid.objects.filter(
+                        auction_id=auction_id, amount__in=[bid.amount for bid in bids]
+                    ).values_list('amount', flat=True)
+                )
+                bids = Bid.objects.bulk_create(
+                    [bid for bid in bids if bid.amount not in existing]
+                )
+
+                if bids:
+                    top_bid = max(bids, key=lambda bid: bid.amount)
+                    Auction.objects.filter(pk=auction_id).update(
+                        bid_count=F('bid_count') + len(bids),
+                        last_bid_at=max(bid.bid_time for bid in bids),
+                        updated_at=timezone.now(),
+                    )
+                    Auction.objects.filter(
+                        pk=auction_id,
+                        current_price__lt=top_bid.amount
+                    ).update(current_price=top_bid.amount, highest_bid=top_bid)
+
+                # Ставка достигла целевой цены - завершаем аукцион
+                if final:
+                    winning_bid = Bid.objects.get(
+                        auction_id=auction_id,
+                        amount=from_cents(final['amount']),
+                    )
+                    Auction.objects.filter(pk=auction_id, status='active').update(
+                        status='completed',
+                        winner_id=winning_bid.bidder_id,
+                        winning_bid=winning_bid,
+                        current_price=winning_bid.amount,
+                        updated_at=timezone.now(),
+                    )
+
+            r.xack(key, CONSUMER_GROUP, *[message_id for message_id, _ in messages])
+            r.xdel(key, *[message_id for message_id, _ in messages])
+            persisted += len(messages)
+
+            if start_id == '0' and len(received) < batch_size:
+                break
+
+    return persisted
+
+
+def finish_if_over(auction_id):
+    """
+    Завершает горячий аукцион, если он закончился по цене или по времени,
+    и убирает его из Redis. Вызывать после persist_bids.
+
+    Returns:
+        bool - аукцион снят с горячего режима
+    """
+    from .models import Auction
+
+    state = get_redis().hgetall(state_key(auction_id))
+    if not state:
+        return True
+
+    end_ts = float(state.get('end_ts') or 0)
+    time_is_over = end_ts and time.time() > end_ts
+    if state.get('status') == 'active' and not time_is_over:
+        return False
+
+    with redis_lock(persist_lock_key(auction_id), PERSIST_LOCK_TTL) as acquired:
+        if not acquired:
+            # Ставки переносит другой воркер - завершим при следующем запуске
+            return False
+
+        # Дочитываем ставки, пришедшие между последним чтением и проверкой
+        _persist_bids(auction_id)
+
+        with transaction.atomic():
+            auction = Auction.objects.select_for_update().get(id=auction_id)
+            if auction.status == 'active':
+                auction.determine_winner()
+
+        retire(auction_id)
+    return True
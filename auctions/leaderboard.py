@@ -0,0 +1,153 @@
+"""
+Рейтинг участников и статистика ставок аукциона в Redis
+
+При каждой принятой ставке обновляются:
+
+    auction:<id>:leaderboard  - sorted set: участник -> его лучшая ставка (ZADD GT)
+    auction:<id>:bidders      - hash: участник -> имя для вывода
+    auction:<id>:per_minute   - hash: начало минуты (unix) -> количество ставок
+
+"Топ N", "мое место" и "ставок в минуту" читаются из Redis без
+сканирования таблицы Bid. Если ключи потеряны, rebuild() собирает их
+заново из БД (команда rebuild_leaderboards).
+"""
+import time
+from decimal import Decimal
+
+from django.db.models import Count, Max
+from django.db.models.functions import TruncMinute
+from redis.exceptions import RedisError
+
+from core.redis_client import get_redis
+
+
+# Ключи живут неделю после последней ставки
+KEY_TTL = 7 * 24 * 3600
+
+
+def leaderboard_key(auction_id):
+    return f'auction:{auction_id}:leaderboard'
+
+
+def bidders_key(auction_id):
+    return f'auction:{auction_id}:bidders'
+
+
+def per_minute_key(auction_id):
+    return f'auction:{auction_id}:per_minute'
+
+
+def _keys(auction_id):
+    return [leaderboard_key(auction_id), bidders_key(auction_id), per_minute_key(auction_id)]
+
+
+def record_bid(auction_id, bidder_id, bidder_name, amount, timestamp=None):
+    """Учитывает принятую ставку; ошибки Redis не ломают прием ставки"""
+    timestamp = timestamp or time.time()
+    minute = int(timestamp // 60 * 60)
+
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.zadd(leaderboard_key(auction_id), {bidder_id: float(amount)}, gt=True)
+        pipe.hset(bidders_key(auction_id), bidder_id, bidder_name)
+        pipe.hincrby(per_minute_key(auction_id), minute, 1)
+        for key in _keys(auction_id):
+            pipe.expire(key, KEY_TTL)
+        pipe.execute()
+    except RedisError as e:
+        print(f'Leaderboard update error: {e}')
+
+
+def rebuild(auction_id):
+    """
+    Пересобирает рейтинг и поминутную статистику из таблицы Bid
+
+    Returns:
+        int - количество участников
+    """
+    from .models import Bid
+
+    bids = Bid.objects.filter(auction_id=auction_id).order_by()
+    best = list(
+        bids.values('bidder_id', 'bidder__full_name').annotate(best=Max('amount'))
+    )
+    per_minute = list(
+        bids.annotate(minute=TruncMinute('bid_time')).values('minute').annotate(total=Count('id'))
+    )
+
+    pipe = get_redis().pipeline()
+    pipe.delete(*_keys(auction_id))
+    if best:
+        pipe.zadd(leaderboard_key(auction_id), {row['bidder_id']: float(row['best']) for row in best})
+        pipe.hset(bidders_key(auction_id), mapping={
+            row['bidder_id']: row['bidder__full_name'] for row in best
+        })
+        pipe.hset(per_minute_key(auction_id), mapping={
+            int(row['minute'].timestamp()): row['total'] for row in per_minute
+        })
+        for key in _keys(auction_id):
+            pipe.expire(key, KEY_TTL)
+    pipe.execute()
+
+    return len(best)
+
+
+def is_built(auction_id):
+    return bool(get_redis().exists(leaderboard_key(auction_id)))
+
+
+def get_leaderboard(auction_id, limit=10, user_id=None, minutes=30):
+    """
+    Returns:
+        {
+            "top": [{"rank", "bidder", "bidder_name", "amount"}, ...],
+            "me": {"rank", "amount"} или None,
+            "participants": int,
+            "bids_per_minute": [{"minute": unix, "count": n}, ...]  # последние N минут
+        }
+    """
+    r = get_redis()
+    lb_key = leaderboard_key(auction_id)
+
+    pipe = r.pipeline(transaction=False)
+    pipe.zrevrange(lb_key, 0, limit - 1, withscores=True)
+    pipe.zcard(lb_key)
+    if user_id is not None:
+        pipe.zrevrank(lb_key, user_id)
+        pipe.zscore(lb_key, user_id)
+    results = pipe.execute()
+
+    top_rows, participants = results[0], results[1]
+    names = r.hmget(bidders_key(auction_id), [bidder_id for bidder_id, _ in top_rows]) if top_rows else []
+
+    top = [
+        {
+            'rank': index + 1,
+            'bidder': int(bidder_id),
+            'bidder_name': name,
+            'amount': _amount(score),
+        }
+        for index, ((bidder_id, score), name) in enumerate(zip(top_rows, names))
+    ]
+
+    me = None
+    if user_id is not None and results[2] is not None:
+        me = {'rank': results[2] + 1, 'amount': _amount(results[3])}
+
+    current_minute = int(time.time() // 60 * 60)
+    minute_keys = [current_minute - 60 * i for i in range(minutes - 1, -1, -1)]
+    counts = r.hmget(per_minute_key(auction_id), minute_keys)
+
+    return {
+        'top': top,
+        'me': me,
+        'participants': participants,
+        'bids_per_minute': [
+            {'minute': minute, 'count': int(count or 0)}
+            for minute, count in zip(minute_keys, counts)
+        ],
+    }
+
+
+def _amount(score):
+    return str(Decimal(str(score)).quantize(Decimal('0.01')))
@@ -0,0 +1,40 @@
+"""
+Management команда для пересборки рейтингов аукционов в Redis
+из таблицы Bid (после сброса Redis или для старых аукционов)
+"""
+from django.core.management.base import BaseCommand
+from auctions.leaderboard import rebuild
+from auctions.models import Auction
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает рейтинг участников и поминутную статистику ставок в Redis'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--auction',
+            type=int,
+            action='append',
+            help='ID аукциона (можно указать несколько раз)',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Все аукционы со ставками, а не только активные',
+        )
+
+    def handle(self, *args, **options):
+        auctions = Auction.objects.filter(bid_count__gt=0)
+        if options['auction']:
+            auctions = Auction.objects.filter(id__in=options['auction'])
+        elif not options['all']:
+            auctions = auctions.filter(status='active')
+
+        auction_ids = list(auctions.values_list('id', flat=True))
+        self.stdout.write(f'🏆 Аукционов к пересборке: {len(auction_ids)}')
+
+        for auction_id in auction_ids:
+            participants = rebuild(auction_id)
+            self.stdout.write(f'  Аукцион #{auction_id}: участников {participants}')
+
+        self.stdout.write(self.style.SUCCESS('✅ Готово'))
@@ -0,0 +1,177 @@
+"""
+Management команда: нагрузочный тест обработки запросов Click
+
+Создает временный аукцион с платежом и параллельно отправляет
+в ClickService повторяющиеся prepare/complete (как при ретраях Click)
+и complete с разными click_trans_id по одному платежу. Проверяет:
+- платеж завершен ровно один раз, аукцион оплачен
+- на каждый (click_trans_id, action) одна запись ClickTransaction
+- повторы получают тот же ответ, что и первый запрос
+
+Запускать на PostgreSQL:
+    python manage.py replay_click_callbacks --duplicates 20 --workers 10
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from auctions.click_service import ClickService
+from auctions.models import Auction, AuctionPayment, ClickTransaction
+from properties.models import Property
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный тест: повторные и параллельные запросы Click по одному платежу'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duplicates', type=int, default=20, help='Повторов каждого запроса')
+        parser.add_argument('--workers', type=int, default=10, help='Параллельных потоков')
+        parser.add_argument('--keep', action='store_true', help='Не удалять тестовые данные')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING(
+                f'⚠️  База {connection.vendor}: блокировки строк не проверяются, запускайте на PostgreSQL'
+            ))
+
+        payment, organizer = self._create_fixtures()
+        service_id = getattr(settings, 'CLICK_SERVICE_ID', '')
+        secret_key = getattr(settings, 'CLICK_SECRET_KEY', '')
+
+        def request_args(click_trans_id, action):
+            args = {
+                'click_trans_id': click_trans_id,
+                'service_id': service_id,
+                'click_paydoc_id': f'PAYDOC_{click_trans_id}',
+                'merchant_trans_id': payment.merchant_trans_id,
+                'amount': str(payment.amount),
+                'action': str(action),  # Click шлет form-urlencoded, числа приходят строками
+                'sign_time': timezone.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'sign_string': ClickService.verify_signature(
+                    payment.merchant_trans_id, service_id, secret_key, click_trans_id
+                ),
+            }
+            if action == 1:
+                args.update(merchant_prepare_id=payment.id, error='0')
+            return args
+
+        # Два "разных" платежных попытки Click (A и B) по одному платежу
+        calls = []
+        for click_trans_id in ('900001', '900002'):
+            calls += [('prepare', request_args(click_trans_id, 0))] * options['duplicates']
+        for click_trans_id in ('900001', '900002'):
+            calls += [('complete', request_args(click_trans_id, 1))] * options['duplicates']
+
+        def send(call):
+            method, kwargs = call
+            try:
+                return method, kwargs['click_trans_id'], getattr(ClickService, method)(**kwargs)
+            finally:
+                close_old_connections()
+
+        started = time.monotonic()
+        # prepare раньше complete, как у Click; внутри этапа - параллельно
+        results = []
+        for stage in ('prepare', 'complete'):
+            stage_calls = [call for call in calls if call[0] == stage]
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                results += list(pool.map(send, stage_calls))
+        elapsed = time.monotonic() - started
+
+        ok = self._check(payment, results)
+
+        self.stdout.write('\n' + '=' * 50)
+        self.stdout.write(f'Запросов:   {len(results)}')
+        self.stdout.write(f'Время:      {elapsed:.2f} сек ({len(results) / elapsed:.1f} запросов/сек)')
+        self.stdout.write('=' * 50)
+
+        if not options['keep']:
+            organizer.delete()
+
+        if not ok:
+            raise CommandError('❌ Обнаружена повторная обработка')
+        self.stdout.write(self.style.SUCCESS('✅ Каждый запрос обработан один раз'))
+
+    def _create_fixtures(self):
+        suffix = timezone.now().strftime('%Y%m%d%H%M%S%f')
+        organizer = User.objects.create(
+            username=f'click_org_{suffix}',
+            email=f'click_org_{suffix}@example.com',
+            full_name='Click Organizer',
+        )
+
+        property_obj = Property(
+            owner=organizer,
+            title='Click replay test',
+            description='Click replay test',
+            address='Click replay test',
+            latitude=0.0,
+            longitude=0.0,
+            area=50,
+            rooms=2,
+            price=Decimal('1000000.00'),
+        )
+        # Без геокодинга и поиска ориентиров
+        super(Property, property_obj).save()
+
+        auction = Auction.objects.create(
+            property=property_obj,
+            organizer=organizer,
+            start_price=Decimal('1000000.00'),
+            current_price=Decimal('1000000.00'),
+            end_type='time',
+            start_time=timezone.now() + timedelta(hours=1),
+            end_time=timezone.now() + timedelta(hours=2),
+        )
+        payment = AuctionPayment.objects.create(
+            auction=auction,
+            user=organizer,
+            merchant_trans_id=ClickService.generate_merchant_trans_id(),
+            amount=Decimal('50000.00'),
+        )
+        return payment, organizer
+
+    def _check(self, payment, results):
+        ok = True
+        payment.refresh_from_db()
+        auction = Auction.objects.get(id=payment.auction_id)
+
+        if payment.status != 'completed' or not auction.is_paid or auction.status != 'scheduled':
+            ok = False
+            self.stdout.write(self.style.ERROR(
+                f'Платеж {payment.status}, аукцион is_paid={auction.is_paid} status={auction.status}'
+            ))
+
+        records = ClickTransaction.objects.filter(payment=payment).count()
+        if records != 4:
+            ok = False
+            self.stdout.write(self.style.ERROR(f'Записей ClickTransaction: {records}, ожидалось 4'))
+
+        # Повторы одного запроса должны получить одинаковый ответ
+        responses = {}
+        for method, click_trans_id, response in results:
+            responses.setdefault((method, click_trans_id), set()).add(
+                (response['error'], response['error_note'])
+            )
+        for key, variants in sorted(responses.items()):
+            self.stdout.write(f'  {key[0]} {key[1]}: {sorted(variants)}')
+            if len(variants) != 1:
+                ok = False
+
+        # Успешно завершить платеж может только одна попытка
+        completed = [
+            variants for (method, _), variants in responses.items()
+            if method == 'complete' and (0, 'Success') in variants
+        ]
+        if len(completed) != 1:
+            ok = False
+            self.stdout.write(self.style.ERROR(f'Успешных complete: {len(completed)}'))
+
+        return ok
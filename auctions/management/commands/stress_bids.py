@@ -0,0 +1,194 @@
+"""
+Management команда: нагрузочный тест приема ставок
+
+Создает временный аукцион и участников, запускает параллельных
+участников, которые перебивают друг друга, и проверяет инварианты:
+- current_price аукциона равен максимальной ставке
+- highest_bid и bid_count совпадают с таблицей ставок
+- каждая следующая ставка выше предыдущей минимум на шаг
+- нет потерянных обновлений
+
+Запускать на PostgreSQL (на SQLite параллельные записи упираются в блокировку файла):
+    python manage.py stress_bids --bidders 50 --bids 20
+
+Сравнение с быстрым режимом (Redis + фоновая запись в БД):
+    python manage.py stress_bids --bidders 50 --bids 20 --hot
+"""
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from auctions import hot_bidding
+from auctions.bidding import place_bid, BidError
+from auctions.models import Auction, Bid
+from properties.models import Property
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный тест: много параллельных участников делают ставки на один аукцион'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bidders', type=int, default=20, help='Количество параллельных участников')
+        parser.add_argument('--bids', type=int, default=10, help='Ставок на одного участника')
+        parser.add_argument('--increment', type=str, default='1000', help='Шаг ставки')
+        parser.add_argument('--keep', action='store_true', help='Не удалять тестовые данные')
+        parser.add_argument('--hot', action='store_true', help='Ставки через Redis (быстрый режим)')
+
+    def handle(self, *args, **options):
+        hot = options['hot']
+        if connection.vendor != 'postgresql' and not hot:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️  База {connection.vendor}: блокировки строк не проверяются, запускайте на PostgreSQL'
+            ))
+
+        increment = Decimal(options['increment'])
+        auction, users = self._create_fixtures(options['bidders'], increment)
+        if hot:
+            hot_bidding.warm_up(auction)
+        mode = 'Redis' if hot else 'PostgreSQL'
+        self.stdout.write(
+            f'🏁 Аукцион #{auction.id} ({mode}), участников: {len(users)}, '
+            f'ставок на участника: {options["bids"]}'
+        )
+
+        stats = {'accepted': 0, 'rejected': 0}
+
+        def bidder_loop(user):
+            accepted = rejected = 0
+            try:
+                for _ in range(options['bids']):
+                    if hot:
+                        current = hot_bidding.get_current_price(auction.id)
+                    else:
+                        current = Auction.objects.values_list('current_price', flat=True).get(id=auction.id)
+                    amount = current + increment * random.randint(1, 3)
+                    try:
+                        if hot:
+                            hot_bidding.place_bid(auction.id, user, amount)
+                        else:
+                            place_bid(auction.id, user, amount)
+                        accepted += 1
+                    except BidError:
+                        rejected += 1
+            finally:
+                close_old_connections()
+            return accepted, rejected
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=len(users)) as pool:
+            for accepted, rejected in pool.map(bidder_loop, users):
+                stats['accepted'] += accepted
+                stats['rejected'] += rejected
+        elapsed = time.monotonic() - started
+
+        if hot:
+            # Запись в БД в проде делает persist_hot_bids; здесь - разом после теста
+            persist_started = time.monotonic()
+            persisted = hot_bidding.persist_bids(auction.id)
+            persist_elapsed = time.monotonic() - persist_started
+            hot_bidding.retire(auction.id)
+
+        ok = self._check_invariants(auction, increment)
+
+        total = stats['accepted'] + stats['rejected']
+        self.stdout.write('\n' + '=' * 50)
+        self.stdout.write(f'Принято ставок:   {stats["accepted"]}')
+        self.stdout.write(f'Отклонено ставок: {stats["rejected"]}')
+        self.stdout.write(f'Время:            {elapsed:.2f} сек')
+        self.stdout.write(f'Пропускная способность: {total / elapsed:.1f} попыток/сек, '
+                          f'{stats["accepted"] / elapsed:.1f} принятых ставок/сек')
+        if hot:
+            self.stdout.write(f'Запись в БД:      {persisted} ставок за {persist_elapsed:.2f} сек')
+        self.stdout.write('=' * 50)
+
+        if not options['keep']:
+            User.objects.filter(id__in=[u.id for u in users] + [auction.organizer_id]).delete()
+
+        if not ok:
+            raise CommandError('❌ Инварианты нарушены')
+        self.stdout.write(self.style.SUCCESS('✅ Инварианты соблюдены'))
+
+    def _create_fixtures(self, bidders, increment):
+        suffix = timezone.now().strftime('%Y%m%d%H%M%S%f')
+
+        organizer = User.objects.create(
+            username=f'stress_org_{suffix}',
+            email=f'stress_org_{suffix}@example.com',
+            full_name='Stress Organizer',
+        )
+        users = User.objects.bulk_create([
+            User(
+                username=f'stress_{suffix}_{i}',
+                email=f'stress_{suffix}_{i}@example.com',
+                full_name=f'Stress Bidder {i}',
+            )
+            for i in range(bidders)
+        ])
+
+        property_obj = Property(
+            owner=organizer,
+            title='Stress test',
+            description='Stress test',
+            address='Stress test',
+            latitude=0.0,
+            longitude=0.0,
+            area=50,
+            rooms=2,
+            price=Decimal('1000000.00'),
+        )
+        # Без геокодинга и поиска ориентиров
+        super(Property, property_obj).save()
+
+        now = timezone.now()
+        auction = Auction.objects.create(
+            property=property_obj,
+            organizer=organizer,
+            start_price=Decimal('1000000.00'),
+            current_price=Decimal('1000000.00'),
+            min_bid_increment=increment,
+            end_type='time',
+            start_time=now - timedelta(minutes=1),
+            end_time=now + timedelta(hours=1),
+            status='active',
+            is_paid=True,
+        )
+        return auction, users
+
+    def _check_invariants(self, auction, increment):
+        auction.refresh_from_db()
+        amounts = list(
+            Bid.objects.filter(auction=auction).order_by('id').values_list('amount', flat=True)
+        )
+        ok = True
+
+        if amounts and auction.current_price != max(amounts):
+            ok = False
+            self.stdout.write(self.style.ERROR(
+                f'current_price={auction.current_price}, максимальная ставка={max(amounts)}'
+            ))
+
+        if auction.bid_count != len(amounts):
+            ok = False
+            self.stdout.write(self.style.ERROR(
+                f'bid_count={auction.bid_count}, ставок в таблице={len(amounts)}'
+            ))
+
+        if amounts and (auction.highest_bid is None or auction.highest_bid.amount != max(amounts)):
+            ok = False
+            self.stdout.write(self.style.ERROR('highest_bid не указывает на максимальную ставку'))
+
+        previous = auction.start_price
+        for amount in amounts:
+            if amount < previous + increment:
+                ok = False
+                self.stdout.write(self.style.ERROR(f'Ставка {amount} после {previous}: шаг нарушен'))
+            previous = amount
+
+        return ok
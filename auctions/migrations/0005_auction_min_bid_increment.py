@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:12
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0004_manualpayment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auction',
+            name='min_bid_increment',
+            field=models.DecimalField(decimal_places=2, default=Decimal('10000.00'), max_digits=15, verbose_name='Минимальный шаг ставки'),
+        ),
+    ]
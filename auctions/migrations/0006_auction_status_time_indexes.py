@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0005_auction_min_bid_increment'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['status', 'start_time'], name='auctions_au_status_d4eee5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auction',
+            index=models.Index(fields=['status', 'end_time'], name='auctions_au_status_ced721_idx'),
+        ),
+    ]
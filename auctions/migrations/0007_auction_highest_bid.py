@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_bid_stats(apps, schema_editor):
+    """Заполняет лучшую ставку, количество и время последней ставки"""
+    Auction = apps.get_model('auctions', 'Auction')
+    Bid = apps.get_model('auctions', 'Bid')
+
+    bids = Bid.objects.filter(auction=OuterRef('pk'))
+    Auction.objects.filter(id__in=Bid.objects.values('auction_id')).update(
+        highest_bid=Subquery(bids.order_by('-amount', 'bid_time').values('id')[:1]),
+        bid_count=Coalesce(Subquery(
+            bids.order_by().values('auction').annotate(total=Count('id')).values('total')[:1]
+        ), 0),
+        last_bid_at=Subquery(bids.order_by('-bid_time').values('bid_time')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0006_auction_status_time_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='bid',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='bid_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество ставок'),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='highest_bid',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='auctions.bid', verbose_name='Лучшая ставка'),
+        ),
+        migrations.AddField(
+            model_name='auction',
+            name='last_bid_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Время последней ставки'),
+        ),
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['auction', '-amount'], include=('bidder',), name='bid_auction_amount_idx'),
+        ),
+        migrations.RunPython(fill_bid_stats, migrations.RunPython.noop),
+    ]
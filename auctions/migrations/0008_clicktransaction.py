@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0007_auction_highest_bid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClickTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('click_trans_id', models.CharField(max_length=255, verbose_name='Click Transaction ID')),
+                ('action', models.PositiveSmallIntegerField(choices=[(0, 'Prepare'), (1, 'Complete')], verbose_name='Действие')),
+                ('response', models.JSONField(verbose_name='Ответ')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('payment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='click_transactions', to='auctions.auctionpayment', verbose_name='Платеж')),
+            ],
+            options={
+                'verbose_name': 'Запрос Click',
+                'verbose_name_plural': 'Запросы Click',
+                'ordering': ['-created_at'],
+                'constraints': [models.UniqueConstraint(fields=('click_trans_id', 'action'), name='unique_click_trans_action')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:26
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0008_clicktransaction'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TelegramOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('payment_new', 'Новый платеж'), ('payment_status', 'Статус платежа')], max_length=20, verbose_name='Тип')),
+                ('chat_id', models.CharField(max_length=64, verbose_name='Чат')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='Данные')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает отправки'), ('sending', 'Отправляется'), ('sent', 'Отправлено'), ('failed', 'Ошибка')], default='pending', max_length=10, verbose_name='Статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Следующая попытка')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Последняя ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата отправки')),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='telegram_messages', to='auctions.manualpayment', verbose_name='Платеж')),
+            ],
+            options={
+                'verbose_name': 'Сообщение Telegram',
+                'verbose_name_plural': 'Очередь Telegram',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='auctions_te_status_d7c52b_idx')],
+            },
+        ),
+    ]
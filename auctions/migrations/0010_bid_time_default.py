@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:52
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0009_telegramoutbox'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bid',
+            name='bid_time',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время ставки'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:08
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_bids(apps, schema_editor):
+    """
+    Удаляет задвоенные ставки (одна сумма в аукционе), оставляя первую
+
+    Дубликаты мог записать наложившийся перенос ставок из Redis.
+    Ссылки аукциона на удаляемые ставки переводятся на оставшуюся,
+    bid_count пересчитывается.
+    """
+    Auction = apps.get_model('auctions', 'Auction')
+    Bid = apps.get_model('auctions', 'Bid')
+
+    duplicates = (
+        Bid.objects.values('auction_id', 'amount')
+        .annotate(total=Count('id'), keep_id=Min('id'))
+        .filter(total__gt=1)
+    )
+    for row in duplicates.iterator():
+        extra = Bid.objects.filter(
+            auction_id=row['auction_id'], amount=row['amount']
+        ).exclude(id=row['keep_id'])
+        extra_ids = list(extra.values_list('id', flat=True))
+        print(f"  Аукцион #{row['auction_id']}: удалено задвоенных ставок {len(extra_ids)}")
+
+        Auction.objects.filter(highest_bid_id__in=extra_ids).update(highest_bid_id=row['keep_id'])
+        Auction.objects.filter(winning_bid_id__in=extra_ids).update(winning_bid_id=row['keep_id'])
+        extra.delete()
+        Auction.objects.filter(id=row['auction_id']).update(
+            bid_count=Bid.objects.filter(auction_id=row['auction_id']).count()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0010_bid_time_default'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_bids, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='bid',
+            constraint=models.UniqueConstraint(fields=('auction', 'amount'), name='bid_auction_amount_uniq'),
+        ),
+    ]
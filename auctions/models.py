@@ -1,9 +1,55 @@
 from decimal import Decimal
 from django.db import models
+from django.utils import timezone
 from users.models import User
 from properties.models import Property
 
 
+def active_auction_q(now):
+    """Условие Auction.is_active() в виде Q для фильтров и аннотаций"""
+    before_end = models.Q(end_time__isnull=False, end_time__gte=now)
+    below_target = models.Q(target_price__isnull=False, current_price__lt=models.F('target_price'))
+
+    return models.Q(status='active', start_time__lte=now) & (
+        models.Q(end_type='time') & (before_end | models.Q(end_time__isnull=True))
+        | models.Q(end_type='price') & (below_target | models.Q(target_price__isnull=True))
+        | models.Q(end_type='both') & (
+            before_end & below_target
+            | models.Q(end_time__isnull=True)
+            | models.Q(target_price__isnull=True)
+        )
+    )
+
+
+class AuctionQuerySet(models.QuerySet):
+    def active(self, now=None):
+        """Идущие сейчас аукционы (SQL-версия is_active)"""
+        return self.filter(active_auction_q(now or timezone.now()))
+
+    def inactive(self, now=None):
+        return self.exclude(active_auction_q(now or timezone.now()))
+
+    def with_is_active(self, now=None):
+        """Аннотация is_active_now, которую читает AuctionSerializer"""
+        return self.annotate(is_active_now=models.ExpressionWrapper(
+            active_auction_q(now or timezone.now()),
+            output_field=models.BooleanField()
+        ))
+
+    def ending(self, now=None):
+        """Активные аукционы, которые должны завершиться (SQL-версия should_end)"""
+        now = now or timezone.now()
+
+        by_time = models.Q(end_time__isnull=False, end_time__lt=now)
+        by_price = models.Q(target_price__isnull=False, current_price__gte=models.F('target_price'))
+
+        return self.filter(status='active').filter(
+            models.Q(end_type='time') & by_time
+            | models.Q(end_type='price') & by_price
+            | models.Q(end_type='both', end_time__isnull=False, target_price__isnull=False) & (by_time | by_price)
+        )
+
+
 class Auction(models.Model):
     END_TYPE_CHOICES = [
         ('time', 'По времени'),
@@ -23,6 +69,12 @@ class Auction(models.Model):
     organizer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='organized_auctions', verbose_name='Организатор')
     start_price = models.DecimalField(max_digits=15, decimal_places=2, verbose_name='Стартовая цена')
     current_price = models.DecimalField(max_digits=15, decimal_places=2, default=Decimal('0.00'), verbose_name='Текущая цена')
+    min_bid_increment = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=Decimal('10000.00'),
+        verbose_name='Минимальный шаг ставки'
+    )
 
     # Условия окончания аукциона
     end_type = models.CharField(max_length=20, choices=END_TYPE_CHOICES, default='time', verbose_name='Тип окончания')
@@ -35,6 +87,11 @@ class Auction(models.Model):
     winner = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='won_auctions', verbose_name='Победитель')
     winning_bid = models.ForeignKey('Bid', on_delete=models.SET_NULL, null=True, blank=True, related_name='won_auction', verbose_name='Победная ставка')
 
+    # Денормализация: обновляется вместе с приемом ставки, чтобы не искать лучшую ставку запросом
+    highest_bid = models.ForeignKey('Bid', on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name='Лучшая ставка')
+    bid_count = models.PositiveIntegerField(default=0, verbose_name='Количество ставок')
+    last_bid_at = models.DateTimeField(null=True, blank=True, verbose_name='Время последней ставки')
+
     # Оплата
     is_paid = models.BooleanField(default=False, verbose_name='Оплачен')
     payment_amount = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('50000.00'), verbose_name='Сумма оплаты')
@@ -42,14 +99,27 @@ class Auction(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
 
+    objects = AuctionQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Аукцион'
         verbose_name_plural = 'Аукционы'
         ordering = ['-created_at']
+        indexes = [
+            # Сверочные задачи: активация и завершение по времени
+            models.Index(fields=['status', 'start_time']),
+            models.Index(fields=['status', 'end_time']),
+        ]
 
     def __str__(self):
         return f"Аукцион для {self.property.title}"
 
+    def delete(self, *args, **kwargs):
+        """Убирает записи планировщика (при каскадном удалении их отбросит dispatch_due)"""
+        from .scheduling import unschedule_auction
+        unschedule_auction(self.pk)
+        return super().delete(*args, **kwargs)
+
     def is_active(self):
         from django.utils import timezone
         now = timezone.now()
@@ -93,8 +163,8 @@ class Auction(models.Model):
         if self.status == 'completed' or not self.should_end():
             return
 
-        # Получаем самую высокую ставку
-        highest_bid = self.bids.order_by('-amount').first()
+        # Лучшая ставка хранится в аукционе (обновляется при приеме ставки)
+        highest_bid = self.highest_bid
 
         if highest_bid:
             self.winner = highest_bid.bidder
@@ -104,34 +174,34 @@ class Auction(models.Model):
         self.status = 'completed'
         self.save()
 
+        from .realtime import publish_on_commit, status_event
+        publish_on_commit(self.id, 'status', status_event(self))
+
 
 class Bid(models.Model):
     auction = models.ForeignKey(Auction, on_delete=models.CASCADE, related_name='bids', verbose_name='Аукцион')
     bidder = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bids', verbose_name='Участник')
     amount = models.DecimalField(max_digits=15, decimal_places=2, verbose_name='Сумма ставки')
-    bid_time = models.DateTimeField(auto_now_add=True, verbose_name='Время ставки')
+    # Не auto_now_add: ставки из быстрого режима пишутся в БД позже, со временем приема
+    bid_time = models.DateTimeField(default=timezone.now, verbose_name='Время ставки')
 
     class Meta:
         verbose_name = 'Ставка'
         verbose_name_plural = 'Ставки'
         ordering = ['-bid_time']
-        unique_together = ['auction', 'bidder', 'amount']
+        indexes = [
+            # Лучшая ставка и рейтинг участников аукциона - только по индексу
+            models.Index(fields=['auction', '-amount'], include=['bidder'], name='bid_auction_amount_idx'),
+        ]
+        constraints = [
+            # Каждая ставка выше предыдущей; повторная запись ставки из Redis
+            # (persist_bids) упадет здесь, а не задвоит bid_count
+            models.UniqueConstraint(fields=['auction', 'amount'], name='bid_auction_amount_uniq'),
+        ]
 
     def __str__(self):
         return f"Ставка {self.amount} от {self.bidder.full_name}"
 
-    def save(self, *args, **kwargs):
-        """При сохранении ставки обновляем аукцион"""
-        super().save(*args, **kwargs)
-
-        # Обновляем текущую цену аукциона
-        self.auction.current_price = self.amount
-        self.auction.save()
-
-        # Проверяем, нужно ли завершить аукцион
-        if self.auction.should_end():
-            self.auction.determine_winner()
-
 
 class AuctionPayment(models.Model):
     PAYMENT_STATUS_CHOICES = [
@@ -163,28 +233,86 @@ class AuctionPayment(models.Model):
         verbose_name_plural = 'Платежи аукционов'
         ordering = ['-created_at']
 
+    # Допустимые переходы статуса; completed и cancelled - конечные
+    ALLOWED_TRANSITIONS = {
+        'pending': {'processing', 'completed', 'failed', 'cancelled'},
+        'processing': {'processing', 'completed', 'failed', 'cancelled'},
+        'failed': {'processing', 'cancelled'},
+        'completed': set(),
+        'cancelled': set(),
+    }
+
     def __str__(self):
         return f"Платеж {self.merchant_trans_id} - {self.status}"
 
+    def can_transition(self, new_status):
+        return new_status in self.ALLOWED_TRANSITIONS.get(self.status, set())
+
+    def transition(self, new_status, **fields):
+        """
+        Меняет статус с проверкой перехода и пишет только измененные поля
+
+        Вызывать на строке, заблокированной select_for_update.
+        """
+        if not self.can_transition(new_status):
+            raise ValueError(f'Недопустимый переход платежа: {self.status} -> {new_status}')
+
+        self.status = new_status
+        for field, value in fields.items():
+            setattr(self, field, value)
+        self.save(update_fields=['status', 'updated_at', *fields])
+
+    def mark_processing(self, click_trans_id, click_paydoc_id):
+        self.transition('processing', click_trans_id=click_trans_id, click_paydoc_id=click_paydoc_id)
+
     def mark_completed(self):
         """Отмечает платеж как завершенный и активирует аукцион"""
         from django.utils import timezone
 
-        self.status = 'completed'
-        self.completed_at = timezone.now()
-        self.save()
+        self.transition('completed', completed_at=timezone.now())
 
         # Обновляем статус аукциона
         self.auction.is_paid = True
         if self.auction.status == 'pending_payment':
             self.auction.status = 'scheduled'
-        self.auction.save()
+        self.auction.save(update_fields=['is_paid', 'status', 'updated_at'])
+
+        from .scheduling import schedule_auction
+        schedule_auction(self.auction)
 
     def mark_failed(self, error_note=''):
         """Отмечает платеж как неудавшийся"""
-        self.status = 'failed'
-        self.error_note = error_note
-        self.save()
+        self.transition('failed', error_note=error_note)
+
+
+class ClickTransaction(models.Model):
+    """
+    Обработанный запрос Click (prepare/complete)
+
+    Click повторяет запросы при таймаутах; повтор с тем же click_trans_id
+    и action получает сохраненный ответ и не меняет платеж второй раз.
+    """
+    ACTION_CHOICES = [
+        (0, 'Prepare'),
+        (1, 'Complete'),
+    ]
+
+    click_trans_id = models.CharField(max_length=255, verbose_name='Click Transaction ID')
+    action = models.PositiveSmallIntegerField(choices=ACTION_CHOICES, verbose_name='Действие')
+    payment = models.ForeignKey(AuctionPayment, on_delete=models.CASCADE, related_name='click_transactions', verbose_name='Платеж')
+    response = models.JSONField(verbose_name='Ответ')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+
+    class Meta:
+        verbose_name = 'Запрос Click'
+        verbose_name_plural = 'Запросы Click'
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['click_trans_id', 'action'], name='unique_click_trans_action'),
+        ]
+
+    def __str__(self):
+        return f"Click {self.click_trans_id} ({self.get_action_display()})"
 
 
 class ManualPayment(models.Model):
@@ -270,8 +398,64 @@ class ManualPayment(models.Model):
             self.auction.status = 'scheduled'
         self.auction.save()
 
+        from .scheduling import schedule_auction
+        schedule_auction(self.auction)
+
     def reject(self, reason=''):
         """Отклоняет платеж"""
         self.status = 'rejected'
         self.rejection_reason = reason
         self.save()
+
+
+class TelegramOutbox(models.Model):
+    """
+    Исходящее сообщение в Telegram (transactional outbox)
+
+    Запись создается в той же транзакции, что и изменение платежа,
+    а отправляет ее Celery-задача deliver_telegram_outbox с повторами
+    и соблюдением лимитов Telegram (см. auctions/telegram_outbox.py).
+    """
+
+    KIND_CHOICES = [
+        ('payment_new', 'Новый платеж'),
+        ('payment_status', 'Статус платежа'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Ожидает отправки'),
+        ('sending', 'Отправляется'),
+        ('sent', 'Отправлено'),
+        ('failed', 'Ошибка'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name='Тип')
+    chat_id = models.CharField(max_length=64, verbose_name='Чат')
+    payment = models.ForeignKey(
+        ManualPayment,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='telegram_messages',
+        verbose_name='Платеж'
+    )
+    payload = models.JSONField(default=dict, blank=True, verbose_name='Данные')
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name='Статус')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name='Следующая попытка')
+    last_error = models.TextField(blank=True, default='', verbose_name='Последняя ошибка')
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name='Дата отправки')
+
+    class Meta:
+        verbose_name = 'Сообщение Telegram'
+        verbose_name_plural = 'Очередь Telegram'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} → {self.chat_id} ({self.get_status_display()})"
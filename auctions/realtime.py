@@ -0,0 +1,173 @@
+"""
+События аукционов в реальном времени (Server-Sent Events)
+
+Код, меняющий аукцион, публикует компактное событие в канал Redis
+auction:<id>:events. В каждом ASGI-процессе одно подключение к Redis
+подписано на все такие каналы (psubscribe) и раздает события
+открытым SSE-соединениям этого аукциона через asyncio.Queue.
+
+Типы событий:
+    bid     - {"amount", "current_price", "bidder_name", "bid_time"}
+    status  - {"status", "current_price", "winner_name"}
+
+Клиент: new EventSource('/api/auctions/5/events/?token=<access>')
+"""
+import asyncio
+import json
+from collections import defaultdict
+
+import redis.asyncio as aioredis
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from redis.exceptions import RedisError
+
+from core.redis_client import get_redis
+
+
+CHANNEL_PATTERN = 'auction:*:events'
+
+# Пустой комментарий раз в N секунд, чтобы прокси не закрывали соединение
+HEARTBEAT_SECONDS = 15
+
+# Сколько событий держим для медленного клиента, дальше - отбрасываем
+LISTENER_QUEUE_SIZE = 100
+
+
+def channel_name(auction_id):
+    return f'auction:{auction_id}:events'
+
+
+# ==================== ПУБЛИКАЦИЯ ====================
+
+def publish_auction_event(auction_id, event_type, data):
+    """Публикует событие сразу; ошибки Redis не ломают основную операцию"""
+    publish_auction_events([(auction_id, event_type, data)])
+
+
+def publish_auction_events(events):
+    """
+    Публикует пачку событий одним запросом (pipeline)
+
+    Args:
+        events: [(auction_id, event_type, data), ...]
+    """
+    if not events:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for auction_id, event_type, data in events:
+            pipe.publish(channel_name(auction_id), _dump_event(event_type, data))
+        pipe.execute()
+    except RedisError as e:
+        print(f'Auction events publish error: {e}')
+
+
+def publish_on_commit(auction_id, event_type, data):
+    """Публикует событие после коммита текущей транзакции"""
+    transaction.on_commit(lambda: publish_auction_event(auction_id, event_type, data))
+
+
+def bid_event(bid, current_price=None):
+    return {
+        'amount': str(bid.amount),
+        'current_price': str(current_price if current_price is not None else bid.amount),
+        'bidder_name': bid.bidder.full_name,
+        'bid_time': bid.bid_time.isoformat() if bid.bid_time else None,
+    }
+
+
+def status_event(auction):
+    return {
+        'status': auction.status,
+        'current_price': str(auction.current_price),
+        'winner_name': auction.winner.full_name if auction.winner_id else None,
+    }
+
+
+def _dump_event(event_type, data):
+    return json.dumps({'type': event_type, 'data': data}, ensure_ascii=False, cls=DjangoJSONEncoder)
+
+
+def format_sse(event_type, data):
+    payload = json.dumps(data, ensure_ascii=False, cls=DjangoJSONEncoder)
+    return f'event: {event_type}\ndata: {payload}\n\n'
+
+
+# ==================== РАЗДАЧА (ASGI) ====================
+
+class AuctionEventHub:
+    """
+    Одна подписка на Redis на процесс, раздача событий по очередям слушателей
+    """
+
+    def __init__(self):
+        self._listeners = defaultdict(set)
+        self._task = None
+
+    def subscribe(self, auction_id):
+        queue = asyncio.Queue(maxsize=LISTENER_QUEUE_SIZE)
+        self._listeners[auction_id].add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return queue
+
+    def unsubscribe(self, auction_id, queue):
+        listeners = self._listeners.get(auction_id)
+        if listeners is None:
+            return
+        listeners.discard(queue)
+        if not listeners:
+            del self._listeners[auction_id]
+
+    async def _run(self):
+        while self._listeners:
+            client = aioredis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(CHANNEL_PATTERN)
+                async for message in pubsub.listen():
+                    if message['type'] == 'pmessage':
+                        self._dispatch(message['channel'], message['data'])
+                    if not self._listeners:
+                        break
+            except RedisError as e:
+                print(f'Auction events subscriber error: {e}')
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+
+    def _dispatch(self, channel, raw):
+        try:
+            auction_id = int(channel.split(':')[1])
+            event = json.loads(raw)
+        except (IndexError, ValueError):
+            return
+
+        for queue in list(self._listeners.get(auction_id, ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Клиент не успевает читать; он догонит состояние по snapshot при переподключении
+                pass
+
+
+hub = AuctionEventHub()
+
+
+async def event_stream(auction_id, snapshot):
+    """Асинхронный генератор SSE для одного подключения"""
+    queue = hub.subscribe(auction_id)
+    try:
+        yield 'retry: 3000\n\n'
+        yield format_sse('snapshot', snapshot)
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            yield format_sse(event['type'], event['data'])
+    finally:
+        hub.unsubscribe(auction_id, queue)
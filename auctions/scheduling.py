@@ -0,0 +1,152 @@
+"""
+Планировщик начала и окончания аукционов (Redis sorted set)
+
+Вместо опроса таблиц каждые 30/60 секунд каждое событие кладется в
+sorted set auctions:schedule со score = unix-время:
+
+    activate:<id>  - start_time оплаченного аукциона
+    end:<id>       - end_time аукциона с окончанием по времени
+
+Задача dispatch_auction_schedule раз в секунду забирает наступившие
+записи (ZRANGEBYSCORE + ZREM - кто удалил, тот и выполняет), поэтому
+точность около секунды, а таблицы не сканируются. Периодические задачи
+activate_scheduled_auctions / check_and_complete_auctions остаются как
+редкая сверка на случай потери записи в Redis.
+
+Celery ETA-задачи не подходят: с брокером Redis задача с ETA дальше
+visibility_timeout выполняется повторно, а аукцион может длиться дни.
+"""
+import time
+
+from django.db import transaction
+from redis.exceptions import RedisError
+
+from core.redis_client import get_redis
+
+
+SCHEDULE_KEY = 'auctions:schedule'
+
+# Сколько наступивших записей забираем за один проход
+DISPATCH_BATCH = 100
+
+
+def schedule_auction(auction):
+    """
+    Ставит (или переносит) записи начала и окончания аукциона
+
+    Вызывать после изменения статуса, оплаты или времени аукциона.
+    В транзакции запись делается после коммита.
+    """
+    transaction.on_commit(lambda: _schedule_now(auction.id, auction.status, auction.is_paid,
+                                                auction.start_time, auction.end_time,
+                                                auction.end_type))
+
+
+def unschedule_auction(*auction_ids):
+    """
+    Убирает записи начала и окончания отмененных/удаленных аукционов
+
+    В транзакции запись удаляется после коммита.
+    """
+    members = [f'{action}:{auction_id}' for auction_id in auction_ids for action in ('activate', 'end')]
+    if not members:
+        return
+
+    def _unschedule():
+        try:
+            get_redis().zrem(SCHEDULE_KEY, *members)
+        except RedisError as e:
+            print(f'Auction schedule error: {e}')
+
+    transaction.on_commit(_unschedule)
+
+
+def _schedule_now(auction_id, status, is_paid, start_time, end_time, end_type):
+    entries = {}
+    remove = []
+
+    if status == 'scheduled' and is_paid and start_time:
+        entries[f'activate:{auction_id}'] = start_time.timestamp()
+    else:
+        remove.append(f'activate:{auction_id}')
+
+    if status in ('scheduled', 'active') and end_type in ('time', 'both') and end_time:
+        entries[f'end:{auction_id}'] = end_time.timestamp()
+    else:
+        remove.append(f'end:{auction_id}')
+
+    try:
+        pipe = get_redis().pipeline()
+        if entries:
+            pipe.zadd(SCHEDULE_KEY, entries)
+        if remove:
+            pipe.zrem(SCHEDULE_KEY, *remove)
+        pipe.execute()
+    except RedisError as e:
+        # Сверочные задачи подхватят аукцион позже
+        print(f'Auction schedule error: {e}')
+
+
+def claim_due_entries(now=None, limit=DISPATCH_BATCH):
+    """
+    Забирает наступившие записи
+
+    ZREM возвращает 1 только одному из параллельных диспетчеров,
+    так что каждая запись выполняется один раз.
+    """
+    r = get_redis()
+    now = now or time.time()
+    due = r.zrangebyscore(SCHEDULE_KEY, '-inf', now, start=0, num=limit)
+    if not due:
+        return []
+
+    pipe = r.pipeline()
+    for member in due:
+        pipe.zrem(SCHEDULE_KEY, member)
+    removed = pipe.execute()
+    return [member for member, ok in zip(due, removed) if ok]
+
+
+def dispatch_due():
+    """
+    Выполняет наступившие записи
+
+    Returns:
+        (activated, completed) - количество обработанных аукционов
+    """
+    from .models import Auction
+    from . import hot_bidding, transitions
+
+    activate_ids = []
+    end_ids = []
+    for member in claim_due_entries():
+        action, _, auction_id = member.partition(':')
+        if action == 'activate':
+            activate_ids.append(int(auction_id))
+        elif action == 'end':
+            end_ids.append(int(auction_id))
+
+    activated = 0
+    if activate_ids:
+        activated = transitions.activate_due(activate_ids)
+
+        # Строка была заблокирована или start_time перенесли - ставим заново
+        for auction in Auction.objects.filter(id__in=activate_ids, status='scheduled', is_paid=True):
+            schedule_auction(auction)
+
+    completed = []
+    if end_ids:
+        completed = transitions.complete_ended(end_ids)
+
+        # Не завершились: end_time перенесли или строка была заблокирована
+        # ставкой - ставим заново (с прошедшим временем - на следующий проход).
+        # Горячие аукционы завершает persist_hot_bids, их не трогаем.
+        for auction in Auction.objects.filter(
+            id__in=set(end_ids) - set(completed),
+            status='active'
+        ):
+            if hot_bidding.is_enabled() and hot_bidding.is_hot(auction.id):
+                continue
+            schedule_auction(auction)
+
+    return activated, len(completed)
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from .models import Auction, Bid, AuctionPayment, ManualPayment
-from properties.serializers import PropertySerializer
+from properties.serializers import PropertySerializer, PropertyCardSerializer
 
 
 class BidSerializer(serializers.ModelSerializer):
@@ -22,31 +22,43 @@ class AuctionPaymentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'merchant_trans_id', 'created_at', 'completed_at']
 
 
-class AuctionSerializer(serializers.ModelSerializer):
+class AuctionIsActiveMixin(serializers.Serializer):
+    """is_active: из аннотации is_active_now (AuctionQuerySet.with_is_active) или по модели"""
+    is_active = serializers.SerializerMethodField()
+
+    def get_is_active(self, obj):
+        is_active_now = getattr(obj, 'is_active_now', None)
+        if is_active_now is not None:
+            return is_active_now
+        return obj.is_active()
+
+
+class AuctionSerializer(AuctionIsActiveMixin, serializers.ModelSerializer):
     bids = BidSerializer(many=True, read_only=True)
     property_details = PropertySerializer(source='property', read_only=True)
     property_title = serializers.CharField(source='property.title', read_only=True)
     organizer_name = serializers.CharField(source='organizer.full_name', read_only=True)
     winner_name = serializers.CharField(source='winner.full_name', read_only=True, allow_null=True)
-    is_active = serializers.SerializerMethodField()
     payment_info = AuctionPaymentSerializer(source='payment', read_only=True)
 
     class Meta:
         model = Auction
         fields = [
             'id', 'property', 'property_details', 'property_title', 'organizer', 'organizer_name',
-            'start_price', 'current_price', 'start_time', 'end_time',
+            'start_price', 'current_price', 'min_bid_increment', 'start_time', 'end_time',
             'end_type', 'target_price', 'status', 'is_paid',
-            'winner', 'winner_name', 'winning_bid', 'bids',
+            'winner', 'winner_name', 'winning_bid', 'bids', 'bid_count', 'last_bid_at',
             'is_active', 'payment_info', 'created_at', 'updated_at'
         ]
         read_only_fields = [
             'id', 'organizer', 'current_price', 'winner', 'winning_bid',
-            'status', 'is_paid', 'created_at', 'updated_at'
+            'bid_count', 'last_bid_at', 'status', 'is_paid', 'created_at', 'updated_at'
         ]
 
-    def get_is_active(self, obj):
-        return obj.is_active()
+    def validate_min_bid_increment(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Шаг ставки должен быть больше нуля")
+        return value
 
     def validate(self, data):
         """Валидация данных аукциона"""
@@ -104,6 +116,34 @@ class AuctionSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class AuctionListSerializer(AuctionIsActiveMixin, serializers.ModelSerializer):
+    """
+    Компактный аукцион для списка: лучшая ставка и количество ставок
+    вместо всех ставок, карточка недвижимости вместо полного объекта.
+    История ставок - /api/auctions/<id>/bids/
+    """
+    property_title = serializers.CharField(source='property.title', read_only=True)
+    property_card = PropertyCardSerializer(source='property', read_only=True)
+    organizer_name = serializers.CharField(source='organizer.full_name', read_only=True)
+    winner_name = serializers.CharField(source='winner.full_name', read_only=True, allow_null=True)
+    top_bid = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Auction
+        fields = [
+            'id', 'property', 'property_title', 'property_card', 'organizer_name',
+            'start_price', 'current_price', 'min_bid_increment', 'start_time', 'end_time',
+            'end_type', 'target_price', 'status', 'is_paid', 'winner_name',
+            'top_bid', 'bid_count', 'last_bid_at', 'is_active', 'created_at'
+        ]
+        read_only_fields = fields
+
+    def get_top_bid(self, obj):
+        if obj.highest_bid is None:
+            return None
+        return BidSerializer(obj.highest_bid).data
+
+
 class ManualPaymentSerializer(serializers.ModelSerializer):
     """Сериализатор для ручных платежей"""
     auction_title = serializers.CharField(source='auction.property.title', read_only=True)
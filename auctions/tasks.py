@@ -1,72 +1,116 @@
+from datetime import timedelta
+
 from celery import shared_task
+from django.db import transaction
 from django.utils import timezone
 from .models import Auction
+from . import hot_bidding, telegram_outbox, transitions
+from .scheduling import dispatch_due
 
 
 @shared_task
 def check_and_complete_auctions():
     """
-    Периодическая задача для проверки и завершения аукционов
-    Запускается каждую минуту через Celery Beat
+    Сверка: завершает аукционы, пропущенные планировщиком
+    Запускается раз в 5 минут через Celery Beat
     """
-    now = timezone.now()
+    # Условие окончания проверяется в SQL, победители - одним запросом
+    completed_ids = transitions.complete_ended()
 
-    # Находим все активные аукционы
-    active_auctions = Auction.objects.filter(status='active')
+    return f"Завершено аукционов: {len(completed_ids)}"
 
-    completed_count = 0
 
-    for auction in active_auctions:
-        if auction.should_end():
-            auction.determine_winner()
-            completed_count += 1
+@shared_task
+def activate_scheduled_auctions():
+    """
+    Сверка: активирует запланированные аукционы, пропущенные планировщиком
+    """
+    activated_count = transitions.activate_due()
 
-    return f"Проверено аукционов: {active_auctions.count()}, завершено: {completed_count}"
+    return f"Активировано аукционов: {activated_count}"
 
 
 @shared_task
-def activate_scheduled_auctions():
+def cancel_unpaid_auctions():
     """
-    Активирует запланированные аукционы, время которых наступило
+    Отменяет неоплаченные аукционы через 24 часа после создания
     """
-    now = timezone.now()
+    cutoff_time = timezone.now() - timedelta(hours=24)
+
+    cancelled_count = transitions.cancel_unpaid(cutoff_time)
+
+    return f"Отменено неоплаченных аукционов: {cancelled_count}"
+
+
+@shared_task
+def warm_hot_auctions():
+    """
+    Переводит в быстрый режим (Redis) аукционы, которые заканчиваются
+    в ближайшие AUCTION_HOT_PATH_WINDOW секунд
+    """
+    if not hot_bidding.is_enabled():
+        return "Быстрый режим ставок выключен"
 
-    # Находим все запланированные аукционы, которые должны начаться
-    scheduled_auctions = Auction.objects.filter(
-        status='scheduled',
+    now = timezone.now()
+    candidate_ids = Auction.objects.filter(
+        status='active',
         is_paid=True,
-        start_time__lte=now
-    )
+        end_type__in=['time', 'both'],
+        end_time__gt=now,
+        end_time__lte=now + timedelta(seconds=hot_bidding.get_window_seconds())
+    ).values_list('id', flat=True)
 
-    activated_count = 0
+    warmed_count = 0
 
-    for auction in scheduled_auctions:
-        auction.status = 'active'
-        auction.save()
-        activated_count += 1
+    for auction_id in candidate_ids:
+        if hot_bidding.is_hot(auction_id):
+            continue
+        # Блокировка строки: ставка через БД не должна проскочить во время переноса
+        with transaction.atomic():
+            auction = Auction.objects.select_for_update().get(id=auction_id)
+            if auction.status == 'active':
+                hot_bidding.warm_up(auction)
+                warmed_count += 1
 
-    return f"Активировано аукционов: {activated_count}"
+    return f"Переведено в быстрый режим: {warmed_count}"
 
 
 @shared_task
-def cancel_unpaid_auctions():
+def persist_hot_bids():
     """
-    Отменяет неоплаченные аукционы через 24 часа после создания
+    Переносит ставки горячих аукционов из потоков Redis в таблицу Bid
+    и завершает аукционы, которые закончились
     """
-    from datetime import timedelta
+    if not hot_bidding.is_enabled():
+        return "Быстрый режим ставок выключен"
 
-    cutoff_time = timezone.now() - timedelta(hours=24)
+    persisted_count = 0
+    finished_count = 0
 
-    unpaid_auctions = Auction.objects.filter(
-        status='pending_payment',
-        is_paid=False,
-        created_at__lte=cutoff_time
-    )
+    for auction_id in hot_bidding.get_redis().smembers(hot_bidding.HOT_SET_KEY):
+        persisted_count += hot_bidding.persist_bids(int(auction_id))
+        if hot_bidding.finish_if_over(int(auction_id)):
+            finished_count += 1
 
-    cancelled_count = unpaid_auctions.count()
+    return f"Записано ставок: {persisted_count}, завершено аукционов: {finished_count}"
 
-    for auction in unpaid_auctions:
-        auction.status = 'cancelled'
-        auction.save()
 
-    return f"Отменено неоплаченных аукционов: {cancelled_count}"
+@shared_task
+def dispatch_auction_schedule():
+    """
+    Выполняет наступившие записи планировщика (начало и окончание аукционов)
+    Запускается каждую секунду через Celery Beat
+    """
+    activated_count, completed_count = dispatch_due()
+    return f"Активировано: {activated_count}, завершено: {completed_count}"
+
+
+@shared_task
+def deliver_telegram_outbox():
+    """
+    Отправляет накопившиеся сообщения Telegram
+    Планируется после коммита записей в очередь (один запуск на пачку),
+    к ближайшей отложенной записи и каждые 30 секунд через Celery Beat
+    """
+    sent_count, failed_count = telegram_outbox.deliver_pending()
+    return f"Отправлено: {sent_count}, отложено: {failed_count}"
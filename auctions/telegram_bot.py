@@ -5,9 +5,16 @@ Telegram Bot для обработки callback от кнопок подтвер
 ==============
 
 1. POLLING (для разработки на localhost):
-   python auctions/telegram_bot.py
+   python auctions/telegram_bot.py [--workers 8]
 
-   Бот сам опрашивает Telegram каждые 30 сек.
+   Бот держит одно long-poll соединение с Telegram (getUpdates,
+   timeout 30 сек) и обрабатывает нажатия кнопок параллельно в пуле
+   из --workers обработчиков. Следующий getUpdates подтверждает
+   Telegram все полученные обновления, поэтому каждое нажатие сначала
+   записывается в Redis (telegram_bot:pending) и удаляется оттуда после
+   обработки; после перезапуска необработанные нажатия выполняются заново.
+
+   python auctions/telegram_bot.py --sync - старый последовательный режим
 
 2. WEBHOOK (для продакшена на сервере):
    Один раз выполните команду для регистрации webhook:
@@ -29,76 +36,29 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 django.setup()
 
+import asyncio
+import json
 import requests
 import time
-from auctions.models import ManualPayment
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import close_old_connections
+from core.redis_client import get_redis
+from auctions.telegram_callbacks import handle_payment_callback
 from auctions.telegram_service import TelegramService
 
 
 def process_callback(callback_query):
     """Обработка callback от кнопок"""
-    callback_id = callback_query['id']
     callback_data = callback_query.get('data', '')
 
     print(f"Received callback: {callback_data}")
 
-    # Подтверждение платежа
-    if callback_data.startswith('confirm_'):
-        payment_id = int(callback_data.replace('confirm_', ''))
-        try:
-            payment = ManualPayment.objects.get(id=payment_id)
-            if payment.status == 'waiting_confirmation':
-                payment.confirm()
-                TelegramService.update_payment_status(payment, confirmed=True)
-                TelegramService.answer_callback_query(
-                    callback_id,
-                    '✅ Платеж подтвержден! Аукцион активирован.',
-                    show_alert=True
-                )
-                print(f"✅ Payment {payment_id} confirmed!")
-            else:
-                TelegramService.answer_callback_query(
-                    callback_id,
-                    f'Платеж уже обработан: {payment.get_status_display()}',
-                    show_alert=True
-                )
-        except ManualPayment.DoesNotExist:
-            TelegramService.answer_callback_query(
-                callback_id,
-                'Платеж не найден',
-                show_alert=True
-            )
-
-    # Отклонение платежа
-    elif callback_data.startswith('reject_'):
-        payment_id = int(callback_data.replace('reject_', ''))
-        try:
-            payment = ManualPayment.objects.get(id=payment_id)
-            if payment.status == 'waiting_confirmation':
-                payment.reject('Отклонено администратором')
-                TelegramService.update_payment_status(
-                    payment,
-                    confirmed=False,
-                    reason='Отклонено администратором'
-                )
-                TelegramService.answer_callback_query(
-                    callback_id,
-                    '❌ Платеж отклонен',
-                    show_alert=True
-                )
-                print(f"❌ Payment {payment_id} rejected!")
-            else:
-                TelegramService.answer_callback_query(
-                    callback_id,
-                    f'Платеж уже обработан: {payment.get_status_display()}',
-                    show_alert=True
-                )
-        except ManualPayment.DoesNotExist:
-            TelegramService.answer_callback_query(
-                callback_id,
-                'Платеж не найден',
-                show_alert=True
-            )
+    text = handle_payment_callback(callback_data)
+    if text:
+        TelegramService.answer_callback_query(callback_query['id'], text, show_alert=True)
+        print(f"Payment callback {callback_data}: {text}")
 
 
 def run_polling():
@@ -137,6 +97,162 @@ def run_polling():
             time.sleep(5)
 
 
+OFFSET_CACHE_KEY = 'telegram_bot:offset'
+# hash: update_id -> JSON обновления, полученного, но еще не обработанного
+PENDING_KEY = 'telegram_bot:pending'
+POLL_TIMEOUT = 30
+
+
+def _handle_callback_sync(callback_data):
+    """ORM-часть обработки; выполняется в отдельном потоке со своим соединением"""
+    try:
+        return handle_payment_callback(callback_data)
+    finally:
+        close_old_connections()
+
+
+class AsyncPollingBot:
+    """
+    Long-poll getUpdates + пул обработчиков callback_query
+
+    Запросы к Telegram идут через один requests.Session (keep-alive)
+    в потоках asyncio.to_thread, работа с БД - через sync_to_async.
+    Пока обработчики заняты, опрос продолжается; очередь ограничена,
+    поэтому при перегрузке опрос ждет свободного места.
+
+    getUpdates с новым offset удаляет у Telegram все предыдущие
+    обновления, поэтому offset сдвигается только после записи пачки
+    в PENDING_KEY. Если Redis недоступен, offset не сдвигается и
+    Telegram отдаст те же обновления повторно.
+    """
+
+    def __init__(self, workers=8):
+        self.workers = workers
+        self.base_url = f'https://api.telegram.org/bot{TelegramService.BOT_TOKEN}'
+        self.session = requests.Session()
+        self.queue = asyncio.Queue(maxsize=workers * 4)
+        self.offset = cache.get(OFFSET_CACHE_KEY, 0)
+
+    async def run(self):
+        print(f"🤖 Telegram Bot started (async polling, workers: {self.workers}, offset: {self.offset})")
+        print("Press Ctrl+C to stop\n")
+
+        # Потоки для обработчиков и для long-poll запроса
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=self.workers + 2)
+        )
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        try:
+            await self._resume_pending()
+            await self._poll()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self.session.close()
+
+    async def _poll(self):
+        while True:
+            try:
+                updates = await asyncio.to_thread(self._get_updates)
+            except requests.exceptions.Timeout:
+                continue
+            except Exception as e:
+                print(f"Error: {e}")
+                await asyncio.sleep(5)
+                continue
+
+            callbacks = [update for update in updates if 'callback_query' in update]
+            try:
+                await asyncio.to_thread(self._store_pending, callbacks)
+            except Exception as e:
+                # Offset не сдвигаем - Telegram пришлет эти обновления еще раз
+                print(f"Pending store error: {e}")
+                await asyncio.sleep(5)
+                continue
+
+            if updates:
+                self.offset = updates[-1]['update_id'] + 1
+            for update in callbacks:
+                await self.queue.put(update)
+            await self._save_offset()
+
+    async def _resume_pending(self):
+        """Нажатия, полученные до перезапуска, но не обработанные"""
+        pending = await asyncio.to_thread(get_redis().hvals, PENDING_KEY)
+        updates = sorted((json.loads(value) for value in pending), key=lambda update: update['update_id'])
+        if updates:
+            print(f"Resuming {len(updates)} pending callbacks")
+        for update in updates:
+            await self.queue.put(update)
+
+    def _store_pending(self, updates):
+        if updates:
+            get_redis().hset(PENDING_KEY, mapping={
+                update['update_id']: json.dumps(update) for update in updates
+            })
+
+    def _done(self, update_id):
+        try:
+            get_redis().hdel(PENDING_KEY, update_id)
+        except Exception as e:
+            print(f"Pending delete error: {e}")
+
+    def _get_updates(self):
+        response = self.session.get(
+            f'{self.base_url}/getUpdates',
+            params={
+                'offset': self.offset,
+                'timeout': POLL_TIMEOUT,
+                'allowed_updates': '["callback_query"]',
+            },
+            timeout=POLL_TIMEOUT + 5
+        )
+        data = response.json()
+        return data.get('result', []) if data.get('ok') else []
+
+    async def _worker(self):
+        while True:
+            update = await self.queue.get()
+            try:
+                await self._process(update['callback_query'])
+            except Exception as e:
+                print(f"Callback error: {e}")
+            # При остановке (CancelledError) обновление остается в PENDING_KEY
+            # и будет обработано после перезапуска
+            await asyncio.to_thread(self._done, update['update_id'])
+            self.queue.task_done()
+
+    async def _process(self, callback_query):
+        callback_data = callback_query.get('data', '')
+        print(f"Received callback: {callback_data}")
+
+        text = await sync_to_async(_handle_callback_sync, thread_sensitive=False)(callback_data)
+        if text:
+            await asyncio.to_thread(
+                self.session.post,
+                f'{self.base_url}/answerCallbackQuery',
+                json={'callback_query_id': callback_query['id'], 'text': text, 'show_alert': True},
+                timeout=10
+            )
+            print(f"Payment callback {callback_data}: {text}")
+
+    async def _save_offset(self):
+        """Сохраняет offset: все обновления до него уже записаны в PENDING_KEY"""
+        try:
+            await sync_to_async(cache.set)(OFFSET_CACHE_KEY, self.offset, None)
+        except Exception as e:
+            print(f"Offset save error: {e}")
+
+
+def run_polling_async(workers=8):
+    """Запуск бота в режиме polling с параллельной обработкой"""
+    try:
+        asyncio.run(AsyncPollingBot(workers).run())
+    except KeyboardInterrupt:
+        print("\n👋 Bot stopped")
+
+
 def set_webhook(webhook_url):
     """Устанавливает webhook для Telegram бота"""
     base_url = f'https://api.telegram.org/bot{TelegramService.BOT_TOKEN}'
@@ -199,6 +315,8 @@ if __name__ == '__main__':
     parser.add_argument('--set-webhook', type=str, help='Установить webhook URL')
     parser.add_argument('--delete-webhook', action='store_true', help='Удалить webhook')
     parser.add_argument('--info', action='store_true', help='Информация о webhook')
+    parser.add_argument('--workers', type=int, default=8, help='Параллельных обработчиков callback')
+    parser.add_argument('--sync', action='store_true', help='Последовательный polling без asyncio')
 
     args = parser.parse_args()
 
@@ -208,6 +326,8 @@ if __name__ == '__main__':
         delete_webhook()
     elif args.info:
         get_webhook_info()
+    elif args.sync:
+        run_polling()
     else:
         # По умолчанию запускаем polling
-        run_polling()
+        run_polling_async(args.workers)
@@ -0,0 +1,46 @@
+"""
+Обработка нажатий кнопок "Подтвердить"/"Отклонить" под сообщением о платеже
+
+Общая для webhook (views.telegram_webhook) и polling (telegram_bot.py).
+Решение фиксируется в БД под блокировкой платежа, а редактирование
+сообщения уходит через очередь (telegram_outbox) после коммита.
+"""
+from django.db import transaction
+
+from . import telegram_outbox
+from .models import ManualPayment
+
+
+REJECT_REASON = 'Отклонено администратором'
+
+
+def handle_payment_callback(callback_data):
+    """
+    Args:
+        callback_data: 'confirm_<id>' или 'reject_<id>'
+
+    Returns:
+        str - текст ответа администратору (answerCallbackQuery) или None,
+        если callback не относится к платежам
+    """
+    action, _, payment_id = callback_data.partition('_')
+    if action not in ('confirm', 'reject') or not payment_id.isdigit():
+        return None
+
+    with transaction.atomic():
+        try:
+            payment = ManualPayment.objects.select_for_update().get(id=int(payment_id))
+        except ManualPayment.DoesNotExist:
+            return 'Платеж не найден'
+
+        if payment.status != 'waiting_confirmation':
+            return f'Платеж уже обработан: {payment.get_status_display()}'
+
+        if action == 'confirm':
+            payment.confirm()
+            telegram_outbox.notify_payment_status(payment, confirmed=True)
+            return '✅ Платеж подтвержден! Аукцион активирован.'
+
+        payment.reject(REJECT_REASON)
+        telegram_outbox.notify_payment_status(payment, confirmed=False, reason=REJECT_REASON)
+        return '❌ Платеж отклонен'
@@ -0,0 +1,270 @@
+"""
+Очередь исходящих сообщений Telegram (transactional outbox)
+
+API-запросы не ходят в Telegram: они только добавляют запись
+TelegramOutbox в своей транзакции. После коммита планируется
+Celery-задача deliver_telegram_outbox - одна на все записи, накопившиеся
+к ее запуску (уведомления отправляются пачкой, а не задачей на каждое).
+Задача:
+
+- забирает пачку записей (FOR UPDATE SKIP LOCKED + аренда на LEASE_SECONDS),
+- отправляет не больше одного сообщения в секунду в один чат: интервал
+  общий для всех воркеров (ключ в Redis), после 429 ключ живет retry_after.
+  Запись, для чата которой интервал не прошел, возвращается в очередь -
+  воркер не спит,
+- при ошибке откладывает запись с экспоненциальной задержкой,
+  после MAX_ATTEMPTS помечает ее failed,
+- планирует следующий запуск к ближайшей отложенной записи.
+
+Сообщения в один чат не склеиваются: каждое уведомление о платеже -
+отдельное сообщение со своим скриншотом и кнопками.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+from redis.exceptions import RedisError
+
+from core.redis_client import get_redis
+from .models import TelegramOutbox
+from .telegram_service import TelegramService
+
+
+BATCH_SIZE = 20
+MAX_ATTEMPTS = 8
+LEASE_SECONDS = 300
+
+# Telegram: не чаще одного сообщения в секунду в один чат
+MIN_CHAT_INTERVAL = 1.0
+
+# Запуск задачи уже запланирован - повторные enqueue новую не создают
+DELIVERY_SCHEDULED_KEY = 'telegram:outbox:scheduled'
+# Следующие отложенные записи дальше этого подхватит Celery Beat
+MAX_SCHEDULE_DELAY = 30
+
+
+def chat_key(chat_id):
+    """Ключ живет, пока в чат нельзя отправлять"""
+    return f'telegram:chat:{chat_id}:throttle'
+
+
+class RetryLater(Exception):
+    """Отправку нужно повторить позже (429 или еще не готовы данные)"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# ==================== ПОСТАНОВКА В ОЧЕРЕДЬ ====================
+
+def enqueue(kind, chat_id=None, payment=None, payload=None):
+    """Добавляет сообщение в очередь; отправка начнется после коммита"""
+    from .tasks import deliver_telegram_outbox
+
+    item = TelegramOutbox.objects.create(
+        kind=kind,
+        chat_id=str(chat_id or TelegramService.ADMIN_CHAT_ID),
+        payment=payment,
+        payload=payload or {},
+    )
+    transaction.on_commit(schedule_delivery)
+    return item
+
+
+def schedule_delivery(delay=0):
+    """Планирует deliver_telegram_outbox, если запуск еще не запланирован"""
+    from .tasks import deliver_telegram_outbox
+
+    delay = max(int(delay), 0)
+    try:
+        if not get_redis().set(DELIVERY_SCHEDULED_KEY, 1, nx=True, ex=delay + LEASE_SECONDS):
+            return
+    except RedisError as e:
+        print(f'Telegram outbox schedule error: {e}')
+    deliver_telegram_outbox.apply_async(countdown=delay)
+
+
+def notify_new_payment(payment):
+    """Скриншот оплаты админу с кнопками подтверждения"""
+    return enqueue('payment_new', payment=payment)
+
+
+def notify_payment_status(payment, confirmed=True, reason=''):
+    """Обновление сообщения о платеже после решения админа"""
+    return enqueue('payment_status', payment=payment, payload={
+        'confirmed': confirmed,
+        'reason': reason,
+    })
+
+
+# ==================== ОТПРАВКА ====================
+
+def claim_batch(limit=BATCH_SIZE):
+    """
+    Забирает пачку записей к отправке
+
+    Запись арендуется (status=sending, next_attempt_at = now + LEASE_SECONDS):
+    если воркер упадет, после окончания аренды ее заберет другой.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        items = list(
+            TelegramOutbox.objects.filter(
+                Q(status='pending') | Q(status='sending'),
+                next_attempt_at__lte=now
+            ).select_for_update(skip_locked=True).order_by('id')[:limit]
+        )
+        if items:
+            TelegramOutbox.objects.filter(id__in=[item.id for item in items]).update(
+                status='sending',
+                next_attempt_at=now + timedelta(seconds=LEASE_SECONDS)
+            )
+    return items
+
+
+def deliver_pending(limit=BATCH_SIZE):
+    """
+    Отправляет одну пачку
+
+    Returns:
+        (sent, failed) - количество отправленных и отложенных/неудачных
+    """
+    try:
+        # Записи, добавленные во время отправки, запланируют новый запуск
+        get_redis().delete(DELIVERY_SCHEDULED_KEY)
+    except RedisError as e:
+        print(f'Telegram outbox schedule error: {e}')
+
+    items = claim_batch(limit)
+    sent = failed = 0
+
+    for item in items:
+        wait = _reserve_chat(item.chat_id)
+        if wait:
+            # В этот чат недавно отправляли (или Telegram ответил 429)
+            _release([item], wait)
+            continue
+
+        try:
+            _send(item)
+        except RetryLater as e:
+            if e.retry_after:
+                _throttle_chat(item.chat_id, e.retry_after)
+            _reschedule(item, str(e), e.retry_after)
+            failed += 1
+            continue
+        except Exception as e:
+            _reschedule(item, str(e))
+            failed += 1
+            continue
+
+        TelegramOutbox.objects.filter(id=item.id).update(
+            status='sent', sent_at=timezone.now(), last_error=''
+        )
+        sent += 1
+
+    _schedule_next()
+    return sent, failed
+
+
+def _reserve_chat(chat_id):
+    """
+    Занимает интервал отправки в чат
+
+    Returns:
+        0 - можно отправлять, иначе сколько секунд ждать
+    """
+    try:
+        r = get_redis()
+        if r.set(chat_key(chat_id), 1, nx=True, px=int(MIN_CHAT_INTERVAL * 1000)):
+            return 0
+        return max(r.pttl(chat_key(chat_id)), 1) / 1000
+    except RedisError as e:
+        # Без Redis отправляем без паузы - 429 все равно отложит запись
+        print(f'Telegram outbox throttle error: {e}')
+        return 0
+
+
+def _throttle_chat(chat_id, retry_after):
+    try:
+        get_redis().set(chat_key(chat_id), 1, ex=int(retry_after))
+    except RedisError as e:
+        print(f'Telegram outbox throttle error: {e}')
+
+
+def _schedule_next():
+    """Следующий запуск - к ближайшей отложенной записи"""
+    next_attempt_at = TelegramOutbox.objects.filter(status='pending').aggregate(
+        next_at=Min('next_attempt_at')
+    )['next_at']
+    if next_attempt_at is None:
+        return
+    delay = (next_attempt_at - timezone.now()).total_seconds()
+    if delay <= MAX_SCHEDULE_DELAY:
+        schedule_delivery(max(delay, 0) + 1)
+
+
+def _send(item):
+    if item.kind == 'payment_new':
+        result = TelegramService.notify_new_payment(item.payment)
+    elif item.kind == 'payment_status':
+        result = _send_payment_status(item)
+    else:
+        raise ValueError(f'Неизвестный тип сообщения: {item.kind}')
+
+    _check_result(result)
+
+
+def _send_payment_status(item):
+    payment = item.payment
+    payment.refresh_from_db(fields=['telegram_message_id'])
+
+    if not payment.telegram_message_id:
+        # Исходное сообщение со скриншотом еще в очереди - ждем его
+        if TelegramOutbox.objects.filter(
+            payment=payment, kind='payment_new', status__in=['pending', 'sending']
+        ).exists():
+            raise RetryLater('Сообщение о платеже еще не отправлено')
+        # Исходное сообщение не ушло - редактировать нечего
+        return {'ok': True}
+
+    return TelegramService.update_payment_status(
+        payment,
+        confirmed=item.payload.get('confirmed', True),
+        reason=item.payload.get('reason', '')
+    )
+
+
+def _check_result(result):
+    if result is None:
+        raise Exception('Нет ответа от Telegram')
+    if result.get('ok'):
+        return
+    if result.get('error_code') == 429:
+        retry_after = (result.get('parameters') or {}).get('retry_after', 30)
+        raise RetryLater('Too Many Requests', retry_after=retry_after)
+    raise Exception(result.get('description', 'Ошибка Telegram'))
+
+
+def _reschedule(item, error, retry_after=None):
+    item.attempts += 1
+    item.last_error = error[:1000]
+    if item.attempts >= MAX_ATTEMPTS:
+        item.status = 'failed'
+    else:
+        item.status = 'pending'
+        delay = retry_after or min(10 * 2 ** item.attempts, 3600)
+        item.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+    item.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def _release(items, delay):
+    """Возвращает неотправленные записи в очередь без увеличения attempts"""
+    if not items:
+        return
+    TelegramOutbox.objects.filter(id__in=[item.id for item in items]).update(
+        status='pending',
+        next_attempt_at=timezone.now() + timedelta(seconds=delay)
+    )
@@ -0,0 +1,181 @@
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.db import close_old_connections, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from properties.models import Property
+from users.models import User
+from .bidding import BidError, place_bid
+from .click_service import ClickService
+from .models import Auction, AuctionPayment, Bid, ClickTransaction
+
+
+def create_user(name):
+    return User.objects.create(username=name, email=f'{name}@example.com', full_name=name)
+
+
+def create_auction(organizer, **fields):
+    property_obj = Property(
+        owner=organizer,
+        title='Test',
+        description='Test',
+        address='Test',
+        latitude=0.0,
+        longitude=0.0,
+        area=50,
+        rooms=2,
+        price=Decimal('1000000.00'),
+    )
+    # Без геокодинга и поиска ориентиров
+    super(Property, property_obj).save()
+
+    now = timezone.now()
+    defaults = {
+        'start_price': Decimal('1000000.00'),
+        'current_price': Decimal('1000000.00'),
+        'min_bid_increment': Decimal('1000.00'),
+        'end_type': 'time',
+        'start_time': now - timedelta(minutes=1),
+        'end_time': now + timedelta(hours=1),
+        'status': 'active',
+        'is_paid': True,
+    }
+    defaults.update(fields)
+    return Auction.objects.create(property=property_obj, organizer=organizer, **defaults)
+
+
+class PlaceBidTests(TestCase):
+    def setUp(self):
+        self.organizer = create_user('organizer')
+        self.bidder = create_user('bidder')
+        self.other = create_user('other')
+        self.auction = create_auction(self.organizer)
+
+    def test_bid_updates_auction_in_same_transaction(self):
+        bid, auction = place_bid(self.auction.id, self.bidder, Decimal('1001000.00'))
+
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.current_price, Decimal('1001000.00'))
+        self.assertEqual(self.auction.bid_count, 1)
+        self.assertEqual(self.auction.highest_bid_id, bid.id)
+        self.assertEqual(self.auction.last_bid_at, bid.bid_time)
+
+    def test_bid_against_stale_price_is_rejected(self):
+        place_bid(self.auction.id, self.bidder, Decimal('1001000.00'))
+
+        # Второй участник видел старую цену и ставит ту же сумму
+        with self.assertRaises(BidError):
+            place_bid(self.auction.id, self.other, Decimal('1001000.00'))
+
+        self.auction.refresh_from_db()
+        self.assertEqual(self.auction.bid_count, 1)
+        self.assertEqual(Bid.objects.filter(auction=self.auction).count(), 1)
+
+    def test_bid_below_increment_is_rejected(self):
+        with self.assertRaises(BidError):
+            place_bid(self.auction.id, self.bidder, Decimal('1000500.00'))
+
+    def test_organizer_cannot_bid(self):
+        with self.assertRaises(BidError):
+            place_bid(self.auction.id, self.organizer, Decimal('1001000.00'))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'SELECT ... FOR UPDATE проверяется только на PostgreSQL')
+class ConcurrentBidTests(TransactionTestCase):
+    def test_only_one_of_equal_parallel_bids_is_accepted(self):
+        organizer = create_user('organizer')
+        bidders = [create_user(f'bidder_{i}') for i in range(8)]
+        auction = create_auction(organizer)
+        barrier = threading.Barrier(len(bidders))
+        accepted = []
+
+        def bid(user):
+            try:
+                barrier.wait()
+                place_bid(auction.id, user, Decimal('1001000.00'))
+                accepted.append(user.id)
+            except BidError:
+                pass
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=bid, args=(user,)) for user in bidders]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        auction.refresh_from_db()
+        self.assertEqual(len(accepted), 1)
+        self.assertEqual(auction.bid_count, 1)
+        self.assertEqual(Bid.objects.filter(auction=auction).count(), 1)
+
+
+@override_settings(CLICK_SERVICE_ID='1000', CLICK_SECRET_KEY='secret')
+class ClickIdempotencyTests(TestCase):
+    def setUp(self):
+        organizer = create_user('organizer')
+        auction = create_auction(
+            organizer,
+            status='pending_payment',
+            is_paid=False,
+            start_time=timezone.now() + timedelta(hours=1),
+            end_time=timezone.now() + timedelta(hours=2),
+        )
+        self.payment = AuctionPayment.objects.create(
+            auction=auction,
+            user=organizer,
+            merchant_trans_id=ClickService.generate_merchant_trans_id(),
+            amount=Decimal('50000.00'),
+        )
+
+    def request_args(self, click_trans_id, action):
+        args = {
+            'click_trans_id': click_trans_id,
+            'service_id': '1000',
+            'click_paydoc_id': f'PAYDOC_{click_trans_id}',
+            'merchant_trans_id': self.payment.merchant_trans_id,
+            'amount': str(self.payment.amount),
+            'action': str(action),
+            'sign_time': '2024-01-01 00:00:00',
+            'sign_string': ClickService.verify_signature(
+                self.payment.merchant_trans_id, '1000', 'secret', click_trans_id
+            ),
+        }
+        if action == 1:
+            args.update(merchant_prepare_id=self.payment.id, error='0')
+        return args
+
+    def test_repeated_prepare_returns_stored_response(self):
+        first = ClickService.prepare(**self.request_args('900001', 0))
+        second = ClickService.prepare(**self.request_args('900001', 0))
+
+        self.assertEqual(first['error'], 0)
+        self.assertEqual(first, second)
+        self.assertEqual(ClickTransaction.objects.filter(payment=self.payment, action=0).count(), 1)
+
+    def test_repeated_complete_completes_payment_once(self):
+        ClickService.prepare(**self.request_args('900001', 0))
+        first = ClickService.complete(**self.request_args('900001', 1))
+        second = ClickService.complete(**self.request_args('900001', 1))
+
+        self.assertEqual((first['error'], first['error_note']), (0, 'Success'))
+        self.assertEqual(first, second)
+        self.assertEqual(ClickTransaction.objects.filter(payment=self.payment, action=1).count(), 1)
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'completed')
+        self.assertTrue(self.payment.auction.is_paid)
+        self.assertEqual(self.payment.auction.status, 'scheduled')
+
+    def test_second_click_transaction_does_not_complete_again(self):
+        ClickService.prepare(**self.request_args('900001', 0))
+        ClickService.complete(**self.request_args('900001', 1))
+        other = ClickService.complete(**self.request_args('900002', 1))
+
+        self.assertEqual(other['error_note'], 'Already confirmed')
+        self.assertEqual(ClickTransaction.objects.filter(payment=self.payment).count(), 3)
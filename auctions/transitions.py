@@ -0,0 +1,144 @@
+"""
+Массовые переходы статусов аукционов
+
+Каждый переход - один UPDATE по набору строк вместо цикла с save().
+Строки выбираются под FOR UPDATE SKIP LOCKED, поэтому параллельные
+воркеры (планировщик и сверочная задача) не обрабатывают одно и то же.
+События для SSE публикуются одной пачкой после коммита.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Auction
+from .realtime import publish_auction_events
+from .scheduling import unschedule_auction
+from . import hot_bidding
+
+
+def activate_due(auction_ids=None, now=None):
+    """Оплаченные запланированные аукционы, время которых наступило -> active"""
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        queryset = Auction.objects.filter(status='scheduled', is_paid=True, start_time__lte=now)
+        if auction_ids is not None:
+            queryset = queryset.filter(id__in=auction_ids)
+        rows = list(
+            queryset.select_for_update(skip_locked=True).values_list('id', 'current_price')
+        )
+        if not rows:
+            return 0
+
+        Auction.objects.filter(id__in=[auction_id for auction_id, _ in rows]).update(
+            status='active', updated_at=now
+        )
+        _publish_on_commit([
+            (auction_id, 'status', {'status': 'active', 'current_price': str(price), 'winner_name': None})
+            for auction_id, price in rows
+        ])
+
+    return len(rows)
+
+
+def cancel_unpaid(cutoff_time, now=None):
+    """Неоплаченные аукционы, созданные раньше cutoff_time -> cancelled"""
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        rows = list(
+            Auction.objects.filter(
+                status='pending_payment',
+                is_paid=False,
+                created_at__lte=cutoff_time
+            ).select_for_update(skip_locked=True).values_list('id', 'current_price')
+        )
+        if not rows:
+            return 0
+
+        Auction.objects.filter(id__in=[auction_id for auction_id, _ in rows]).update(
+            status='cancelled', updated_at=now
+        )
+        unschedule_auction(*[auction_id for auction_id, _ in rows])
+        _publish_on_commit([
+            (auction_id, 'status', {'status': 'cancelled', 'current_price': str(price), 'winner_name': None})
+            for auction_id, price in rows
+        ])
+
+    return len(rows)
+
+
+def complete_ended(auction_ids=None, now=None):
+    """
+    Завершает аукционы, закончившиеся по времени или по цене
+
+    Победители берутся из денормализованной лучшей ставки (highest_bid)
+    одним запросом и записываются bulk_update.
+    Горячие аукционы пропускаются - их завершает persist_hot_bids.
+
+    Returns:
+        list[int] - id завершенных аукционов
+    """
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        queryset = Auction.objects.ending(now)
+        if auction_ids is not None:
+            queryset = queryset.filter(id__in=auction_ids)
+        if hot_bidding.is_enabled():
+            queryset = queryset.exclude(id__in=_hot_auction_ids())
+
+        rows = dict(
+            queryset.select_for_update(skip_locked=True).values_list('id', 'current_price')
+        )
+        if not rows:
+            return []
+
+        # Лучшая ставка уже денормализована в аукционе - один JOIN
+        top_bids = Auction.objects.filter(
+            id__in=list(rows), highest_bid__isnull=False
+        ).values(
+            'id', 'highest_bid_id', 'highest_bid__bidder_id',
+            'highest_bid__amount', 'highest_bid__bidder__full_name'
+        )
+
+        winners = []
+        events = []
+        for row in top_bids:
+            winners.append(Auction(
+                id=row['id'],
+                status='completed',
+                winner_id=row['highest_bid__bidder_id'],
+                winning_bid_id=row['highest_bid_id'],
+                current_price=row['highest_bid__amount'],
+                updated_at=now,
+            ))
+            events.append((row['id'], 'status', {
+                'status': 'completed',
+                'current_price': str(row['highest_bid__amount']),
+                'winner_name': row['highest_bid__bidder__full_name'],
+            }))
+
+        Auction.objects.bulk_update(
+            winners, ['status', 'winner', 'winning_bid', 'current_price', 'updated_at']
+        )
+
+        # Аукционы без ставок завершаются без победителя
+        without_bids = set(rows) - {auction.id for auction in winners}
+        if without_bids:
+            Auction.objects.filter(id__in=without_bids).update(status='completed', updated_at=now)
+            events.extend(
+                (auction_id, 'status', {'status': 'completed', 'current_price': str(rows[auction_id]), 'winner_name': None})
+                for auction_id in without_bids
+            )
+
+        _publish_on_commit(events)
+
+    return list(rows)
+
+
+def _hot_auction_ids():
+    return [int(auction_id) for auction_id in hot_bidding.get_redis().smembers(hot_bidding.HOT_SET_KEY)]
+
+
+def _publish_on_commit(events):
+    transaction.on_commit(lambda: publish_auction_events(events))
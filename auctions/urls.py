@@ -1,7 +1,7 @@
 from django.urls import path
 from .views import (
-    AuctionListCreateView, AuctionDetailView,
-    bid_on_auction, initiate_payment,
+    AuctionListCreateView, AuctionDetailView, AuctionBidListView,
+    bid_on_auction, auction_events, auction_leaderboard, initiate_payment,
     click_prepare, click_complete,
     # Ручная оплата
     get_payment_info, upload_payment_screenshot,
@@ -17,6 +17,11 @@ urlpatterns = [
 
     # Ставки
     path('<int:auction_id>/bid/', bid_on_auction, name='bid-on-auction'),
+    path('<int:auction_id>/bids/', AuctionBidListView.as_view(), name='auction-bids'),
+    path('<int:auction_id>/leaderboard/', auction_leaderboard, name='auction-leaderboard'),
+
+    # События в реальном времени (SSE)
+    path('<int:auction_id>/events/', auction_events, name='auction-events'),
 
     # Платежи (Click - старое)
     path('<int:auction_id>/initiate-payment/', initiate_payment, name='initiate-payment'),
@@ -5,19 +5,42 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.parsers import MultiPartParser, FormParser
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
+from rest_framework.pagination import CursorPagination
+from django.db import transaction
+from django.db.models import Prefetch, Count, Max
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
-from decimal import Decimal
+from django.http import JsonResponse, StreamingHttpResponse
+from asgiref.sync import sync_to_async
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from django.core.handlers.asgi import ASGIRequest
+from decimal import Decimal, InvalidOperation
 import json
 
 from .models import Auction, Bid, AuctionPayment, ManualPayment
+from properties.models import PropertyImage
+from properties import favorites
+from core.conditional import ConditionalRetrieveMixin
+from users.authentication import CachedJWTAuthentication
 from .serializers import (
-    AuctionSerializer, BidSerializer, AuctionPaymentSerializer,
+    AuctionSerializer, AuctionListSerializer, BidSerializer, AuctionPaymentSerializer,
     ManualPaymentSerializer, PaymentInfoSerializer
 )
+from .bidding import place_bid, BidError
+from . import hot_bidding, leaderboard, telegram_outbox
+from .realtime import event_stream
+from .scheduling import schedule_auction
 from .click_service import ClickService
 from .telegram_service import TelegramService
+from .telegram_callbacks import handle_payment_callback
+
+
+class BidCursorPagination(CursorPagination):
+    """История ставок: курсор стабилен при новых ставках во время листания"""
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    ordering = '-id'
 
 
 class AuctionListCreateView(generics.ListCreateAPIView):
@@ -31,21 +54,31 @@ class AuctionListCreateView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         queryset = Auction.objects.select_related(
-            'property', 'organizer', 'winner'
-        ).prefetch_related('bids')
-
-        # Фильтр по активным аукционам
+            'property', 'organizer', 'winner', 'highest_bid__bidder'
+        ).prefetch_related(
+            Prefetch(
+                'property__images',
+                queryset=PropertyImage.objects.filter(is_cover=True),
+                to_attr='cover_images'
+            )
+        ).with_is_active()
+
+        # Фильтр по активным аукционам (условие is_active() в SQL)
         is_active = self.request.query_params.get('is_active')
         if is_active is not None:
             if is_active.lower() == 'true':
-                queryset = [auction for auction in queryset if auction.is_active()]
-                return queryset
+                queryset = queryset.active()
             elif is_active.lower() == 'false':
-                queryset = [auction for auction in queryset if not auction.is_active()]
-                return queryset
+                queryset = queryset.inactive()
 
         return queryset
 
+    def get_serializer_class(self):
+        # Список - компактный, создание отвечает полным аукционом
+        if self.request.method == 'GET':
+            return AuctionListSerializer
+        return AuctionSerializer
+
     def perform_create(self, serializer):
         auction = serializer.save(organizer=self.request.user)
 
@@ -59,7 +92,8 @@ class AuctionListCreateView(generics.ListCreateAPIView):
         )
 
 
-class AuctionDetailView(generics.RetrieveUpdateDestroyAPIView):
+class AuctionDetailView(ConditionalRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
+    """GET поддерживает If-None-Match / If-Modified-Since (304)"""
     serializer_class = AuctionSerializer
     permission_classes = [IsAuthenticated]
 
@@ -68,58 +102,108 @@ class AuctionDetailView(generics.RetrieveUpdateDestroyAPIView):
             'property', 'organizer', 'winner'
         ).prefetch_related('bids')
 
+    def get_validators(self):
+        """
+        updated_at аукциона и недвижимости, счетчики ставок и изображений,
+        is_active (зависит от времени), имена организатора, победителя и
+        владельца - один запрос
+        """
+        row = Auction.objects.with_is_active().filter(pk=self.kwargs['pk']).annotate(
+            image_count=Count('property__images'),
+            last_image_id=Max('property__images__id'),
+            last_processed_at=Max('property__images__processed_at'),
+        ).values_list(
+            'updated_at', 'bid_count', 'last_bid_at', 'current_price', 'is_active_now',
+            'property_id', 'property__updated_at', 'payment__status',
+            'image_count', 'last_image_id', 'last_processed_at',
+            'organizer__full_name', 'winner__full_name', 'property__owner__full_name',
+        ).first()
+        if row is None:
+            return None
+
+        property_id = row[5]
+        user = self.request.user
+        is_favorited = property_id in favorites.get_favorite_ids(user.id)
+        # Без Last-Modified: избранное, is_active, имена и удаление фото не меняют updated_at
+        return None, [*row, user.id, is_favorited]
+
+    def perform_update(self, serializer):
+        auction = serializer.save()
+        # Время начала/окончания могло измениться - переносим записи планировщика
+        schedule_auction(auction)
+
+
+class AuctionBidListView(generics.ListAPIView):
+    """
+    История ставок аукциона, от новых к старым
+    GET /api/auctions/<id>/bids/?cursor=...
+    """
+    serializer_class = BidSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = BidCursorPagination
+    filter_backends = []
 
-@api_view(['POST'])
+    def get_queryset(self):
+        return Bid.objects.filter(
+            auction_id=self.kwargs['auction_id']
+        ).select_related('bidder')
+
+
+@api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def bid_on_auction(request, auction_id):
-    """Сделать ставку на аукционе"""
-    try:
-        auction = Auction.objects.get(id=auction_id)
-    except Auction.DoesNotExist:
+def auction_leaderboard(request, auction_id):
+    """
+    Рейтинг участников аукциона из Redis
+    GET /api/auctions/<id>/leaderboard/?limit=10&minutes=30
+    """
+    auction = Auction.objects.filter(id=auction_id).values('id', 'bid_count').first()
+    if auction is None:
         return Response({'error': 'Аукцион не найден'}, status=status.HTTP_404_NOT_FOUND)
 
-    # Проверяем, что аукцион оплачен
-    if not auction.is_paid:
-        return Response({
-            'error': 'Аукцион еще не оплачен организатором'
-        }, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = min(max(int(request.query_params.get('limit', 10)), 1), 100)
+        minutes = min(max(int(request.query_params.get('minutes', 30)), 1), 24 * 60)
+    except ValueError:
+        return Response({'error': 'Неверные параметры'}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Проверяем статус аукциона
-    if auction.status not in ['active', 'scheduled']:
-        return Response({
-            'error': f'Нельзя делать ставки. Статус аукциона: {auction.get_status_display()}'
-        }, status=status.HTTP_400_BAD_REQUEST)
+    # Ключи истекли или еще не строились - собираем из БД один раз
+    if auction['bid_count'] and not leaderboard.is_built(auction_id):
+        leaderboard.rebuild(auction_id)
 
-    # Проверяем, что аукцион активен
-    if not auction.is_active():
-        return Response({'error': 'Аукцион не активен'}, status=status.HTTP_400_BAD_REQUEST)
+    data = leaderboard.get_leaderboard(
+        auction_id, limit=limit, user_id=request.user.id, minutes=minutes
+    )
+    return Response(data)
 
-    # Проверяем, что это не организатор
-    if request.user == auction.organizer:
-        return Response({
-            'error': 'Организатор не может делать ставки на своем аукционе'
-        }, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bid_on_auction(request, auction_id):
+    """Сделать ставку на аукционе"""
     amount = request.data.get('amount')
     if not amount:
         return Response({'error': 'Не указана сумма ставки'}, status=status.HTTP_400_BAD_REQUEST)
 
     try:
         amount = Decimal(str(amount))
-    except (ValueError, TypeError):
+    except (ValueError, TypeError, InvalidOperation):
         return Response({'error': 'Неверный формат суммы'}, status=status.HTTP_400_BAD_REQUEST)
 
-    if amount <= auction.current_price:
-        return Response({
-            'error': f'Ставка должна быть выше текущей цены ({auction.current_price})'
-        }, status=status.HTTP_400_BAD_REQUEST)
-
-    # Создаем ставку
-    bid = Bid.objects.create(
-        auction=auction,
-        bidder=request.user,
-        amount=amount
-    )
+    # Последние минуты аукциона: ставка принимается в Redis,
+    # в таблицу Bid ее пишет фоновая задача persist_hot_bids
+    if hot_bidding.is_enabled():
+        try:
+            queued = hot_bidding.place_bid(auction_id, request.user, amount)
+        except BidError as e:
+            return Response({'error': e.message}, status=e.status_code)
+        if queued is not None:
+            return Response(queued, status=status.HTTP_202_ACCEPTED)
+
+    # Проверка и запись ставки под блокировкой строки аукциона
+    try:
+        bid, auction = place_bid(auction_id, request.user, amount)
+    except BidError as e:
+        return Response({'error': e.message}, status=e.status_code)
 
     serializer = BidSerializer(bid)
     return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -311,13 +395,12 @@ def upload_payment_screenshot(request, auction_id):
             'error': 'Скриншот уже загружен и ожидает подтверждения'
         }, status=status.HTTP_400_BAD_REQUEST)
 
-    # Сохраняем скриншот
-    payment.screenshot = screenshot
-    payment.status = 'waiting_confirmation'
-    payment.save()
-
-    # Отправляем уведомление в Telegram (файл отправляется напрямую)
-    TelegramService.notify_new_payment(payment)
+    # Сохраняем скриншот; уведомление в Telegram отправит очередь после коммита
+    with transaction.atomic():
+        payment.screenshot = screenshot
+        payment.status = 'waiting_confirmation'
+        payment.save()
+        telegram_outbox.notify_new_payment(payment)
 
     serializer = ManualPaymentSerializer(payment, context={'request': request})
     return Response({
@@ -355,6 +438,51 @@ def check_payment_status(request, auction_id):
         })
 
 
+# ==================== СОБЫТИЯ В РЕАЛЬНОМ ВРЕМЕНИ ====================
+
+async def auction_events(request, auction_id):
+    """
+    Поток событий аукциона (Server-Sent Events) вместо опроса AuctionDetailView
+    GET /api/auctions/<id>/events/?token=<access token>
+
+    EventSource не умеет передавать заголовки, поэтому JWT - в query.
+    Первое событие - snapshot с текущим состоянием, затем bid/status.
+
+    Работает только под ASGI-сервером (см. config/asgi.py): под WSGI
+    бесконечный поток занял бы воркер навсегда и ничего не отдал бы
+    клиенту, поэтому там отвечаем 400 - клиент остается на опросе.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'Поток событий недоступен на этом сервере'}, status=400)
+
+    # Та же проверка, что у API: подпись, пользователь существует и активен
+    authentication = CachedJWTAuthentication()
+    try:
+        validated_token = authentication.get_validated_token(request.GET.get('token', ''))
+        await sync_to_async(authentication.get_user)(validated_token)
+    except AuthenticationFailed:
+        return JsonResponse({'error': 'Требуется авторизация'}, status=401)
+
+    snapshot = await Auction.objects.filter(pk=auction_id).values(
+        'id', 'status', 'current_price', 'end_time'
+    ).afirst()
+    if snapshot is None:
+        return JsonResponse({'error': 'Аукцион не найден'}, status=404)
+
+    if hot_bidding.is_enabled():
+        hot_price = await sync_to_async(hot_bidding.get_current_price)(auction_id)
+        if hot_price is not None:
+            snapshot['current_price'] = hot_price
+
+    response = StreamingHttpResponse(
+        event_stream(auction_id, snapshot),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx не должен буферизовать поток
+    return response
+
+
 # ==================== TELEGRAM WEBHOOK ====================
 
 @csrf_exempt
@@ -364,66 +492,18 @@ def telegram_webhook(request):
     """Webhook для обработки callback от Telegram бота"""
     data = request.data
 
-    # Обрабатываем callback_query (нажатие кнопок)
+    # Обрабатываем callback_query (нажатие кнопок).
+    # Ответ на нажатие возвращается в теле ответа webhook - без
+    # отдельного запроса к Telegram; сообщение правит очередь.
     callback_query = data.get('callback_query')
     if callback_query:
-        callback_id = callback_query['id']
-        callback_data = callback_query.get('data', '')
-
-        # Подтверждение платежа
-        if callback_data.startswith('confirm_'):
-            payment_id = int(callback_data.replace('confirm_', ''))
-            try:
-                payment = ManualPayment.objects.get(id=payment_id)
-                if payment.status == 'waiting_confirmation':
-                    payment.confirm()
-                    TelegramService.update_payment_status(payment, confirmed=True)
-                    TelegramService.answer_callback_query(
-                        callback_id,
-                        'Платеж подтвержден!',
-                        show_alert=True
-                    )
-                else:
-                    TelegramService.answer_callback_query(
-                        callback_id,
-                        f'Платеж уже обработан: {payment.get_status_display()}',
-                        show_alert=True
-                    )
-            except ManualPayment.DoesNotExist:
-                TelegramService.answer_callback_query(
-                    callback_id,
-                    'Платеж не найден',
-                    show_alert=True
-                )
-
-        # Отклонение платежа
-        elif callback_data.startswith('reject_'):
-            payment_id = int(callback_data.replace('reject_', ''))
-            try:
-                payment = ManualPayment.objects.get(id=payment_id)
-                if payment.status == 'waiting_confirmation':
-                    payment.reject('Отклонено администратором')
-                    TelegramService.update_payment_status(
-                        payment,
-                        confirmed=False,
-                        reason='Отклонено администратором'
-                    )
-                    TelegramService.answer_callback_query(
-                        callback_id,
-                        'Платеж отклонен',
-                        show_alert=True
-                    )
-                else:
-                    TelegramService.answer_callback_query(
-                        callback_id,
-                        f'Платеж уже обработан: {payment.get_status_display()}',
-                        show_alert=True
-                    )
-            except ManualPayment.DoesNotExist:
-                TelegramService.answer_callback_query(
-                    callback_id,
-                    'Платеж не найден',
-                    show_alert=True
-                )
+        text = handle_payment_callback(callback_query.get('data', ''))
+        if text:
+            return Response({
+                'method': 'answerCallbackQuery',
+                'callback_query_id': callback_query['id'],
+                'text': text,
+                'show_alert': True,
+            })
 
     return Response({'ok': True})
@@ -5,6 +5,11 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+
+Поток событий аукционов (SSE, auctions/realtime.py) держит соединение
+открытым, поэтому его нужно обслуживать ASGI-сервером, например:
+    uvicorn config.asgi:application --workers 4
+Под WSGI каждый слушатель занимал бы отдельный поток воркера.
 """
 
 import os
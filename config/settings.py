@@ -144,6 +144,17 @@ MEDIA_ROOT = BASE_DIR / 'media'
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 
+# Загрузка частями (/api/uploads/) - файл пишется на диск блоками, не в память
+CHUNKED_UPLOAD_TEMP_DIR = BASE_DIR / 'tmp' / 'uploads'
+CHUNKED_UPLOAD_MAX_SIZE = 50 * 1024 * 1024  # 50MB
+
+# Варианты изображений недвижимости (длинная сторона, px) - WebP + JPEG
+PROPERTY_IMAGE_VARIANTS = {
+    'thumb': 320,   # Карточки в списках
+    'card': 640,    # Галерея на мобильных
+    'large': 1280,  # Полноэкранный просмотр
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # ✅ CORS settings - ОЧЕНЬ ВАЖНО!
@@ -169,7 +180,7 @@ CORS_ALLOW_HEADERS = [
 # ✅ REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',  # ✅ Важно!
@@ -177,6 +188,10 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
+    'DEFAULT_THROTTLE_RATES': {
+        # Показы и клики рекламы: на клиента, объявление и событие
+        'ad_tracking': '30/min',
+    },
 }
 
 # JWT settings
@@ -230,6 +245,13 @@ CACHES = {
     }
 }
 
+# Прямой клиент Redis для оперативных данных (core/redis_client.py)
+REDIS_URL = 'redis://localhost:6379/2'
+
+# Быстрый режим ставок через Redis для аукционов в последние минуты (auctions/hot_bidding.py)
+AUCTION_HOT_PATH_ENABLED = False
+AUCTION_HOT_PATH_WINDOW = 300  # секунд до окончания
+
 # ==================== CELERY ====================
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
@@ -240,19 +262,59 @@ CELERY_TIMEZONE = TIME_ZONE
 
 # Celery Beat - расписание периодических задач
 CELERY_BEAT_SCHEDULE = {
-    # Активация запланированных аукционов - каждые 30 секунд
+    # Начало и окончание аукционов по расписанию в Redis - каждую секунду
+    'dispatch-auction-schedule': {
+        'task': 'auctions.tasks.dispatch_auction_schedule',
+        'schedule': 1.0,  # каждую секунду
+    },
+    # Сверка: активация пропущенных планировщиком аукционов - каждые 5 минут
     'activate-scheduled-auctions': {
         'task': 'auctions.tasks.activate_scheduled_auctions',
-        'schedule': 30.0,  # каждые 30 секунд
+        'schedule': 300.0,  # каждые 5 минут
     },
-    # Проверка и завершение аукционов - каждую минуту
+    # Сверка: завершение пропущенных планировщиком аукционов - каждые 5 минут
     'check-and-complete-auctions': {
         'task': 'auctions.tasks.check_and_complete_auctions',
-        'schedule': 60.0,  # каждые 60 секунд
+        'schedule': 300.0,  # каждые 5 минут
     },
     # Отмена неоплаченных аукционов - каждый час
     'cancel-unpaid-auctions': {
         'task': 'auctions.tasks.cancel_unpaid_auctions',
         'schedule': 3600.0,  # каждый час
     },
+    # Повторная отправка отложенных сообщений Telegram - каждые 30 секунд
+    'deliver-telegram-outbox': {
+        'task': 'auctions.tasks.deliver_telegram_outbox',
+        'schedule': 30.0,  # каждые 30 секунд
+    },
+    # Перенос показов и кликов рекламы из Redis в БД - каждые 10 секунд
+    'flush-ad-counters': {
+        'task': 'advertisements.tasks.flush_ad_counters',
+        'schedule': 10.0,  # каждые 10 секунд
+    },
+    # Очистка брошенных загрузок частями - каждый час
+    'cleanup-stale-uploads': {
+        'task': 'core.tasks.cleanup_stale_uploads',
+        'schedule': 3600.0,  # каждый час
+    },
+    # Очистка старых tombstone заявок на контакт - раз в сутки
+    'purge-contact-request-tombstones': {
+        'task': 'properties.tasks.purge_contact_request_tombstones',
+        'schedule': 86400.0,  # раз в сутки
+    },
 }
+
+# Задачи быстрого режима ставок - только если он включен
+if AUCTION_HOT_PATH_ENABLED:
+    CELERY_BEAT_SCHEDULE.update({
+        # Перевод аукционов в быстрый режим ставок - каждые 15 секунд
+        'warm-hot-auctions': {
+            'task': 'auctions.tasks.warm_hot_auctions',
+            'schedule': 15.0,  # каждые 15 секунд
+        },
+        # Запись ставок горячих аукционов из Redis в БД - каждую секунду
+        'persist-hot-bids': {
+            'task': 'auctions.tasks.persist_hot_bids',
+            'schedule': 1.0,  # каждую секунду
+        },
+    })
@@ -27,6 +27,7 @@ urlpatterns = [
     path('api/mortgages/', include('mortgages.urls')),
     path('api/contracts/', include('contracts.urls')),
     path('api/ads/', include('advertisements.urls')),
+    path('api/uploads/', include('core.urls')),
 ]
 
 if settings.DEBUG:
@@ -1,3 +1,10 @@
 from django.contrib import admin
+from .models import UploadSession
 
-# Register your models here.
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'target', 'object_id', 'filename', 'received_size', 'total_size', 'status', 'created_at']
+    list_filter = ['target', 'status', 'created_at']
+    search_fields = ['filename', 'user__full_name']
+    readonly_fields = ['received_size', 'stored_name', 'created_at', 'updated_at']
@@ -0,0 +1,65 @@
+"""
+Условные GET-запросы (ETag / Last-Modified) для детальных эндпоинтов
+
+Перед сериализацией объекта одним легким запросом (values_list)
+читаются поля, от которых зависит ответ: updated_at и счетчики
+связанных записей. Из них строится слабый ETag (и Last-Modified, если
+он есть). Если клиент прислал совпадающий If-None-Match (или
+If-Modified-Since), ответ 304 отдается без загрузки объекта и без
+сериализации.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+
+def make_etag(parts):
+    """Слабый ETag из значений, от которых зависит ответ"""
+    fingerprint = '|'.join(
+        value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        for value in parts
+    )
+    return 'W/"' + hashlib.md5(fingerprint.encode()).hexdigest() + '"'
+
+
+class ConditionalRetrieveMixin:
+    """
+    Добавляет в retrieve() поддержку If-None-Match / If-Modified-Since
+
+    View обязана реализовать get_validators() (проверяется при объявлении
+    класса): возвращает (last_modified, parts) или None, если объекта нет
+    (тогда обычный retrieve ответит 404).
+    parts должны включать все, что меняет ответ, в том числе данные
+    текущего пользователя, если они есть в ответе.
+
+    last_modified - None, если ответ меняется без изменения меток
+    времени (избранное, данные связанных объектов, удаленные строки):
+    клиент без ETag по If-Modified-Since получил бы устаревший 304.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        # Без get_validators view упал бы только на первом GET
+        super().__init_subclass__(**kwargs)
+        if not callable(getattr(cls, 'get_validators', None)):
+            raise TypeError(f'{cls.__name__}: ConditionalRetrieveMixin требует get_validators()')
+
+    def retrieve(self, request, *args, **kwargs):
+        validators = self.get_validators()
+        if validators is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        last_modified, parts = validators
+        etag = make_etag(parts)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        # Ответ зависит от пользователя (is_favorited, права)
+        patch_vary_headers(response, ['Authorization'])
+        return response
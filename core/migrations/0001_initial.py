@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:09
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('target', models.CharField(choices=[('property_image', 'Изображение недвижимости'), ('payment_screenshot', 'Скриншот оплаты')], max_length=30, verbose_name='Назначение')),
+                ('object_id', models.PositiveIntegerField(help_text='ID недвижимости или аукциона', verbose_name='ID объекта')),
+                ('filename', models.CharField(max_length=255, verbose_name='Имя файла')),
+                ('content_type', models.CharField(max_length=100, verbose_name='Тип файла')),
+                ('total_size', models.PositiveBigIntegerField(verbose_name='Размер файла')),
+                ('received_size', models.PositiveBigIntegerField(default=0, verbose_name='Получено байт')),
+                ('status', models.CharField(choices=[('uploading', 'Загружается'), ('attached', 'Привязан'), ('failed', 'Ошибка')], default='uploading', max_length=20, verbose_name='Статус')),
+                ('stored_name', models.CharField(blank=True, max_length=255, verbose_name='Путь в storage')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Сессия загрузки',
+                'verbose_name_plural': 'Сессии загрузки',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='core_upload_status_f56ba6_idx')],
+            },
+        ),
+    ]
@@ -1,2 +1,54 @@
 # Core app - общие модели и утилиты
-# В этом приложении могут быть общие модели, если понадобятся в будущем
+import uuid
+from django.db import models
+from users.models import User
+
+
+class UploadSession(models.Model):
+    """
+    Сессия загрузки файла частями (chunked, с докачкой)
+
+    Файл пишется во временную папку блоками, затем одним потоком
+    переносится в storage и привязывается к объекту после коммита
+    """
+    TARGET_CHOICES = [
+        ('property_image', 'Изображение недвижимости'),
+        ('payment_screenshot', 'Скриншот оплаты'),
+    ]
+    STATUS_CHOICES = [
+        ('uploading', 'Загружается'),
+        ('attached', 'Привязан'),
+        ('failed', 'Ошибка'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions', verbose_name='Пользователь')
+    target = models.CharField(max_length=30, choices=TARGET_CHOICES, verbose_name='Назначение')
+    object_id = models.PositiveIntegerField(verbose_name='ID объекта', help_text='ID недвижимости или аукциона')
+
+    filename = models.CharField(max_length=255, verbose_name='Имя файла')
+    content_type = models.CharField(max_length=100, verbose_name='Тип файла')
+    total_size = models.PositiveBigIntegerField(verbose_name='Размер файла')
+    received_size = models.PositiveBigIntegerField(default=0, verbose_name='Получено байт')
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading', verbose_name='Статус')
+    stored_name = models.CharField(max_length=255, blank=True, verbose_name='Путь в storage')
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
+
+    class Meta:
+        verbose_name = 'Сессия загрузки'
+        verbose_name_plural = 'Сессии загрузки'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.received_size}/{self.total_size})"
+
+    @property
+    def is_complete(self):
+        return self.received_size >= self.total_size
@@ -0,0 +1,59 @@
+"""
+Общее подключение к Redis для оперативных данных
+(горячие аукционы, счетчики, кэши множеств)
+
+Django cache (DB 1) и Celery (DB 0) используют свои подключения,
+здесь - прямой клиент для структур, которых нет в cache API:
+потоки, sorted set, Lua-скрипты.
+"""
+import uuid
+from contextlib import contextmanager
+
+import redis
+from django.conf import settings
+
+
+_client = None
+
+
+def get_redis():
+    """Возвращает общий клиент Redis (пул соединений внутри клиента)"""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            getattr(settings, 'REDIS_URL', 'redis://localhost:6379/2'),
+            decode_responses=True,
+        )
+    return _client
+
+
+# Удаляем блокировку, только если она все еще наша: задача, проработавшая
+# дольше TTL, не должна снять блокировку следующей
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+@contextmanager
+def redis_lock(key, ttl):
+    """
+    Блокировка SET NX EX с токеном
+
+        with redis_lock('some:lock', 60) as acquired:
+            if not acquired:
+                return
+
+    Yields:
+        bool - получена ли блокировка
+    """
+    r = get_redis()
+    token = uuid.uuid4().hex
+    acquired = bool(r.set(key, token, nx=True, ex=ttl))
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            r.eval(RELEASE_LOCK_SCRIPT, 1, key, token)
@@ -0,0 +1,35 @@
+from rest_framework import serializers
+from .models import UploadSession
+from .uploads import ALLOWED_CONTENT_TYPES, UPLOAD_BLOCK_SIZE, get_max_upload_size
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """Сериализатор для сессии загрузки частями"""
+    offset = serializers.IntegerField(source='received_size', read_only=True)
+    block_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'target', 'object_id', 'filename', 'content_type',
+            'total_size', 'offset', 'block_size', 'status', 'stored_name',
+            'error', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'status', 'stored_name', 'error', 'created_at', 'updated_at']
+
+    def get_block_size(self, obj):
+        """Рекомендуемый размер куска для клиента"""
+        return UPLOAD_BLOCK_SIZE * 16
+
+    def validate_content_type(self, value):
+        if value not in ALLOWED_CONTENT_TYPES:
+            raise serializers.ValidationError('Неверный формат файла. Разрешены: JPG, PNG, WEBP')
+        return value
+
+    def validate_total_size(self, value):
+        max_size = get_max_upload_size()
+        if value <= 0 or value > max_size:
+            raise serializers.ValidationError(
+                f'Размер файла должен быть от 1 байта до {max_size // (1024 * 1024)} MB'
+            )
+        return value
@@ -0,0 +1,28 @@
+from celery import shared_task
+from django.utils import timezone
+from .models import UploadSession
+
+
+@shared_task
+def cleanup_stale_uploads():
+    """
+    Удаляет брошенные загрузки частями (временные файлы и записи)
+    """
+    from datetime import timedelta
+    from .uploads import discard_upload
+
+    cutoff_time = timezone.now() - timedelta(hours=24)
+
+    stale_sessions = UploadSession.objects.filter(
+        status__in=['uploading', 'failed'],
+        updated_at__lte=cutoff_time
+    )
+
+    removed_count = 0
+    for session in stale_sessions:
+        discard_upload(session)
+        removed_count += 1
+
+    stale_sessions.delete()
+
+    return f"Удалено брошенных загрузок: {removed_count}"
@@ -0,0 +1,269 @@
+"""
+Загрузка файлов частями (chunked upload) с докачкой
+
+Клиент:
+1. POST   /api/uploads/                 - создать сессию (размер, тип, назначение)
+2. PUT    /api/uploads/<id>/            - отправить кусок (Content-Range: bytes 0-1048575/5242880)
+3. GET    /api/uploads/<id>/            - узнать offset после обрыва связи
+4. POST   /api/uploads/<id>/complete/   - перенести файл в storage и привязать к объекту
+
+Память воркера ограничена UPLOAD_BLOCK_SIZE независимо от размера файла,
+DB-транзакция открывается только на короткую привязку в конце.
+"""
+import os
+import re
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image
+
+
+UPLOAD_BLOCK_SIZE = 64 * 1024  # Читаем тело запроса блоками по 64KB
+
+ALLOWED_CONTENT_TYPES = ['image/jpeg', 'image/png', 'image/jpg', 'image/webp']
+
+# Куда переносится файл в storage (как upload_to у моделей)
+TARGET_UPLOAD_TO = {
+    'property_image': 'properties/',
+    'payment_screenshot': 'payment_screenshots/',
+}
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class UploadError(Exception):
+    """Ошибка загрузки с HTTP-статусом для ответа"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def get_max_upload_size():
+    return getattr(settings, 'CHUNKED_UPLOAD_MAX_SIZE', 50 * 1024 * 1024)
+
+
+def get_temp_path(session):
+    temp_dir = getattr(settings, 'CHUNKED_UPLOAD_TEMP_DIR', settings.BASE_DIR / 'tmp' / 'uploads')
+    os.makedirs(temp_dir, exist_ok=True)
+    return os.path.join(temp_dir, f'{session.id}.part')
+
+
+def parse_content_range(header, total_size):
+    """Разбирает 'bytes start-end/total', возвращает (start, end) включительно"""
+    match = CONTENT_RANGE_RE.match(header or '')
+    if not match:
+        raise UploadError('Неверный заголовок Content-Range')
+
+    start, end, total = (int(v) for v in match.groups())
+    if total != total_size or start > end or end >= total_size:
+        raise UploadError('Content-Range не совпадает с размером файла')
+    return start, end
+
+
+def write_chunk(session, stream, start, end):
+    """
+    Пишет кусок [start, end] во временный файл, читая поток блоками
+
+    Повторная отправка уже полученного куска безопасна - он перезаписывается
+    на том же смещении. Возвращает новый received_size.
+    """
+    from .models import UploadSession
+
+    if start > session.received_size:
+        raise UploadError(
+            f'Пропущены данные, продолжайте с байта {session.received_size}',
+            status_code=409
+        )
+
+    path = get_temp_path(session)
+    expected = end - start + 1
+    written = 0
+
+    mode = 'r+b' if os.path.exists(path) else 'wb'
+    with open(path, mode) as f:
+        f.seek(start)
+        while written < expected:
+            block = stream.read(min(UPLOAD_BLOCK_SIZE, expected - written)) if stream else b''
+            if not block:
+                break
+            f.write(block)
+            written += len(block)
+
+    new_size = max(session.received_size, start + written)
+
+    # Условный UPDATE: параллельный кусок не откатит offset назад
+    UploadSession.objects.filter(
+        pk=session.pk,
+        received_size__lte=new_size
+    ).update(received_size=new_size)
+    session.received_size = new_size
+
+    if written < expected:
+        raise UploadError(
+            f'Получено {written} из {expected} байт, продолжайте с байта {new_size}',
+            status_code=409
+        )
+
+    return new_size
+
+
+def finalize_upload(session):
+    """
+    Переносит временный файл в storage и привязывает к объекту
+
+    Файл копируется потоково (File.chunks), привязка идет
+    в отдельной короткой транзакции.
+    """
+    if session.status != 'uploading':
+        raise UploadError('Загрузка уже завершена')
+
+    if not session.is_complete:
+        raise UploadError(
+            f'Файл загружен не полностью: {session.received_size}/{session.total_size}',
+            status_code=409
+        )
+
+    path = get_temp_path(session)
+
+    # Проверяем, что это действительно изображение (читается только заголовок)
+    try:
+        with Image.open(path) as img:
+            img.verify()
+    except Exception:
+        _fail(session, 'Файл не является изображением')
+        raise UploadError('Файл не является изображением')
+
+    with open(path, 'rb') as f:
+        stored_name = default_storage.save(
+            TARGET_UPLOAD_TO[session.target] + os.path.basename(session.filename),
+            File(f)
+        )
+
+    error = None
+    with transaction.atomic():
+        # Повторный/параллельный complete не привяжет файл дважды
+        locked = type(session).objects.select_for_update().get(pk=session.pk)
+        if locked.status != 'uploading':
+            default_storage.delete(stored_name)
+            raise UploadError('Загрузка уже завершена')
+
+        try:
+            with transaction.atomic():
+                result = ATTACHERS[session.target](session, stored_name)
+        except UploadError as e:
+            error = e
+            session.status = 'failed'
+            session.error = e.message
+        else:
+            session.stored_name = stored_name
+            session.status = 'attached'
+        session.save(update_fields=['stored_name', 'status', 'error', 'updated_at'])
+
+    if error:
+        default_storage.delete(stored_name)
+        discard_upload(session)
+        raise error
+
+    os.remove(path)
+    return result
+
+
+def discard_upload(session):
+    """Удаляет временный файл сессии"""
+    path = get_temp_path(session)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _fail(session, message):
+    session.status = 'failed'
+    session.error = message
+    session.save(update_fields=['status', 'error', 'updated_at'])
+    discard_upload(session)
+
+
+# ==================== ПРИВЯЗКА К ОБЪЕКТАМ ====================
+
+def check_target_access(user, target, object_id):
+    """Проверяет, что пользователь может загружать файл для объекта"""
+    if target == 'property_image':
+        from properties.models import Property
+
+        owner_id = Property.objects.filter(id=object_id).values_list('owner_id', flat=True).first()
+        if owner_id is None:
+            raise UploadError('Объявление не найдено', status_code=404)
+        if owner_id != user.id:
+            raise UploadError('Вы не можете добавлять изображения к этому объявлению', status_code=403)
+
+    elif target == 'payment_screenshot':
+        from auctions.models import Auction
+
+        auction = Auction.objects.filter(id=object_id).values('organizer_id', 'is_paid').first()
+        if auction is None:
+            raise UploadError('Аукцион не найден', status_code=404)
+        if auction['organizer_id'] != user.id:
+            raise UploadError('Только организатор может загрузить скриншот оплаты', status_code=403)
+        if auction['is_paid']:
+            raise UploadError('Аукцион уже оплачен')
+
+    else:
+        raise UploadError('Неизвестное назначение файла')
+
+
+def _attach_property_image(session, stored_name):
+    from properties.models import Property
+    from properties.image_processing import attach_stored_images
+
+    # Права проверялись при создании сессии - за время загрузки объявление
+    # могли удалить или передать другому владельцу
+    property_obj = Property.objects.select_for_update().filter(id=session.object_id).first()
+    if property_obj is None:
+        raise UploadError('Объявление не найдено', status_code=404)
+    if property_obj.owner_id != session.user_id:
+        raise UploadError('Вы не можете добавлять изображения к этому объявлению', status_code=403)
+
+    image, = attach_stored_images(property_obj, [stored_name])
+    return {'image_id': image.id}
+
+
+def _attach_payment_screenshot(session, stored_name):
+    from auctions.models import Auction, ManualPayment
+    from auctions import telegram_outbox
+
+    auction = Auction.objects.select_for_update().filter(id=session.object_id).first()
+    if auction is None:
+        raise UploadError('Аукцион не найден', status_code=404)
+    if auction.organizer_id != session.user_id:
+        raise UploadError('Только организатор может загрузить скриншот оплаты', status_code=403)
+    if auction.is_paid:
+        raise UploadError('Аукцион уже оплачен')
+
+    payment, created = ManualPayment.objects.select_for_update().get_or_create(
+        auction=auction,
+        defaults={
+            'user': session.user,
+            'amount': auction.payment_amount
+        }
+    )
+
+    if payment.status == 'confirmed':
+        raise UploadError('Платеж уже подтвержден')
+    if payment.status == 'waiting_confirmation':
+        raise UploadError('Скриншот уже загружен и ожидает подтверждения')
+
+    payment.screenshot = stored_name
+    payment.status = 'waiting_confirmation'
+    payment.save(update_fields=['screenshot', 'status', 'updated_at'])
+
+    telegram_outbox.notify_new_payment(payment)
+    return {'payment_id': payment.id}
+
+
+ATTACHERS = {
+    'property_image': _attach_property_image,
+    'payment_screenshot': _attach_payment_screenshot,
+}
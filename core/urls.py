@@ -0,0 +1,11 @@
+from django.urls import path
+from .views import create_upload, UploadChunkView, complete_upload
+
+app_name = 'core'
+
+urlpatterns = [
+    # Загрузка файлов частями (с докачкой)
+    path('', create_upload, name='upload-create'),
+    path('<uuid:upload_id>/', UploadChunkView.as_view(), name='upload-chunk'),
+    path('<uuid:upload_id>/complete/', complete_upload, name='upload-complete'),
+]
@@ -1,3 +1,108 @@
-from django.shortcuts import render
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.shortcuts import get_object_or_404
 
-# Create your views here.
+from .models import UploadSession
+from .serializers import UploadSessionSerializer
+from .uploads import (
+    UploadError, check_target_access, parse_content_range,
+    write_chunk, finalize_upload, discard_upload
+)
+
+
+# ==================== ЗАГРУЗКА ФАЙЛОВ ЧАСТЯМИ ====================
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_upload(request):
+    """
+    Создать сессию загрузки
+    POST /api/uploads/
+    Body: {"target": "property_image", "object_id": 5, "filename": "photo.jpg",
+           "content_type": "image/jpeg", "total_size": 5242880}
+    """
+    serializer = UploadSessionSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+
+    try:
+        check_target_access(
+            request.user,
+            serializer.validated_data['target'],
+            serializer.validated_data['object_id']
+        )
+    except UploadError as e:
+        return Response({'error': e.message}, status=e.status_code)
+
+    session = serializer.save(user=request.user)
+    return Response(UploadSessionSerializer(session).data, status=status.HTTP_201_CREATED)
+
+
+class UploadChunkView(APIView):
+    """
+    GET /api/uploads/<id>/    - текущий offset (для докачки)
+    PUT /api/uploads/<id>/    - кусок файла в теле запроса
+        Content-Range: bytes <start>-<end>/<total>
+
+    Тело читается из потока блоками, request.data не трогаем,
+    поэтому файл не попадает в память целиком.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get_session(self, request, upload_id):
+        return get_object_or_404(UploadSession, id=upload_id, user=request.user)
+
+    def get(self, request, upload_id):
+        session = self.get_session(request, upload_id)
+        return Response(UploadSessionSerializer(session).data)
+
+    def put(self, request, upload_id):
+        session = self.get_session(request, upload_id)
+
+        if session.status != 'uploading':
+            return Response({'error': 'Загрузка уже завершена'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            start, end = parse_content_range(request.headers.get('Content-Range'), session.total_size)
+            write_chunk(session, request.stream, start, end)
+        except UploadError as e:
+            return Response({
+                'error': e.message,
+                'offset': session.received_size
+            }, status=e.status_code)
+
+        return Response({
+            'offset': session.received_size,
+            'total_size': session.total_size,
+            'is_complete': session.is_complete
+        })
+
+    def delete(self, request, upload_id):
+        session = self.get_session(request, upload_id)
+        discard_upload(session)
+        session.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def complete_upload(request, upload_id):
+    """
+    Завершить загрузку: файл переносится в storage и привязывается
+    к объявлению (PropertyImage) или платежу (ManualPayment.screenshot)
+    POST /api/uploads/<id>/complete/
+    """
+    session = get_object_or_404(UploadSession, id=upload_id, user=request.user)
+
+    try:
+        result = finalize_upload(session)
+    except UploadError as e:
+        return Response({'error': e.message}, status=e.status_code)
+
+    return Response({
+        'message': 'Файл загружен',
+        'upload': UploadSessionSerializer(session).data,
+        **result
+    }, status=status.HTTP_201_CREATED)
@@ -78,9 +78,9 @@ const AuctionCard = ({ auction }) => {
       <div className="bg-white rounded-lg shadow-md hover:shadow-xl transition-shadow duration-300 overflow-hidden">
         {/* Изображение */}
         <div className="relative h-48 bg-gray-200">
-          {auction.property_details?.images?.[0] ? (
+          {auction.property_card?.cover ? (
             <img
-              src={auction.property_details.images[0].image}
+              src={auction.property_card.cover.thumb || auction.property_card.cover.image}
               alt={auction.property_title}
               className="w-full h-full object-cover"
             />
@@ -144,7 +144,7 @@ const AuctionCard = ({ auction }) => {
             {/* Количество ставок */}
             <div className="flex items-center text-sm text-gray-600">
               <CurrencyDollarIcon className="w-4 h-4 mr-2" />
-              <span>{auction.bids?.length || 0} ставок</span>
+              <span>{auction.bid_count || 0} ставок</span>
             </div>
           </div>
 
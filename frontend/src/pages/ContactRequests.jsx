@@ -7,22 +7,34 @@ import { FiUser, FiMail, FiPhone, FiMessageSquare, FiInbox } from 'react-icons/f
 const ContactRequests = () => {
   const [requests, setRequests] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchRequests();
   }, []);
 
-  const fetchRequests = async () => {
+  const fetchRequests = async (cursor = null) => {
     try {
-      const response = await propertiesAPI.getContactRequests();
-      setRequests(response.data);
+      const response = await propertiesAPI.getContactRequests(cursor);
+      // Backend возвращает { next, previous, results } с курсором в ссылке next
+      const results = response.data.results || [];
+      setRequests((prev) => (cursor ? [...prev, ...results] : results));
+      const next = response.data.next;
+      setNextCursor(next ? new URL(next).searchParams.get('cursor') : null);
     } catch (error) {
       console.error('Error fetching requests:', error);
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
+  const loadMore = () => {
+    setLoadingMore(true);
+    fetchRequests(nextCursor);
+  };
+
   const handleStatusUpdate = async (id, status) => {
     try {
       await propertiesAPI.updateContactStatus(id, status);
@@ -164,6 +176,14 @@ const ContactRequests = () => {
             ))}
           </div>
         )}
+
+        {!loading && nextCursor && (
+          <div className="text-center mt-8">
+            <button onClick={loadMore} disabled={loadingMore} className="btn-secondary">
+              {loadingMore ? 'Загрузка...' : 'Показать еще'}
+            </button>
+          </div>
+        )}
       </main>
     </div>
   );
@@ -8,23 +8,33 @@ import { FiHeart } from 'react-icons/fi';
 const Favorites = () => {
   const [favorites, setFavorites] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextPage, setNextPage] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchFavorites();
   }, []);
 
-  const fetchFavorites = async () => {
+  const fetchFavorites = async (page = 1) => {
     try {
-      const response = await propertiesAPI.getFavorites();
-      // Backend возвращает { count, results }, берём results
-      setFavorites(response.data.results || response.data || []);
+      const response = await propertiesAPI.getFavorites(page);
+      // Backend возвращает { count, next, results } постранично
+      const results = response.data.results || [];
+      setFavorites((prev) => (page === 1 ? results : [...prev, ...results]));
+      setNextPage(response.data.next || null);
     } catch (error) {
       console.error('Error fetching favorites:', error);
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
+  const loadMore = () => {
+    setLoadingMore(true);
+    fetchFavorites(nextPage);
+  };
+
   return (
     <div className="min-h-screen bg-gray-50">
       <Header />
@@ -64,6 +74,14 @@ const Favorites = () => {
             ))}
           </div>
         )}
+
+        {!loading && nextPage && (
+          <div className="text-center mt-8">
+            <button onClick={loadMore} disabled={loadingMore} className="btn-secondary">
+              {loadingMore ? 'Загрузка...' : 'Показать еще'}
+            </button>
+          </div>
+        )}
       </main>
     </div>
   );
@@ -92,9 +92,9 @@ export const propertiesAPI = {
   deleteImage: (propertyId, imageId) => api.delete(`/properties/${propertyId}/images/${imageId}/`),
   getMy: () => api.get('/properties/my/'),
   contactOwner: (id, message) => api.post(`/properties/${id}/contact/`, { message }),
-  getContactRequests: () => api.get('/properties/contact-requests/'),
+  getContactRequests: (cursor) => api.get('/properties/received-contact-requests/', { params: { cursor } }),
   updateContactStatus: (id, status) => api.patch(`/properties/contact-requests/${id}/status/`, { status }),
-  getFavorites: () => api.get('/properties/favorites/'),
+  getFavorites: (page = 1) => api.get('/properties/favorites/', { params: { page } }),
   addToFavorites: (propertyId) => api.post(`/properties/${propertyId}/favorite/`),
   removeFromFavorites: (propertyId) => api.delete(`/properties/${propertyId}/unfavorite/`),
   geocode: (address) => api.post('/properties/geocode/', { address }),
@@ -112,6 +112,7 @@ export const auctionsAPI = {
   update: (id, data) => api.put(`/auctions/${id}/`, data),
   delete: (id) => api.delete(`/auctions/${id}/`),
   placeBid: (id, amount) => api.post(`/auctions/${id}/bid/`, { amount }),
+  getBids: (id, params) => api.get(`/auctions/${id}/bids/`, { params }),
   initiatePayment: (id) => api.post(`/auctions/${id}/initiate-payment/`),
   // Ручная оплата
   getPaymentInfo: (id) => api.get(`/auctions/${id}/payment-info/`),
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Property, PropertyImage, ContactRequest, Favorite
+from .inbox import record_deleted
 
 
 class PropertyImageInline(admin.TabularInline):
@@ -30,6 +31,11 @@ class ContactRequestAdmin(admin.ModelAdmin):
             qs = qs.filter(property__owner=request.user)
         return qs
 
+    def delete_queryset(self, request, queryset):
+        # Массовое удаление идет мимо ContactRequest.delete - tombstone пишем сами
+        record_deleted(queryset)
+        super().delete_queryset(request, queryset)
+
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
@@ -0,0 +1,116 @@
+"""
+Избранное пользователя как множество в Redis
+
+    user:<id>:favorites          - set: id объектов недвижимости + служебный элемент "_"
+    user:<id>:favorites:version  - счетчик записей в избранное
+
+"_" отличает построенное пустое множество от отсутствующего ключа.
+Множество строится из таблицы Favorite при первом обращении и
+обновляется при записи (add/remove после коммита), поэтому is_favorited
+для целой страницы списка - один SMEMBERS. При ошибке Redis данные
+читаются из БД.
+
+Каждая запись увеличивает version. Построение запоминает version до
+чтения из БД и записывает множество, только если version не изменился -
+иначе снимок из БД мог не увидеть параллельное добавление или удаление.
+
+Удаление объектов через QuerySet.delete() (каскад от пользователя,
+массовое удаление в админке) множества не обновляет: в них могут
+остаться id удаленных объектов. Для отметки is_favorited это
+безопасно, а количество избранного считается по БД.
+"""
+from django.db import transaction
+from redis.exceptions import RedisError
+
+from core.redis_client import get_redis
+
+
+KEY_TTL = 24 * 3600
+MARKER = '_'
+
+# Меняем множество только если оно уже построено - иначе при следующем
+# чтении оно соберется из БД целиком. TTL не продлевается: множество
+# периодически пересобирается из БД
+UPDATE_IF_EXISTS_SCRIPT = """
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call(ARGV[1], KEYS[1], ARGV[2])
+end
+return 1
+"""
+
+# Записывает снимок из БД, если с момента чтения version не было записей
+BUILD_IF_UNCHANGED_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return 0
+end
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    for i = 3, #ARGV do
+        redis.call('SADD', KEYS[1], ARGV[i])
+    end
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 1
+"""
+
+
+def favorites_key(user_id):
+    return f'user:{user_id}:favorites'
+
+
+def version_key(user_id):
+    return f'user:{user_id}:favorites:version'
+
+
+def _favorite_ids_from_db(user_id):
+    from .models import Favorite
+
+    return set(Favorite.objects.filter(user_id=user_id).values_list('property_id', flat=True))
+
+
+def get_favorite_ids(user_id):
+    """Множество id избранных объектов пользователя"""
+    key = favorites_key(user_id)
+    try:
+        r = get_redis()
+        members = r.smembers(key)
+        if members:
+            return {int(member) for member in members if member != MARKER}
+
+        version = r.get(version_key(user_id)) or '0'
+        property_ids = _favorite_ids_from_db(user_id)
+        r.eval(
+            BUILD_IF_UNCHANGED_SCRIPT, 2, key, version_key(user_id),
+            version, KEY_TTL, MARKER, *property_ids
+        )
+        return property_ids
+    except RedisError as e:
+        print(f'Favorites cache error: {e}')
+        return _favorite_ids_from_db(user_id)
+
+
+def _update(command, user_id, property_id):
+    def apply():
+        try:
+            get_redis().eval(
+                UPDATE_IF_EXISTS_SCRIPT, 2, favorites_key(user_id), version_key(user_id),
+                command, property_id, KEY_TTL
+            )
+        except RedisError as e:
+            # Множество могло остаться устаревшим - удаляем, соберется заново
+            print(f'Favorites cache error: {e}')
+            try:
+                get_redis().delete(favorites_key(user_id))
+            except RedisError:
+                pass
+
+    transaction.on_commit(apply)
+
+
+def added(user_id, property_id):
+    _update('SADD', user_id, property_id)
+
+
+def removed(user_id, property_id):
+    _update('SREM', user_id, property_id)
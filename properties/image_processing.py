@@ -0,0 +1,348 @@
+"""
+Обработка изображений недвижимости (Pillow)
+
+- Пакетно привязывает загруженные файлы к объявлению (одна INSERT)
+- Убирает EXIF (в т.ч. GPS-координаты) из оригинала
+- Делает уменьшенные копии в WebP и JPEG для карточек и галереи
+- Считает ширину, высоту и blurhash для плейсхолдеров на клиенте
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from io import BytesIO
+from math import cos, pi, floor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from core.uploads import ALLOWED_CONTENT_TYPES
+
+
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+VARIANTS_DIR = 'properties/variants'
+
+# Сколько файлов пишем в storage параллельно
+FILE_WRITE_WORKERS = 4
+
+
+# Имена файлов, сохраненных внутри atomic_with_uploads (для удаления при откате)
+_stored_files = ContextVar('stored_property_image_files', default=None)
+
+
+def get_variant_sizes():
+    """Размеры по длинной стороне (px), settings.PROPERTY_IMAGE_VARIANTS"""
+    return settings.PROPERTY_IMAGE_VARIANTS
+
+
+@contextmanager
+def atomic_with_uploads():
+    """
+    transaction.atomic(), который при откате удаляет файлы,
+    сохраненные в storage внутри блока через bulk_attach_images
+
+    Работает и как декоратор: @atomic_with_uploads()
+    """
+    stored = []
+    token = _stored_files.set(stored)
+    try:
+        with transaction.atomic():
+            yield
+    except Exception:
+        _delete_stored(stored)
+        raise
+    finally:
+        _stored_files.reset(token)
+
+
+def _delete_stored(names):
+    from .models import PropertyImage
+
+    storage = PropertyImage._meta.get_field('image').storage
+    for name in names:
+        try:
+            storage.delete(name)
+        except Exception as e:
+            print(f"Ошибка удаления файла {name}: {e}")
+
+
+def schedule_image_processing(image_ids):
+    """Ставит обработку изображений в очередь Celery после коммита транзакции"""
+    from .tasks import process_property_image
+
+    image_ids = [image_id for image_id in image_ids if image_id]
+    if not image_ids:
+        return
+
+    def _enqueue():
+        for image_id in image_ids:
+            process_property_image.delay(image_id)
+
+    transaction.on_commit(_enqueue)
+
+
+# ==================== ПРИВЯЗКА К ОБЪЯВЛЕНИЮ ====================
+
+def bulk_attach_images(property_obj, files):
+    """
+    Сохраняет файлы в storage параллельно и создает PropertyImage одной INSERT
+
+    Вызывать внутри atomic_with_uploads(): если транзакция откатится,
+    сохраненные файлы будут удалены.
+
+    Returns:
+        (list[PropertyImage], list[dict]) - созданные изображения и ошибки
+        по каждому файлу: [{'file': 'photo.heic', 'error': '...'}]
+    """
+    if not files:
+        return [], []
+
+    workers = min(FILE_WRITE_WORKERS, len(files))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [(upload, pool.submit(_store_upload, upload)) for upload in files]
+
+    stored_names = []
+    errors = []
+    for upload, future in futures:
+        try:
+            stored_names.append(future.result())
+        except Exception as e:
+            errors.append({'file': upload.name, 'error': str(e)})
+
+    pending = _stored_files.get()
+    if pending is not None:
+        pending.extend(stored_names)
+
+    try:
+        images = attach_stored_images(property_obj, stored_names)
+    except Exception:
+        # Внутри atomic_with_uploads файлы удалит откат блока
+        if pending is None:
+            _delete_stored(stored_names)
+        raise
+    return images, errors
+
+
+def attach_stored_images(property_obj, stored_names):
+    """
+    Создает PropertyImage для уже сохраненных файлов через bulk_create
+
+    Новые изображения встают в конец галереи; если у объявления
+    еще нет обложки, ею становится первое из них.
+    """
+    from .models import PropertyImage
+
+    if not stored_names:
+        return []
+
+    current = PropertyImage.objects.filter(property=property_obj).aggregate(
+        max_order=Max('order'),
+        covers=Count('id', filter=Q(is_cover=True)),
+    )
+    next_order = 0 if current['max_order'] is None else current['max_order'] + 1
+    need_cover = current['covers'] == 0
+
+    images = PropertyImage.objects.bulk_create([
+        PropertyImage(
+            property=property_obj,
+            image=name,
+            order=next_order + i,
+            is_cover=need_cover and i == 0,
+        )
+        for i, name in enumerate(stored_names)
+    ])
+
+    schedule_image_processing([image.id for image in images])
+    return images
+
+
+def _store_upload(upload):
+    """Проверяет и сохраняет один загруженный файл, возвращает имя в storage"""
+    from .models import PropertyImage
+
+    if upload.content_type not in ALLOWED_CONTENT_TYPES:
+        raise ValueError('Неверный формат файла. Разрешены: JPG, PNG, WEBP')
+
+    try:
+        with Image.open(upload) as img:
+            img.verify()
+    except Exception:
+        raise ValueError('Файл не является изображением')
+    upload.seek(0)
+
+    field = PropertyImage._meta.get_field('image')
+    name = field.generate_filename(None, upload.name)
+    return field.storage.save(name, upload, max_length=field.max_length)
+
+
+# ==================== ОБРАБОТКА ====================
+
+def process_image(property_image):
+    """
+    Обрабатывает одно изображение: чистит EXIF, делает варианты,
+    сохраняет размеры и blurhash в модели
+    """
+    field = property_image.image
+    storage = field.storage
+
+    with field.open('rb') as f:
+        original = Image.open(f)
+        original.load()
+        original_format = original.format or 'JPEG'
+
+    # Поворачиваем по EXIF-ориентации, после этого EXIF больше не нужен
+    image = ImageOps.exif_transpose(original)
+
+    # Перезаписываем оригинал без EXIF
+    if original.info.get('exif') or original.getexif():
+        old_name = field.name
+        field.save(
+            os.path.basename(old_name),
+            ContentFile(_encode(image, original_format, {'quality': 95})),
+            save=False
+        )
+        storage.delete(old_name)
+
+    # Удаляем старые варианты при повторной обработке
+    for name in _iter_variant_names(property_image.variants):
+        storage.delete(name)
+
+    variants = {}
+    for size_name, max_side in get_variant_sizes().items():
+        resized = image.copy()
+        resized.thumbnail((max_side, max_side), Image.LANCZOS)
+
+        variants[size_name] = {}
+        for ext, (fmt, options) in VARIANT_FORMATS.items():
+            name = storage.save(
+                f'{VARIANTS_DIR}/{property_image.pk}_{size_name}.{ext}',
+                ContentFile(_encode(resized, fmt, options))
+            )
+            variants[size_name][ext] = name
+
+    property_image.width, property_image.height = image.size
+    property_image.blurhash = encode_blurhash(image)
+    property_image.variants = variants
+    property_image.processed_at = timezone.now()
+    property_image.save(update_fields=[
+        'image', 'width', 'height', 'blurhash', 'variants', 'processed_at'
+    ])
+    return property_image
+
+
+def delete_variant_files(property_image):
+    """Удаляет файлы вариантов изображения"""
+    storage = property_image.image.storage
+    for name in _iter_variant_names(property_image.variants):
+        storage.delete(name)
+
+
+def _iter_variant_names(variants):
+    for formats in (variants or {}).values():
+        for name in formats.values():
+            if name:
+                yield name
+
+
+def _encode(image, fmt, options):
+    """Кодирует изображение в байты без метаданных"""
+    if fmt == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    elif fmt == 'WEBP' and image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+    buffer = BytesIO()
+    image.save(buffer, format=fmt, **options)
+    return buffer.getvalue()
+
+
+# ==================== BLURHASH ====================
+
+_BASE83 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+
+
+def _encode83(value, length):
+    return ''.join(
+        _BASE83[(value // (83 ** (length - i))) % 83]
+        for i in range(1, length + 1)
+    )
+
+
+def _srgb_to_linear(value):
+    v = value / 255
+    if v <= 0.04045:
+        return v / 12.92
+    return ((v + 0.055) / 1.055) ** 2.4
+
+
+def _linear_to_srgb(value):
+    v = max(0.0, min(1.0, value))
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * (v ** (1 / 2.4)) - 0.055) * 255 + 0.5)
+
+
+def _sign_pow(value, exp):
+    return abs(value) ** exp * (1 if value >= 0 else -1)
+
+
+def encode_blurhash(image, x_components=4, y_components=3):
+    """
+    Считает blurhash (https://blurha.sh) по уменьшенной до 32px копии
+    """
+    small = image.convert('RGB')
+    small.thumbnail((32, 32))
+    width, height = small.size
+    pixels = [tuple(_srgb_to_linear(c) for c in px) for px in small.getdata()]
+
+    factors = []
+    for j in range(y_components):
+        for i in range(x_components):
+            normalisation = 1 if i == 0 and j == 0 else 2
+            r = g = b = 0.0
+            for y in range(height):
+                basis_y = cos(pi * j * y / height)
+                row = y * width
+                for x in range(width):
+                    basis = normalisation * cos(pi * i * x / width) * basis_y
+                    pr, pg, pb = pixels[row + x]
+                    r += basis * pr
+                    g += basis * pg
+                    b += basis * pb
+            scale = 1 / (width * height)
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+
+    result = _encode83((x_components - 1) + (y_components - 1) * 9, 1)
+
+    if ac:
+        actual_max = max(abs(v) for factor in ac for v in factor)
+        quantised_max = max(0, min(82, floor(actual_max * 166 - 0.5)))
+        max_value = (quantised_max + 1) / 166
+        result += _encode83(quantised_max, 1)
+    else:
+        max_value = 1
+        result += _encode83(0, 1)
+
+    result += _encode83(
+        (_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2]),
+        4
+    )
+
+    for factor in ac:
+        quant = [
+            max(0, min(18, floor(_sign_pow(v / max_value, 0.5) * 9 + 9.5)))
+            for v in factor
+        ]
+        result += _encode83(quant[0] * 19 * 19 + quant[1] * 19 + quant[2], 2)
+
+    return result
@@ -0,0 +1,229 @@
+"""
+Инкрементальная синхронизация заявок на контакт (мобильные клиенты)
+
+Клиент хранит у себя список заявок и при обновлении запрашивает
+только изменения:
+
+    GET contact-requests/sync/?box=received&since=<cursor>
+
+В ответе - заявки с updated_at >= since (индексы по updated_at),
+id удаленных заявок (ContactRequestTombstone) и новый cursor для
+следующего запроса. Заявки с одинаковым id клиент заменяет.
+
+Cursor бывает двух видов:
+- после завершенной синхронизации (has_more=false) - метка времени.
+  Она отстает от текущего времени на SAFETY_WINDOW: заявка, сохраненная
+  транзакцией, которая закоммитилась позже соседних, все равно попадет
+  в следующий ответ (возможен повтор, но не пропуск);
+- следующей страницы (has_more=true) - непрозрачная строка с позицией
+  (updated_at, id) последней отданной заявки. Следующая страница
+  начинается строго после нее, поэтому больше SYNC_LIMIT заявок с
+  одинаковым updated_at не зацикливают клиента.
+
+Если since нет или метка времени старше TOMBSTONE_RETENTION_DAYS
+(tombstone уже удалены), возвращается полный список с reset=true -
+клиент должен заменить свой список целиком. Cursor страниц этого
+ограничения не имеет: полный список можно дочитать до конца, даже если
+в нем есть старые заявки.
+"""
+import base64
+import binascii
+import hashlib
+import json
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+BOXES = ('received', 'sent')
+
+SYNC_LIMIT = 500
+SAFETY_WINDOW = timedelta(seconds=5)
+TOMBSTONE_RETENTION_DAYS = 30
+
+
+def record_deleted(queryset):
+    """
+    Оставляет tombstone для заявок из queryset (вызывать до удаления)
+
+    Удаление через QuerySet.delete() в обход моделей tombstone не оставляет.
+    """
+    from .models import ContactRequestTombstone
+
+    ContactRequestTombstone.objects.bulk_create([
+        ContactRequestTombstone(
+            contact_request_id=contact_request_id,
+            owner_id=owner_id,
+            buyer_id=buyer_id,
+        )
+        for contact_request_id, owner_id, buyer_id in queryset.values_list(
+            'id', 'property__owner_id', 'buyer_id'
+        )
+    ])
+
+
+def purge_tombstones():
+    """Удаляет tombstone старше TOMBSTONE_RETENTION_DAYS"""
+    from .models import ContactRequestTombstone
+
+    deleted, _ = ContactRequestTombstone.objects.filter(
+        deleted_at__lt=timezone.now() - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+    ).delete()
+    return deleted
+
+
+PAGE_CURSOR_PREFIX = 'p.'
+
+
+def parse_cursor(value):
+    """
+    Cursor -> позиция синхронизации или None (нет, некорректный или
+    слишком старый - нужен полный список)
+
+    Позиция - dict:
+        since - заявки с updated_at >= since (None - все)
+        deleted_since - tombstone с deleted_at >= deleted_since (None - не нужны)
+        after - (updated_at, id) последней отданной заявки или None
+    """
+    if not value:
+        return None
+    if value.startswith(PAGE_CURSOR_PREFIX):
+        return _parse_page_cursor(value[len(PAGE_CURSOR_PREFIX):])
+
+    # "+" в query string без кодирования превращается в пробел
+    since = _parse_time(value.replace(' ', '+'))
+    if since is None:
+        return None
+    if since < timezone.now() - timedelta(days=TOMBSTONE_RETENTION_DAYS):
+        return None
+    return {'since': since, 'deleted_since': since, 'after': None}
+
+
+def _parse_time(value):
+    if not isinstance(value, str):
+        return None
+    parsed = parse_datetime(value)
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+def _parse_page_cursor(token):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token.encode()))
+        after_time = _parse_time(data['t'])
+        after_id = int(data['i'])
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, KeyError):
+        return None
+    if after_time is None:
+        return None
+    return {
+        'since': _parse_time(data.get('s')),
+        'deleted_since': _parse_time(data.get('d')),
+        'after': (after_time, after_id),
+    }
+
+
+def format_cursor(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def format_page_cursor(position, last):
+    data = {
+        's': position['since'] and format_cursor(position['since']),
+        'd': position['deleted_since'] and format_cursor(position['deleted_since']),
+        't': format_cursor(last.updated_at),
+        'i': last.id,
+    }
+    token = base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode()).decode()
+    return PAGE_CURSOR_PREFIX + token
+
+
+def _querysets(user, box):
+    from .models import ContactRequest, ContactRequestTombstone
+
+    if box == 'sent':
+        return (
+            ContactRequest.objects.filter(buyer=user),
+            ContactRequestTombstone.objects.filter(buyer_id=user.id),
+        )
+    return (
+        ContactRequest.objects.filter(property__owner=user),
+        ContactRequestTombstone.objects.filter(owner_id=user.id),
+    )
+
+
+def get_changes(user, box, position):
+    """
+    Изменения в папке заявок пользователя с позиции синхронизации
+
+    Args:
+        box: 'received' (заявки на мои объекты) или 'sent' (мои заявки)
+        position: результат parse_cursor (None - полный список)
+
+    Returns:
+        (etag, loader) - ETag ответа и функция, которая загружает изменения:
+        loader() -> {"results": [ContactRequest], "deleted": [id],
+                     "cursor": str, "has_more": bool, "reset": bool}
+        ETag считается одним агрегирующим запросом, поэтому при совпадении
+        If-None-Match сами заявки не загружаются.
+    """
+    reset = position is None
+    if position is None:
+        # Удаления, случившиеся пока клиент дочитывает полный список,
+        # придут вместе со следующими страницами
+        started = timezone.now() - SAFETY_WINDOW
+        position = {'since': None, 'deleted_since': started, 'after': None}
+    since, deleted_since, after = position['since'], position['deleted_since'], position['after']
+
+    rows, tombstones = _querysets(user, box)
+    if since is not None:
+        rows = rows.filter(updated_at__gte=since)
+    if after is not None:
+        after_time, after_id = after
+        rows = rows.filter(Q(updated_at__gt=after_time) | Q(updated_at=after_time, id__gt=after_id))
+    if deleted_since is not None:
+        tombstones = tombstones.filter(deleted_at__gte=deleted_since)
+
+    state = rows.aggregate(latest=Max('updated_at'), total=Count('id'))
+    if not reset:
+        state.update(tombstones.aggregate(latest_deleted=Max('deleted_at'), deleted=Count('id')))
+
+    fingerprint = f"{box}|{reset}|" + '|'.join(
+        f'{key}={value.isoformat() if hasattr(value, "isoformat") else value}'
+        for key, value in sorted({**state, 'since': since, 'after': after}.items())
+    )
+    etag = '"' + hashlib.md5(fingerprint.encode()).hexdigest() + '"'
+
+    def load():
+        changed = list(
+            rows.select_related('property', 'property__owner', 'buyer')
+            .order_by('updated_at', 'id')[:SYNC_LIMIT + 1]
+        )
+        has_more = len(changed) > SYNC_LIMIT
+        changed = changed[:SYNC_LIMIT]
+
+        deleted = []
+        if not reset:
+            deleted = list(tombstones.values_list('contact_request_id', flat=True))
+
+        if has_more:
+            # Следующая страница начнется строго после последней отданной заявки
+            cursor = format_page_cursor(position, changed[-1])
+        else:
+            cursor = timezone.now() - SAFETY_WINDOW
+            if deleted_since is not None:
+                cursor = max(cursor, deleted_since)
+            cursor = format_cursor(cursor)
+
+        return {
+            'results': changed,
+            'deleted': deleted,
+            'cursor': cursor,
+            'has_more': has_more,
+            'reset': reset,
+        }
+
+    return etag, load
@@ -0,0 +1,39 @@
+"""
+Management команда для обработки уже загруженных изображений
+(варианты WebP/JPEG, размеры, blurhash)
+"""
+from django.core.management.base import BaseCommand
+from properties.models import PropertyImage
+from properties.tasks import process_property_image
+
+
+class Command(BaseCommand):
+    help = 'Ставит в очередь обработку изображений недвижимости без вариантов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Переобработать все изображения, даже уже обработанные',
+        )
+        parser.add_argument(
+            '--sync',
+            action='store_true',
+            help='Обработать сразу в этом процессе, без Celery',
+        )
+
+    def handle(self, *args, **options):
+        images = PropertyImage.objects.all()
+        if not options['force']:
+            images = images.filter(processed_at__isnull=True)
+
+        image_ids = list(images.values_list('id', flat=True))
+        self.stdout.write(f'📸 Изображений к обработке: {len(image_ids)}')
+
+        for image_id in image_ids:
+            if options['sync']:
+                self.stdout.write(f'  {process_property_image(image_id)}')
+            else:
+                process_property_image.delay(image_id)
+
+        self.stdout.write(self.style.SUCCESS('✅ Готово'))
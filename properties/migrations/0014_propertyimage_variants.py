@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0013_increase_price_digits'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propertyimage',
+            name='blurhash',
+            field=models.CharField(blank=True, max_length=64, verbose_name='Blurhash'),
+        ),
+        migrations.AddField(
+            model_name='propertyimage',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Высота'),
+        ),
+        migrations.AddField(
+            model_name='propertyimage',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Дата обработки'),
+        ),
+        migrations.AddField(
+            model_name='propertyimage',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, help_text='{"thumb": {"webp": "...", "jpeg": "..."}, "card": {...}, "large": {...}}', verbose_name='Варианты'),
+        ),
+        migrations.AddField(
+            model_name='propertyimage',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Ширина'),
+        ),
+    ]
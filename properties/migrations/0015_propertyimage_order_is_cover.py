@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:10
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def set_default_covers(apps, schema_editor):
+    """Первое загруженное изображение каждого объявления становится обложкой"""
+    PropertyImage = apps.get_model('properties', 'PropertyImage')
+    first_ids = (
+        PropertyImage.objects.values('property_id')
+        .annotate(first_id=Min('id'))
+        .values_list('first_id', flat=True)
+    )
+    PropertyImage.objects.filter(id__in=list(first_ids)).update(is_cover=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0014_propertyimage_variants'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='propertyimage',
+            options={'ordering': ['order', 'id'], 'verbose_name': 'Изображение недвижимости', 'verbose_name_plural': 'Изображения недвижимости'},
+        ),
+        migrations.AddField(
+            model_name='propertyimage',
+            name='is_cover',
+            field=models.BooleanField(default=False, verbose_name='Обложка'),
+        ),
+        migrations.AddField(
+            model_name='propertyimage',
+            name='order',
+            field=models.PositiveIntegerField(default=0, verbose_name='Порядок'),
+        ),
+        migrations.RunPython(set_default_covers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0015_propertyimage_order_is_cover'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contactrequest',
+            index=models.Index(fields=['property', 'status', 'created_at'], name='contactreq_prop_status_idx'),
+        ),
+    ]
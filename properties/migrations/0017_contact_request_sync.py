@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0016_contactrequest_inbox_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContactRequestTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('contact_request_id', models.BigIntegerField(verbose_name='ID заявки')),
+                ('owner_id', models.BigIntegerField(verbose_name='ID владельца объекта')),
+                ('buyer_id', models.BigIntegerField(verbose_name='ID покупателя')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата удаления')),
+            ],
+            options={
+                'verbose_name': 'Удаленная заявка на контакт',
+                'verbose_name_plural': 'Удаленные заявки на контакт',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='contactrequest',
+            index=models.Index(fields=['updated_at'], name='contactreq_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactrequest',
+            index=models.Index(fields=['buyer', 'updated_at'], name='contactreq_buyer_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactrequesttombstone',
+            index=models.Index(fields=['owner_id', 'deleted_at'], name='tombstone_owner_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactrequesttombstone',
+            index=models.Index(fields=['buyer_id', 'deleted_at'], name='tombstone_buyer_idx'),
+        ),
+    ]
@@ -6,10 +6,25 @@ class PropertyImage(models.Model):
     property = models.ForeignKey('Property', related_name='images', on_delete=models.CASCADE)
     image = models.ImageField(upload_to='properties/', verbose_name='Изображение')
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    order = models.PositiveIntegerField(default=0, verbose_name='Порядок')
+    is_cover = models.BooleanField(default=False, verbose_name='Обложка')
+
+    # Заполняется Celery-задачей process_property_image
+    width = models.PositiveIntegerField(null=True, blank=True, verbose_name='Ширина')
+    height = models.PositiveIntegerField(null=True, blank=True, verbose_name='Высота')
+    blurhash = models.CharField(max_length=64, blank=True, verbose_name='Blurhash')
+    variants = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Варианты',
+        help_text='{"thumb": {"webp": "...", "jpeg": "..."}, "card": {...}, "large": {...}}'
+    )
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name='Дата обработки')
 
     class Meta:
         verbose_name = 'Изображение недвижимости'
         verbose_name_plural = 'Изображения недвижимости'
+        ordering = ['order', 'id']
 
     def __str__(self):
         return f"Изображение для {self.property.title}"
@@ -178,6 +193,20 @@ class Property(models.Model):
     def __str__(self):
         return self.title
 
+    def delete(self, *args, **kwargs):
+        """
+        Убирает объект из множеств избранного и оставляет tombstone заявок
+        (сами строки Favorite/ContactRequest удалит каскад)
+        """
+        from . import favorites
+
+        from .inbox import record_deleted
+
+        for user_id in self.favorited_by.values_list('user_id', flat=True):
+            favorites.removed(user_id, self.id)
+        record_deleted(self.contact_requests.all())
+        return super().delete(*args, **kwargs)
+
     def save(self, *args, **kwargs):
         """
         ✅ Автоматический геокодинг при сохранении
@@ -331,10 +360,49 @@ class ContactRequest(models.Model):
         verbose_name_plural = 'Запросы на контакт'
         ordering = ['-created_at']
         unique_together = ['property', 'buyer']
+        indexes = [
+            # Входящие заявки владельца: по объектам, с фильтром статуса, новые первыми
+            models.Index(fields=['property', 'status', 'created_at'], name='contactreq_prop_status_idx'),
+            # Инкрементальная синхронизация (?since=updated_at)
+            models.Index(fields=['updated_at'], name='contactreq_updated_idx'),
+            models.Index(fields=['buyer', 'updated_at'], name='contactreq_buyer_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.buyer.full_name} -> {self.property.title}"
 
+    def delete(self, *args, **kwargs):
+        from .inbox import record_deleted
+        record_deleted(ContactRequest.objects.filter(pk=self.pk))
+        return super().delete(*args, **kwargs)
+
+
+class ContactRequestTombstone(models.Model):
+    """
+    Удаленная заявка на контакт
+
+    Клиенты синхронизируют заявки по ?since= и удаляют у себя записи
+    из списка deleted. Хранится TOMBSTONE_RETENTION_DAYS дней
+    (задача purge_contact_request_tombstones).
+    Без внешних ключей: запись нужна второй стороне и после удаления
+    пользователя или объекта.
+    """
+    contact_request_id = models.BigIntegerField(verbose_name='ID заявки')
+    owner_id = models.BigIntegerField(verbose_name='ID владельца объекта')
+    buyer_id = models.BigIntegerField(verbose_name='ID покупателя')
+    deleted_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата удаления')
+
+    class Meta:
+        verbose_name = 'Удаленная заявка на контакт'
+        verbose_name_plural = 'Удаленные заявки на контакт'
+        indexes = [
+            models.Index(fields=['owner_id', 'deleted_at'], name='tombstone_owner_idx'),
+            models.Index(fields=['buyer_id', 'deleted_at'], name='tombstone_buyer_idx'),
+        ]
+
+    def __str__(self):
+        return f"Заявка #{self.contact_request_id} удалена {self.deleted_at}"
+
 
 # Избранное
 class Favorite(models.Model):
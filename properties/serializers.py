@@ -2,15 +2,35 @@
 
 from rest_framework import serializers
 from .models import Property, PropertyImage, ContactRequest, Favorite
+from . import favorites
 
 
 class PropertyImageSerializer(serializers.ModelSerializer):
     """Сериализатор для изображений недвижимости"""
+    variants = serializers.SerializerMethodField()
 
     class Meta:
         model = PropertyImage
-        fields = ['id', 'image', 'uploaded_at']
-        read_only_fields = ['uploaded_at']
+        fields = [
+            'id', 'image', 'order', 'is_cover',
+            'width', 'height', 'blurhash', 'variants', 'uploaded_at'
+        ]
+        read_only_fields = ['width', 'height', 'blurhash', 'uploaded_at']
+
+    def get_variants(self, obj):
+        """
+        URL уменьшенных копий: {"thumb": {"webp": url, "jpeg": url}, ...}
+        Пока изображение не обработано - пустой словарь, клиент берет image
+        """
+        request = self.context.get('request')
+        storage = obj.image.storage
+        result = {}
+        for size_name, formats in (obj.variants or {}).items():
+            result[size_name] = {}
+            for ext, name in formats.items():
+                url = storage.url(name)
+                result[size_name][ext] = request.build_absolute_uri(url) if request else url
+        return result
 
 
 class PropertySerializer(serializers.ModelSerializer):
@@ -64,7 +84,10 @@ class PropertySerializer(serializers.ModelSerializer):
         """Проверка, добавлено ли в избранное текущим пользователем"""
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return Favorite.objects.filter(user=request.user, property=obj).exists()
+            # Один SMEMBERS на весь ответ: context общий для всех объектов списка
+            if 'favorite_ids' not in self.context:
+                self.context['favorite_ids'] = favorites.get_favorite_ids(request.user.id)
+            return obj.id in self.context['favorite_ids']
         return False
 
     def get_distance_from_search(self, obj):
@@ -196,6 +219,43 @@ class PropertySerializer(serializers.ModelSerializer):
         return data
 
 
+class PropertyCardSerializer(serializers.ModelSerializer):
+    """
+    Компактная карточка недвижимости для списков (аукционы и т.п.)
+    Только обложка, без галереи и без запроса избранного на каждый объект
+    """
+    cover = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Property
+        fields = ['id', 'title', 'address', 'type', 'area', 'rooms', 'cover']
+
+    def get_cover(self, obj):
+        """
+        Обложка: {"image", "thumb", "blurhash"} или None
+        Во view обложки подгружаются заранее в cover_images (Prefetch с to_attr)
+        """
+        covers = getattr(obj, 'cover_images', None)
+        if covers is None:
+            covers = list(obj.images.filter(is_cover=True)[:1])
+        if not covers:
+            return None
+
+        image = covers[0]
+        request = self.context.get('request')
+        thumb = (image.variants or {}).get('thumb', {})
+        thumb_name = thumb.get('webp') or thumb.get('jpeg')
+
+        def absolute(url):
+            return request.build_absolute_uri(url) if request else url
+
+        return {
+            'image': absolute(image.image.url),
+            'thumb': absolute(image.image.storage.url(thumb_name)) if thumb_name else None,
+            'blurhash': image.blurhash,
+        }
+
+
 class ContactRequestSerializer(serializers.ModelSerializer):
     """Сериализатор для запросов на контакт"""
     property_title = serializers.CharField(source='property.title', read_only=True)
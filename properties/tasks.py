@@ -0,0 +1,29 @@
+from celery import shared_task
+from .models import PropertyImage
+
+
+@shared_task
+def process_property_image(image_id):
+    """
+    Делает WebP/JPEG варианты изображения, чистит EXIF,
+    сохраняет размеры и blurhash
+    """
+    from .image_processing import process_image
+
+    try:
+        property_image = PropertyImage.objects.get(id=image_id)
+    except PropertyImage.DoesNotExist:
+        return f"Изображение {image_id} не найдено"
+
+    process_image(property_image)
+
+    return f"Изображение {image_id} обработано: {len(property_image.variants)} размеров"
+
+
+@shared_task
+def purge_contact_request_tombstones():
+    """Удаляет устаревшие записи об удаленных заявках на контакт"""
+    from .inbox import purge_tombstones
+
+    deleted = purge_tombstones()
+    return f"Удалено tombstone заявок: {deleted}"
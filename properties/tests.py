@@ -1,3 +1,64 @@
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from users.models import User
+from .models import Property
+
+
+def create_property(owner, title='Test'):
+    property_obj = Property(
+        owner=owner,
+        title=title,
+        description='Test',
+        address='Test',
+        latitude=42.46,
+        longitude=59.61,
+        area=50,
+        rooms=2,
+        price=1000000,
+    )
+    # Без геокодинга и поиска ориентиров
+    super(Property, property_obj).save()
+    return property_obj
+
+
+class PropertyListCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create(username='owner', email='owner@example.com', full_name='Owner')
+        self.client = APIClient()
+
+    def list_titles(self):
+        response = self.client.get('/api/properties/')
+        self.assertEqual(response.status_code, 200)
+        return [item['title'] for item in response.data]
+
+    def test_list_is_cached(self):
+        create_property(self.owner, 'First')
+        self.assertEqual(self.list_titles(), ['First'])
+
+        # В обход API - кэш не сбрасывается
+        create_property(self.owner, 'Second')
+        self.assertEqual(self.list_titles(), ['First'])
+
+    def test_create_invalidates_cached_list(self):
+        create_property(self.owner, 'First')
+        self.assertEqual(self.list_titles(), ['First'])
+
+        self.client.force_authenticate(self.owner)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/properties/', {
+                'title': 'Second',
+                'description': 'Test',
+                'address': 'Test',
+                'latitude': 42.46,
+                'longitude': 59.61,
+                'area': 40,
+                'rooms': 1,
+                'price': 900000,
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+
+        self.client.force_authenticate(None)
+        self.assertCountEqual(self.list_titles(), ['First', 'Second'])
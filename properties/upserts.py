@@ -0,0 +1,224 @@
+"""
+Избранное и заявки на контакт одним запросом к БД
+
+Вместо "get_object_or_404 -> filter().first() -> create" (три запроса
+и гонка с unique_together) каждая операция - один SQL-запрос
+INSERT ... ON CONFLICT в PostgreSQL. Объект недвижимости проверяется
+в том же запросе (CTE target): внешние ключи Django создает
+DEFERRABLE INITIALLY DEFERRED, и их нарушение проявилось бы только
+при коммите. IntegrityError (объект удален параллельно) тоже
+означает PropertyNotFound.
+
+Для других СУБД (локальная разработка на SQLite) - эквивалент на ORM.
+"""
+from django.db import IntegrityError, connection, transaction
+
+from users.models import User
+from .models import ContactRequest, Favorite, Property
+
+
+class PropertyNotFound(Exception):
+    pass
+
+
+class OwnPropertyError(Exception):
+    pass
+
+
+def _is_postgresql():
+    return connection.vendor == 'postgresql'
+
+
+def _fetchone(sql, params):
+    """Выполняет запрос в точке сохранения: ошибка FK не ломает внешнюю транзакцию"""
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchone()
+    except IntegrityError:
+        # Уникальность снята ON CONFLICT - остается только FK на удаленный объект
+        raise PropertyNotFound()
+
+
+ADD_FAVORITE_SQL = f"""
+WITH target AS (
+    SELECT id FROM {Property._meta.db_table} WHERE id = %(property_id)s
+),
+inserted AS (
+    INSERT INTO {Favorite._meta.db_table} (user_id, property_id, created_at)
+    SELECT %(user_id)s, id, now() FROM target
+    ON CONFLICT (user_id, property_id) DO NOTHING
+    RETURNING id
+)
+SELECT
+    EXISTS (SELECT 1 FROM target),
+    (SELECT id FROM inserted),
+    (SELECT id FROM {Favorite._meta.db_table}
+     WHERE user_id = %(user_id)s AND property_id = %(property_id)s)
+"""
+
+
+def add_favorite(user_id, property_id):
+    """
+    Returns:
+        (favorite_id, created)
+
+    Raises:
+        PropertyNotFound
+    """
+    if not _is_postgresql():
+        if not Property.objects.filter(id=property_id).exists():
+            raise PropertyNotFound()
+        favorite, created = Favorite.objects.get_or_create(user_id=user_id, property_id=property_id)
+        return favorite.id, created
+
+    found, inserted_id, existing_id = _fetchone(ADD_FAVORITE_SQL, {'user_id': user_id, 'property_id': property_id})
+    if not found:
+        raise PropertyNotFound()
+    if inserted_id is not None:
+        return inserted_id, True
+    return _existing_favorite_id(user_id, property_id, existing_id), False
+
+
+def _existing_favorite_id(user_id, property_id, existing_id):
+    # Строку, вставленную параллельным запросом после начала нашего,
+    # снимок запроса не видит - дочитываем
+    if existing_id is None:
+        existing_id = Favorite.objects.values_list('id', flat=True).get(user_id=user_id, property_id=property_id)
+    return existing_id
+
+
+# Удаление и вставка в одном запросе: вставляем, только если удалять было нечего
+TOGGLE_FAVORITE_SQL = f"""
+WITH target AS (
+    SELECT id FROM {Property._meta.db_table} WHERE id = %(property_id)s
+),
+deleted AS (
+    DELETE FROM {Favorite._meta.db_table}
+    WHERE user_id = %(user_id)s AND property_id = %(property_id)s
+    RETURNING id
+),
+inserted AS (
+    INSERT INTO {Favorite._meta.db_table} (user_id, property_id, created_at)
+    SELECT %(user_id)s, id, now() FROM target
+    WHERE NOT EXISTS (SELECT 1 FROM deleted)
+    ON CONFLICT (user_id, property_id) DO NOTHING
+    RETURNING id
+)
+SELECT EXISTS (SELECT 1 FROM target), EXISTS (SELECT 1 FROM deleted), (SELECT id FROM inserted)
+"""
+
+
+def toggle_favorite(user_id, property_id):
+    """
+    Returns:
+        favorite_id, если объект добавлен в избранное, или None, если удален
+
+    Raises:
+        PropertyNotFound
+    """
+    if not _is_postgresql():
+        deleted_count, _ = Favorite.objects.filter(user_id=user_id, property_id=property_id).delete()
+        if deleted_count:
+            return None
+        return add_favorite(user_id, property_id)[0]
+
+    found, deleted, inserted_id = _fetchone(TOGGLE_FAVORITE_SQL, {'user_id': user_id, 'property_id': property_id})
+    if deleted:
+        return None
+    if not found:
+        raise PropertyNotFound()
+    if inserted_id is not None:
+        return inserted_id
+    return _existing_favorite_id(user_id, property_id, None)
+
+
+# Заявка (новая или уже существующая) возвращается вместе с полями объекта
+# и владельца, которые нужны ContactRequestSerializer - повторно строку
+# не читаем. Существующую строку SELECT видит в снимке запроса, вставленную
+# в этом же запросе - нет, поэтому UNION ALL дает не больше одной строки
+CREATE_CONTACT_REQUEST_SQL = f"""
+WITH target AS (
+    SELECT p.id, p.title, p.owner_id, o.full_name, o.phone, o.email
+    FROM {Property._meta.db_table} p
+    JOIN {User._meta.db_table} o ON o.id = p.owner_id
+    WHERE p.id = %(property_id)s
+),
+inserted AS (
+    INSERT INTO {ContactRequest._meta.db_table}
+        (property_id, buyer_id, message, status, created_at, updated_at)
+    SELECT id, %(buyer_id)s, %(message)s, 'pending', now(), now()
+    FROM target
+    WHERE owner_id <> %(buyer_id)s
+    ON CONFLICT (property_id, buyer_id) DO NOTHING
+    RETURNING id, message, status, created_at, updated_at
+),
+request_row AS (
+    SELECT id, message, status, created_at, updated_at, true AS created FROM inserted
+    UNION ALL
+    SELECT id, message, status, created_at, updated_at, false AS created
+    FROM {ContactRequest._meta.db_table}
+    WHERE property_id = %(property_id)s AND buyer_id = %(buyer_id)s
+)
+SELECT
+    target.title, target.owner_id, target.full_name, target.phone, target.email,
+    request_row.id, request_row.message, request_row.status,
+    request_row.created_at, request_row.updated_at, request_row.created
+FROM target LEFT JOIN request_row ON true
+"""
+
+
+def create_contact_request(buyer, property_id, message=''):
+    """
+    Returns:
+        (contact_request, created) - ContactRequest с property, property.owner
+        и buyer (без дополнительных запросов в сериализаторе)
+
+    Raises:
+        PropertyNotFound, OwnPropertyError
+    """
+    if not _is_postgresql():
+        owner_id = Property.objects.filter(id=property_id).values_list('owner_id', flat=True).first()
+        if owner_id is None:
+            raise PropertyNotFound()
+        if owner_id == buyer.id:
+            raise OwnPropertyError()
+        contact_request, created = ContactRequest.objects.get_or_create(
+            property_id=property_id, buyer_id=buyer.id, defaults={'message': message}
+        )
+        return _load_contact_request(contact_request.id), created
+
+    row = _fetchone(CREATE_CONTACT_REQUEST_SQL, {
+        'property_id': property_id,
+        'buyer_id': buyer.id,
+        'message': message,
+    })
+    if row is None:
+        raise PropertyNotFound()
+    (title, owner_id, owner_name, owner_phone, owner_email,
+     contact_request_id, message, status, created_at, updated_at, created) = row
+    if owner_id == buyer.id:
+        raise OwnPropertyError()
+    if contact_request_id is None:
+        # Заявку вставил параллельный запрос после начала нашего
+        return _load_contact_request(
+            ContactRequest.objects.values_list('id', flat=True).get(property_id=property_id, buyer_id=buyer.id)
+        ), False
+
+    owner = User(id=owner_id, full_name=owner_name, phone=owner_phone, email=owner_email)
+    contact_request = ContactRequest(
+        id=contact_request_id,
+        property=Property(id=property_id, title=title, owner=owner),
+        buyer=buyer,
+        message=message,
+        status=status,
+        created_at=created_at,
+        updated_at=updated_at,
+    )
+    return contact_request, created
+
+
+def _load_contact_request(contact_request_id):
+    return ContactRequest.objects.select_related(
+        'property', 'property__owner', 'buyer'
+    ).get(id=contact_request_id)
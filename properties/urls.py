@@ -8,6 +8,7 @@ from .views import (
     suggest_addresses,
     reverse_geocode,
     delete_image,
+    reorder_images,
     my_properties,
     search_near_landmark,
     # Избранное
@@ -19,6 +20,7 @@ from .views import (
     create_contact_request,
     my_contact_requests,
     received_contact_requests,
+    contact_requests_sync,
     update_contact_request_status,
 )
 from .views_ai import ai_search, ai_suggest  # 🆕 AI-поиск
@@ -43,10 +45,12 @@ urlpatterns = [
     path('<int:property_id>/contact/', create_contact_request, name='create-contact-request'),
     path('my-contact-requests/', my_contact_requests, name='my-contact-requests'),
     path('received-contact-requests/', received_contact_requests, name='received-contact-requests'),
+    path('contact-requests/sync/', contact_requests_sync, name='contact-requests-sync'),
     path('contact-requests/<int:request_id>/', update_contact_request_status, name='update-contact-request'),
 
     # Удаление изображения
     path('<int:property_id>/images/<int:image_id>/', delete_image, name='delete-image'),
+    path('<int:property_id>/images/order/', reorder_images, name='reorder-images'),
 
     # Обычный AI-поиск по ориентирам
     path('search-near/', search_near_landmark, name='search-near-landmark'),
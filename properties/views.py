@@ -5,18 +5,47 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.pagination import CursorPagination
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 from django.db import transaction
-from django.db.models import Q, F
+from django.db.models import Q, F, Count, Max
 from django.shortcuts import get_object_or_404
 from django.core.cache import cache
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
+from django.utils import timezone
 
 from .models import Property, PropertyImage, Favorite, ContactRequest
-from .serializers import PropertySerializer, FavoriteSerializer, ContactRequestSerializer
+from .serializers import PropertySerializer, PropertyImageSerializer, FavoriteSerializer, ContactRequestSerializer
+from .image_processing import atomic_with_uploads, bulk_attach_images, delete_variant_files
+from core.conditional import ConditionalRetrieveMixin
 from core.yandex_maps import geocoder_service
+from advertisements import serving
+from . import favorites, inbox, upserts
+
+
+# Номер версии входит в ключ кэша списка: увеличение версии делает
+# недействительными все закэшированные страницы сразу. Начальная версия -
+# текущее время, чтобы после вытеснения ключа не ожили старые страницы
+LIST_CACHE_VERSION_KEY = 'properties_list:version'
+
+
+def _new_list_cache_version():
+    return int(timezone.now().timestamp())
+
+
+def _list_cache_version():
+    return cache.get_or_set(LIST_CACHE_VERSION_KEY, _new_list_cache_version, None)
+
+
+def invalidate_property_list():
+    """Сбрасывает кэш списка объявлений после коммита"""
+    def bump():
+        try:
+            cache.incr(LIST_CACHE_VERSION_KEY)
+        except ValueError:
+            cache.set(LIST_CACHE_VERSION_KEY, _new_list_cache_version(), None)
+
+    transaction.on_commit(bump)
 
 
 class PropertyListCreateView(generics.ListCreateAPIView):
@@ -34,13 +63,41 @@ class PropertyListCreateView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticatedOrReadOnly]
     parser_classes = (MultiPartParser, FormParser, JSONParser)
 
-    # Кэшируем GET на 2 минуты (только список без фильтров)
-    @method_decorator(cache_page(60 * 2, key_prefix='properties_list'))
     def list(self, request, *args, **kwargs):
-        # Если есть поисковые параметры - не кэшируем
-        if request.query_params:
-            return super().list(request, *args, **kwargs)
-        return super().list(request, *args, **kwargs)
+        """
+        Список кэшируется на 2 минуты без привязки к пользователю,
+        is_favorited проставляется на каждый запрос (один SMEMBERS).
+
+        ?promoted=N - добавить N (до 3) продвигаемых мест из рекламы:
+        ответ {"results": [...], "promoted": [{"ad_id", "property"}]}.
+        Места выбираются на каждый запрос из снимка в памяти
+        (advertisements.serving) без запросов к БД.
+        """
+        slots = serving.requested_slots(request)
+
+        params = request.query_params.copy()
+        params.pop('promoted', None)
+        cache_key = f'properties_list:{_list_cache_version()}:{request.path}?{params.urlencode()}'
+        results = cache.get(cache_key)
+        if results is None:
+            results = super().list(request, *args, **kwargs).data
+            cache.set(cache_key, results, 60 * 2)
+        results = self._with_favorites(request, results)
+
+        if not slots:
+            return Response(results)
+
+        return Response({
+            'results': results,
+            'promoted': serving.promoted_cards(request, slots),
+        })
+
+    def _with_favorites(self, request, results):
+        """Копия закэшированного списка с is_favorited текущего пользователя"""
+        favorite_ids = set()
+        if request.user.is_authenticated:
+            favorite_ids = favorites.get_favorite_ids(request.user.id)
+        return [{**item, 'is_favorited': item['id'] in favorite_ids} for item in results]
 
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
 
@@ -238,7 +295,7 @@ class PropertyListCreateView(generics.ListCreateAPIView):
             context['search_point'] = search_point
         return context
 
-    @transaction.atomic
+    @atomic_with_uploads()
     def create(self, request, *args, **kwargs):
         """Создание объявления с изображениями"""
         print("\n" + "="*50)
@@ -271,35 +328,29 @@ class PropertyListCreateView(generics.ListCreateAPIView):
         print(f"💰 Тип: {property_obj.type}, Цена: {property_obj.price or property_obj.price_per_month or property_obj.price_per_day}")
         print(f"🎯 Nearby landmarks: {property_obj.nearby_landmarks}")
 
-        # Сохраняем изображения
-        saved_images = 0
-        if images:
-            for image in images:
-                try:
-                    img_obj = PropertyImage.objects.create(
-                        property=property_obj,
-                        image=image
-                    )
-                    saved_images += 1
-                    print(f"  ✅ Изображение сохранено: {img_obj.image.url}")
-                except Exception as e:
-                    print(f"  ❌ Ошибка сохранения изображения: {e}")
-
-        print(f"📊 Результат: сохранено {saved_images} из {len(images)} изображений")
+        # Сохраняем изображения: файлы пишутся параллельно, строки - одной INSERT
+        saved_images, image_errors = bulk_attach_images(property_obj, images)
+        for error in image_errors:
+            print(f"  ❌ Ошибка сохранения изображения {error['file']}: {error['error']}")
+
+        print(f"📊 Результат: сохранено {len(saved_images)} из {len(images)} изображений")
         print("="*50 + "\n")
 
         # Инвалидируем кэш списка объявлений
-        from django.core.cache import cache
-        cache.delete_many(cache.keys('*properties_list*'))
+        invalidate_property_list()
 
         # Возвращаем созданный объект с изображениями
         output_serializer = self.get_serializer(property_obj)
-        return Response(output_serializer.data, status=status.HTTP_201_CREATED)
+        data = output_serializer.data
+        if image_errors:
+            data['image_errors'] = image_errors
+        return Response(data, status=status.HTTP_201_CREATED)
 
 
-class PropertyDetailView(generics.RetrieveUpdateDestroyAPIView):
+class PropertyDetailView(ConditionalRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Детали, обновление и удаление недвижимости
+    GET поддерживает If-None-Match / If-Modified-Since (304)
     """
     serializer_class = PropertySerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
@@ -309,7 +360,24 @@ class PropertyDetailView(generics.RetrieveUpdateDestroyAPIView):
         """Детали может видеть кто угодно"""
         return Property.objects.all()
 
-    @transaction.atomic
+    def get_validators(self):
+        """updated_at, счетчики изображений и отметка избранного - один запрос"""
+        row = self.get_queryset().filter(pk=self.kwargs['pk']).annotate(
+            image_count=Count('images'),
+            last_image_id=Max('images__id'),
+            last_processed_at=Max('images__processed_at'),
+        ).values_list(
+            'updated_at', 'owner__full_name', 'image_count', 'last_image_id', 'last_processed_at'
+        ).first()
+        if row is None:
+            return None
+
+        user = self.request.user
+        is_favorited = user.is_authenticated and int(self.kwargs['pk']) in favorites.get_favorite_ids(user.id)
+        # Без Last-Modified: избранное, имя владельца и удаление фото не меняют updated_at
+        return None, [*row, user.id, is_favorited]
+
+    @atomic_with_uploads()
     def update(self, request, *args, **kwargs):
         """Обновление объявления с добавлением новых изображений"""
         print("\n" + "="*50)
@@ -345,25 +413,19 @@ class PropertyDetailView(generics.RetrieveUpdateDestroyAPIView):
         print(f"💰 Тип: {property_obj.type}, Цена: {property_obj.price or property_obj.price_per_month or property_obj.price_per_day}")
         print(f"🎯 Nearby landmarks: {property_obj.nearby_landmarks}")
 
-        # Добавляем новые изображения
-        saved_images = 0
-        if images:
-            for image in images:
-                try:
-                    img_obj = PropertyImage.objects.create(
-                        property=property_obj,
-                        image=image
-                    )
-                    saved_images += 1
-                    print(f"  ✅ Новое изображение добавлено: {img_obj.image.url}")
-                except Exception as e:
-                    print(f"  ❌ Ошибка добавления изображения: {e}")
-
-        print(f"📊 Добавлено {saved_images} новых изображений")
+        # Добавляем новые изображения (одна INSERT на все файлы)
+        saved_images, image_errors = bulk_attach_images(property_obj, images)
+        for error in image_errors:
+            print(f"  ❌ Ошибка добавления изображения {error['file']}: {error['error']}")
+
+        print(f"📊 Добавлено {len(saved_images)} новых изображений")
         print("="*50 + "\n")
 
         output_serializer = self.get_serializer(property_obj)
-        return Response(output_serializer.data)
+        data = output_serializer.data
+        if image_errors:
+            data['image_errors'] = image_errors
+        return Response(data)
 
 
 # 🗺️ ЭНДПОИНТЫ ДЛЯ ЯНДЕКС КАРТ
@@ -462,8 +524,15 @@ def delete_image(request, property_id, image_id):
             )
 
         image = PropertyImage.objects.get(id=image_id, property=property_obj)
+        delete_variant_files(image)
         image.delete()
 
+        # Если удалили обложку - обложкой становится следующее изображение
+        if image.is_cover:
+            next_image = property_obj.images.order_by('order', 'id').first()
+            if next_image:
+                PropertyImage.objects.filter(id=next_image.id).update(is_cover=True)
+
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     except Property.DoesNotExist:
@@ -478,6 +547,70 @@ def delete_image(request, property_id, image_id):
         )
 
 
+@api_view(['PATCH'])
+@permission_classes([IsAuthenticated])
+def reorder_images(request, property_id):
+    """
+    Порядок изображений и обложка
+    PATCH /api/properties/{property_id}/images/order/
+    Body: {"order": [12, 10, 11], "cover": 10}
+    """
+    property_obj = get_object_or_404(Property, id=property_id)
+
+    if property_obj.owner != request.user:
+        return Response(
+            {'detail': 'Вы не можете редактировать это объявление'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    images = {image.id: image for image in property_obj.images.all()}
+    order = request.data.get('order')
+    cover_id = request.data.get('cover')
+
+    if order is not None and not isinstance(order, list):
+        return Response({'error': 'order должен быть списком ID изображений'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        order = [int(image_id) for image_id in order or []]
+        cover_id = int(cover_id) if cover_id is not None else None
+    except (TypeError, ValueError):
+        return Response({'error': 'Неверный формат ID изображений'}, status=status.HTTP_400_BAD_REQUEST)
+
+    unknown = [image_id for image_id in order + [cover_id] if image_id is not None and image_id not in images]
+    if unknown:
+        return Response(
+            {'error': f'Изображения не найдены: {unknown}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(set(order)) != len(order):
+        return Response({'error': 'В order повторяются изображения'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if order:
+        # Не перечисленные в order изображения идут следом в прежнем порядке
+        listed = set(order)
+        rest = sorted(
+            (image for image in images.values() if image.id not in listed),
+            key=lambda image: (image.order, image.id)
+        )
+        for position, image_id in enumerate(order + [image.id for image in rest]):
+            images[image_id].order = position
+    if cover_id is not None:
+        for image in images.values():
+            image.is_cover = image.id == cover_id
+
+    # Одна UPDATE на все изображения
+    PropertyImage.objects.bulk_update(images.values(), ['order', 'is_cover'])
+    # Порядок не меняет счетчики изображений - обновляем ETag деталей через updated_at
+    Property.objects.filter(id=property_obj.id).update(updated_at=timezone.now())
+
+    serializer = PropertyImageSerializer(
+        sorted(images.values(), key=lambda image: (image.order, image.id)),
+        many=True,
+        context={'request': request}
+    )
+    return Response(serializer.data)
+
+
 # 📋 МОИ ОБЪЯВЛЕНИЯ
 
 @api_view(['GET'])
@@ -553,20 +686,48 @@ def search_near_landmark(request):
 
 # ==================== ИЗБРАННОЕ (FAVORITES) ====================
 
+FAVORITES_PAGE_SIZE = 20
+FAVORITES_MAX_PAGE_SIZE = 100
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def favorites_list(request):
     """
-    Список избранных объектов пользователя
-    GET /api/properties/favorites/
+    Список избранных объектов пользователя (новые первыми)
+    GET /api/properties/favorites/?page=1&page_size=20
+
+    Без page - весь список одним ответом {"count", "results"}
+    (так его запрашивает мобильное приложение).
     """
-    favorites = Favorite.objects.filter(user=request.user).select_related(
+    user_favorites = Favorite.objects.filter(user=request.user).select_related(
         'property', 'property__owner'
-    ).prefetch_related('property__images')
+    ).prefetch_related('property__images').order_by('-created_at', '-id')
+
+    if 'page' not in request.query_params:
+        serializer = FavoriteSerializer(user_favorites, many=True, context={'request': request})
+        return Response({
+            'count': len(serializer.data),
+            'results': serializer.data
+        })
 
-    serializer = FavoriteSerializer(favorites, many=True, context={'request': request})
+    try:
+        page = max(int(request.query_params.get('page', 1)), 1)
+        page_size = min(max(int(request.query_params.get('page_size', FAVORITES_PAGE_SIZE)), 1), FAVORITES_MAX_PAGE_SIZE)
+    except ValueError:
+        return Response({'error': 'Неверные параметры страницы'}, status=status.HTTP_400_BAD_REQUEST)
+
+    offset = (page - 1) * page_size
+    favorites_page = user_favorites[offset:offset + page_size]
+
+    # По БД (индекс user_id): множество в Redis может хранить id удаленных объектов
+    total = Favorite.objects.filter(user=request.user).count()
+    serializer = FavoriteSerializer(favorites_page, many=True, context={'request': request})
     return Response({
-        'count': favorites.count(),
+        'count': total,
+        'page': page,
+        'page_size': page_size,
+        'next': page + 1 if offset + page_size < total else None,
         'results': serializer.data
     })
 
@@ -578,15 +739,17 @@ def add_to_favorites(request, property_id):
     Добавить объект в избранное
     POST /api/properties/{property_id}/favorite/
     """
-    property_obj = get_object_or_404(Property, id=property_id)
-
-    # Проверяем, не добавлен ли уже
-    favorite, created = Favorite.objects.get_or_create(
-        user=request.user,
-        property=property_obj
-    )
+    # Один INSERT ... ON CONFLICT вместо проверки объекта и get_or_create
+    try:
+        favorite_id, created = upserts.add_favorite(request.user.id, property_id)
+    except upserts.PropertyNotFound:
+        return Response({'error': 'Объект не найден'}, status=status.HTTP_404_NOT_FOUND)
 
     if created:
+        favorites.added(request.user.id, property_id)
+        # Второй запрос остается: FavoriteSerializer отдает объект целиком
+        # (все поля, фото, владелец) - в RETURNING это не уместить
+        favorite = Favorite.objects.select_related('property', 'property__owner').get(id=favorite_id)
         serializer = FavoriteSerializer(favorite, context={'request': request})
         return Response({
             'message': 'Добавлено в избранное',
@@ -595,7 +758,7 @@ def add_to_favorites(request, property_id):
     else:
         return Response({
             'message': 'Уже в избранном',
-            'favorite_id': favorite.id
+            'favorite_id': favorite_id
         }, status=status.HTTP_200_OK)
 
 
@@ -606,14 +769,13 @@ def remove_from_favorites(request, property_id):
     Удалить объект из избранного
     DELETE /api/properties/{property_id}/favorite/
     """
-    property_obj = get_object_or_404(Property, id=property_id)
-
     deleted_count, _ = Favorite.objects.filter(
         user=request.user,
-        property=property_obj
+        property_id=property_id
     ).delete()
 
     if deleted_count > 0:
+        favorites.removed(request.user.id, property_id)
         return Response({
             'message': 'Удалено из избранного'
         }, status=status.HTTP_200_OK)
@@ -629,36 +791,39 @@ def toggle_favorite(request, property_id):
     """
     Переключить статус избранного (добавить/удалить)
     POST /api/properties/{property_id}/toggle-favorite/
-    """
-    property_obj = get_object_or_404(Property, id=property_id)
 
-    favorite = Favorite.objects.filter(
-        user=request.user,
-        property=property_obj
-    ).first()
+    Удаление или вставка - один запрос (DELETE + INSERT ... ON CONFLICT)
+    """
+    try:
+        favorite_id = upserts.toggle_favorite(request.user.id, property_id)
+    except upserts.PropertyNotFound:
+        return Response({'error': 'Объект не найден'}, status=status.HTTP_404_NOT_FOUND)
 
-    if favorite:
-        # Удаляем из избранного
-        favorite.delete()
+    if favorite_id is None:
+        favorites.removed(request.user.id, property_id)
         return Response({
             'is_favorited': False,
             'message': 'Удалено из избранного'
         })
-    else:
-        # Добавляем в избранное
-        favorite = Favorite.objects.create(
-            user=request.user,
-            property=property_obj
-        )
-        return Response({
-            'is_favorited': True,
-            'message': 'Добавлено в избранное',
-            'favorite_id': favorite.id
-        }, status=status.HTTP_201_CREATED)
+
+    favorites.added(request.user.id, property_id)
+    return Response({
+        'is_favorited': True,
+        'message': 'Добавлено в избранное',
+        'favorite_id': favorite_id
+    }, status=status.HTTP_201_CREATED)
 
 
 # ==================== ЗАЯВКИ НА КОНТАКТ ====================
 
+class ContactRequestCursorPagination(CursorPagination):
+    """Входящие заявки: курсор стабилен при новых заявках во время листания"""
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    ordering = ('-created_at', '-id')
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def create_contact_request(request, property_id):
@@ -667,35 +832,27 @@ def create_contact_request(request, property_id):
     POST /api/properties/{property_id}/contact/
     Body: {"message": "Здравствуйте, хочу посмотреть квартиру"}
     """
-    property_obj = get_object_or_404(Property, id=property_id)
-
-    # Нельзя отправить заявку на свой объект
-    if property_obj.owner == request.user:
+    # Проверка объекта, владельца и повторной заявки + вставка - один запрос
+    try:
+        contact_request, created = upserts.create_contact_request(
+            request.user, property_id, request.data.get('message', '')
+        )
+    except upserts.PropertyNotFound:
+        return Response({'error': 'Объект не найден'}, status=status.HTTP_404_NOT_FOUND)
+    except upserts.OwnPropertyError:
+        # Нельзя отправить заявку на свой объект
         return Response({
             'error': 'Нельзя отправить заявку на свой объект'
         }, status=status.HTTP_400_BAD_REQUEST)
 
-    # Проверяем, не отправлена ли уже заявка
-    existing = ContactRequest.objects.filter(
-        property=property_obj,
-        buyer=request.user
-    ).first()
+    serializer = ContactRequestSerializer(contact_request, context={'request': request})
 
-    if existing:
-        serializer = ContactRequestSerializer(existing, context={'request': request})
+    if not created:
         return Response({
             'message': 'Заявка уже отправлена',
             'contact_request': serializer.data
         }, status=status.HTTP_200_OK)
 
-    # Создаем новую заявку
-    contact_request = ContactRequest.objects.create(
-        property=property_obj,
-        buyer=request.user,
-        message=request.data.get('message', '')
-    )
-
-    serializer = ContactRequestSerializer(contact_request, context={'request': request})
     return Response({
         'message': 'Заявка отправлена',
         'contact_request': serializer.data
@@ -724,19 +881,58 @@ def my_contact_requests(request):
 @permission_classes([IsAuthenticated])
 def received_contact_requests(request):
     """
-    Полученные заявки на мои объекты
-    GET /api/properties/received-contact-requests/
+    Полученные заявки на мои объекты (новые первыми, постранично по курсору)
+    GET /api/properties/received-contact-requests/?status=pending&cursor=...
+
+    Один запрос на страницу при любом количестве объектов: JOIN по
+    property__owner вместо подзапроса, владелец и покупатель - в том же
+    запросе (нужны для owner_contacts и buyer_name).
     """
-    my_properties = Property.objects.filter(owner=request.user)
     requests_received = ContactRequest.objects.filter(
-        property__in=my_properties
-    ).select_related('property', 'buyer')
+        property__owner=request.user
+    ).select_related('property', 'property__owner', 'buyer')
 
-    serializer = ContactRequestSerializer(requests_received, many=True, context={'request': request})
-    return Response({
-        'count': requests_received.count(),
-        'results': serializer.data
-    })
+    status_filter = request.query_params.get('status')
+    if status_filter:
+        requests_received = requests_received.filter(status=status_filter)
+
+    paginator = ContactRequestCursorPagination()
+    page = paginator.paginate_queryset(requests_received, request)
+    serializer = ContactRequestSerializer(page, many=True, context={'request': request})
+    return paginator.get_paginated_response(serializer.data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def contact_requests_sync(request):
+    """
+    Изменения в заявках с прошлой синхронизации (для мобильных клиентов)
+    GET /api/properties/contact-requests/sync/?box=received&since=<cursor>
+
+    box: received (заявки на мои объекты, по умолчанию) или sent (мои заявки).
+    Ответ: {"results": [...], "deleted": [id], "cursor": "...",
+            "has_more": false, "reset": false}
+    Следующий запрос - с since=cursor; при has_more=true - сразу же
+    (cursor страницы непрозрачный, его нужно передавать как есть).
+    Если изменений нет, при If-None-Match с прошлым ETag вернется 304.
+    """
+    box = request.query_params.get('box', 'received')
+    if box not in inbox.BOXES:
+        return Response({
+            'error': f'Неверный box. Допустимые: {", ".join(inbox.BOXES)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    position = inbox.parse_cursor(request.query_params.get('since'))
+    etag, load = inbox.get_changes(request.user, box, position)
+
+    if etag in request.headers.get('If-None-Match', ''):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+    changes = load()
+    changes['results'] = ContactRequestSerializer(
+        changes['results'], many=True, context={'request': request}
+    ).data
+    return Response(changes, headers={'ETag': etag})
 
 
 @api_view(['PATCH'])
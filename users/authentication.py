@@ -0,0 +1,62 @@
+"""
+JWT-аутентификация без запроса к таблице пользователей на каждый запрос
+
+Стандартный JWTAuthentication делает SELECT по users_user на каждый
+запрос с токеном. Здесь основные поля пользователя кэшируются на
+USER_CACHE_TTL секунд, и request.user собирается из кэша через
+User.from_db - это обычный экземпляр User, остальные поля (avatar,
+date_joined, ...) отложены и загрузятся при обращении.
+
+Кэш сбрасывается при сохранении/удалении пользователя (User.save/delete)
+и при выходе (logout_view).
+"""
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import User
+
+
+USER_CACHE_TTL = 60
+
+# Поля, которые нужны почти каждому запросу (права, владелец, имя)
+CACHED_FIELDS = [
+    'id', 'username', 'full_name', 'email', 'phone',
+    'is_active', 'is_staff', 'is_superuser', 'is_verified',
+]
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def invalidate_user(user_id):
+    """Сбрасывает кэш пользователя после коммита"""
+    transaction.on_commit(lambda: cache.delete(user_cache_key(user_id)))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        values = cache.get(user_cache_key(user_id))
+        if values is None:
+            user = super().get_user(validated_token)
+            cache.set(
+                user_cache_key(user_id),
+                [getattr(user, field) for field in CACHED_FIELDS],
+                USER_CACHE_TTL
+            )
+            return user
+
+        user = User.from_db(DEFAULT_DB_ALIAS, CACHED_FIELDS, values)
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user
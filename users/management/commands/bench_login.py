@@ -0,0 +1,138 @@
+"""
+Management команда: замер скорости поиска пользователя при входе
+
+Создает N тестовых пользователей с телефонами (пароль хэшируется один
+раз и копируется), затем сравнивает:
+- старый поиск: Q(phone=login) | Q(username=login) - полный просмотр таблицы
+- новый поиск: phone_e164 (уникальный индекс), затем username
+
+С --full дополнительно прогоняет полный вход через
+PhoneOrUsernameTokenSerializer (проверка пароля + выдача JWT).
+
+Запускать на PostgreSQL:
+    python manage.py bench_login --users 200000 --logins 2000
+"""
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from users.models import User
+from users.phone import normalize_phone
+from users.serializers import PhoneOrUsernameTokenSerializer
+
+
+PASSWORD = 'bench-password'
+USERNAME_PREFIX = 'bench_login_'
+
+
+class Command(BaseCommand):
+    help = 'Замер поиска пользователя при входе по телефону на большой таблице'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000, help='Тестовых пользователей')
+        parser.add_argument('--logins', type=int, default=1000, help='Входов для замера')
+        parser.add_argument('--full', action='store_true', help='Также замерить полный вход с проверкой пароля')
+        parser.add_argument('--keep', action='store_true', help='Не удалять тестовых пользователей')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING(
+                f'⚠️  База {connection.vendor}: результаты не отражают PostgreSQL'
+            ))
+
+        self._create_users(options['users'])
+        total = User.objects.filter(username__startswith=USERNAME_PREFIX).count()
+        # Номера вводятся по-разному, как в реальных запросах
+        logins = [
+            self._format(random.randrange(total))
+            for _ in range(options['logins'])
+        ]
+
+        self.stdout.write('\n' + '=' * 50)
+        self._measure('Старый поиск (phone OR username)', logins, self._old_lookup)
+        self._measure('Новый поиск (phone_e164)', logins, self._new_lookup)
+
+        if options['full']:
+            full_logins = logins[:max(len(logins) // 20, 1)]
+            self._measure('Полный вход (пароль + JWT)', full_logins, self._full_login)
+        self.stdout.write('=' * 50)
+
+        if not options['keep']:
+            deleted, _ = User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+            self.stdout.write(f'🗑  Удалено тестовых пользователей: {deleted}')
+
+    def _create_users(self, count):
+        existing = User.objects.filter(username__startswith=USERNAME_PREFIX).count()
+        if existing >= count:
+            self.stdout.write(f'👥 Тестовые пользователи уже есть: {existing}')
+            return
+
+        password = make_password(PASSWORD)
+        started = time.monotonic()
+        batch = []
+        for index in range(existing, count):
+            phone = self._phone(index)
+            batch.append(User(
+                username=f'{USERNAME_PREFIX}{index}',
+                email=f'{USERNAME_PREFIX}{index}@example.com',
+                full_name=f'Bench User {index}',
+                phone=phone,
+                phone_e164=normalize_phone(phone),
+                password=password,
+            ))
+            if len(batch) >= 5000:
+                User.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            User.objects.bulk_create(batch)
+
+        self.stdout.write(
+            f'👥 Создано пользователей: {count - existing} за {time.monotonic() - started:.1f} сек'
+        )
+
+    @staticmethod
+    def _phone(index):
+        return f'+99877{index:07d}'
+
+    def _format(self, index):
+        phone = self._phone(index)
+        return random.choice([
+            phone,
+            phone[4:],  # 771234567
+            phone[1:],  # 998771234567
+            f'{phone[4:6]} {phone[6:9]}-{phone[9:11]}-{phone[11:]}',
+        ])
+
+    @staticmethod
+    def _old_lookup(login):
+        return User.objects.filter(Q(phone=login) | Q(username=login)).first()
+
+    @staticmethod
+    def _new_lookup(login):
+        phone_e164 = normalize_phone(login)
+        user = User.objects.filter(phone_e164=phone_e164).first() if phone_e164 else None
+        return user or User.objects.filter(username=login).first()
+
+    @staticmethod
+    def _full_login(login):
+        serializer = PhoneOrUsernameTokenSerializer(data={'login': login, 'password': PASSWORD})
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    def _measure(self, title, logins, lookup):
+        found = 0
+        started = time.monotonic()
+        for login in logins:
+            if lookup(login):
+                found += 1
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(f'{title}:')
+        self.stdout.write(
+            f'  {len(logins)} входов за {elapsed:.2f} сек '
+            f'({len(logins) / elapsed:.0f}/сек, {elapsed / len(logins) * 1000:.2f} мс), найдено {found}'
+        )
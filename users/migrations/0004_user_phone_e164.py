@@ -0,0 +1,77 @@
+import re
+
+from django.db import migrations, models
+
+
+def normalize_phone(raw):
+    """
+    Копия users.phone.normalize_phone на момент миграции: правки
+    приложения не должны менять результат уже написанной миграции
+    """
+    if not raw:
+        return None
+
+    raw = raw.strip()
+    digits = re.sub(r'\D', '', raw)
+    if not digits or re.search(r'[^\d\s()+\-.]', raw):
+        return None
+
+    if len(digits) == 9:
+        return f'+998{digits}'
+    if len(digits) == 10 and digits.startswith('8') and not raw.startswith('+'):
+        return f'+998{digits[1:]}'
+    if digits.startswith('998') and len(digits) == 12:
+        return f'+{digits}'
+    if raw.startswith('+') and 8 <= len(digits) <= 15:
+        return f'+{digits}'
+    return None
+
+
+def backfill_phone_e164(apps, schema_editor):
+    """
+    Заполняет phone_e164 из phone
+
+    Если один номер указан у нескольких пользователей, он остается у
+    того, кто входил последним (или зарегистрировался последним), у
+    остальных phone_e164 пустой - войти по номеру сможет только один.
+    """
+    User = apps.get_model('users', 'User')
+
+    owners = {}
+    for user in User.objects.exclude(phone='').only('id', 'phone', 'last_login', 'date_joined').iterator():
+        phone_e164 = normalize_phone(user.phone)
+        if phone_e164 is None:
+            continue
+        key = (user.last_login or user.date_joined, user.id)
+        current = owners.get(phone_e164)
+        if current is None or key > current[0]:
+            if current is not None:
+                print(f'  Дубликат телефона {phone_e164}: пользователь #{current[1]}')
+            owners[phone_e164] = (key, user.id)
+        else:
+            print(f'  Дубликат телефона {phone_e164}: пользователь #{user.id}')
+
+    batch = []
+    for phone_e164, (_, user_id) in owners.items():
+        batch.append(User(id=user_id, phone_e164=phone_e164))
+        if len(batch) >= 1000:
+            User.objects.bulk_update(batch, ['phone_e164'])
+            batch = []
+    if batch:
+        User.objects.bulk_update(batch, ['phone_e164'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_remove_role_field'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='phone_e164',
+            field=models.CharField(blank=True, editable=False, max_length=16, null=True, verbose_name='Телефон (E.164)'),
+        ),
+        migrations.RunPython(backfill_phone_e164, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_user_phone_e164'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='phone_e164',
+            field=models.CharField(blank=True, editable=False, max_length=16, null=True, unique=True, verbose_name='Телефон (E.164)'),
+        ),
+    ]
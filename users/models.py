@@ -7,6 +7,11 @@ class User(AbstractUser):
     email = models.EmailField(unique=True, verbose_name='Email')
     # Роль убрана - все пользователи могут и продавать и покупать
     phone = models.CharField(max_length=20, blank=True, verbose_name='Телефон')
+    # Телефон в E.164 для входа по номеру (заполняется в save)
+    phone_e164 = models.CharField(
+        max_length=16, unique=True, null=True, blank=True, editable=False,
+        verbose_name='Телефон (E.164)'
+    )
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True, verbose_name='Аватар')
     is_verified = models.BooleanField(default=False, verbose_name='Верифицирован')
 
@@ -35,4 +40,52 @@ class User(AbstractUser):
         verbose_name_plural = 'Пользователи'
 
     def __str__(self):
-        return self.full_name or self.email
\ No newline at end of file
+        return self.full_name or self.email
+
+    def _phone_taken(self, phone_e164):
+        return bool(phone_e164) and User.objects.filter(phone_e164=phone_e164).exclude(pk=self.pk).exists()
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        from .phone import normalize_phone
+
+        super().clean()
+        phone_e164 = normalize_phone(self.phone)
+        if phone_e164 != self.phone_e164 and self._phone_taken(phone_e164):
+            raise ValidationError({'phone': 'Этот номер телефона уже зарегистрирован'})
+
+    def save(self, *args, **kwargs):
+        from .phone import normalize_phone
+
+        phone_e164 = normalize_phone(self.phone)
+        if phone_e164 != self.phone_e164:
+            # Старые дубликаты (миграция 0004) остались без phone_e164 - пока
+            # номер не меняется, чужой номер не занимаем. Новый номер пишется
+            # как есть: уникальность держит unique-индекс phone_e164, понятную
+            # ошибку пользователю дают сериализаторы и clean()
+            legacy_duplicate = (
+                not self._state.adding
+                and self.phone_e164 is None
+                and self._phone_taken(phone_e164)
+                and User.objects.filter(pk=self.pk, phone=self.phone).exists()
+            )
+            if not legacy_duplicate:
+                self.phone_e164 = phone_e164
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'phone' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'phone_e164'}
+        super().save(*args, **kwargs)
+
+        from .authentication import invalidate_user
+        invalidate_user(self.pk)
+
+    def delete(self, *args, **kwargs):
+        from django.db.models import Q
+        from properties.inbox import record_deleted
+        from properties.models import ContactRequest
+        from .authentication import invalidate_user
+
+        invalidate_user(self.pk)
+        # Заявки удалятся каскадом - второй стороне нужен tombstone
+        record_deleted(ContactRequest.objects.filter(Q(buyer=self) | Q(property__owner=self)))
+        return super().delete(*args, **kwargs)
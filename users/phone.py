@@ -0,0 +1,44 @@
+"""
+Нормализация телефонных номеров в E.164
+
+Пользователи вводят номер как угодно: "90 123-45-67", "8 90 1234567",
+"998901234567", "+998 (90) 123 45 67". Для поиска при входе номер
+приводится к одному виду (+998901234567) и хранится в User.phone_e164.
+"""
+import re
+
+
+DEFAULT_COUNTRY_CODE = '998'
+# Узбекистан: код страны + 9 цифр абонентского номера
+NATIONAL_NUMBER_LENGTH = 9
+
+
+def normalize_phone(raw):
+    """
+    Returns:
+        str - номер в формате E.164 ("+998901234567") или None,
+        если строка не похожа на телефон
+    """
+    if not raw:
+        return None
+
+    raw = raw.strip()
+    digits = re.sub(r'\D', '', raw)
+    if not digits or re.search(r'[^\d\s()+\-.]', raw):
+        return None
+
+    if len(digits) == NATIONAL_NUMBER_LENGTH:
+        return f'+{DEFAULT_COUNTRY_CODE}{digits}'
+
+    # Старый внутренний формат: 8 + 9 цифр
+    if len(digits) == NATIONAL_NUMBER_LENGTH + 1 and digits.startswith('8') and not raw.startswith('+'):
+        return f'+{DEFAULT_COUNTRY_CODE}{digits[1:]}'
+
+    if digits.startswith(DEFAULT_COUNTRY_CODE) and len(digits) == len(DEFAULT_COUNTRY_CODE) + NATIONAL_NUMBER_LENGTH:
+        return f'+{digits}'
+
+    # Иностранный номер, введенный с "+"
+    if raw.startswith('+') and 8 <= len(digits) <= 15:
+        return f'+{digits}'
+
+    return None
@@ -1,8 +1,20 @@
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth import authenticate
-from django.db.models import Q
 from .models import User
+from .phone import normalize_phone
+
+
+def validate_unique_phone(value, instance=None):
+    """Телефон используется для входа - он должен быть уникальным"""
+    phone_e164 = normalize_phone(value)
+    if phone_e164:
+        users = User.objects.filter(phone_e164=phone_e164)
+        if instance is not None:
+            users = users.exclude(pk=instance.pk)
+        if users.exists():
+            raise serializers.ValidationError('Этот номер телефона уже зарегистрирован')
+    return value
 
 
 class PhoneOrUsernameTokenSerializer(TokenObtainPairSerializer):
@@ -20,10 +32,17 @@ class PhoneOrUsernameTokenSerializer(TokenObtainPairSerializer):
         login = attrs.get('login', '').strip()
         password = attrs.get('password', '')
 
-        # Ищем пользователя по телефону или username
-        user = User.objects.filter(
-            Q(phone=login) | Q(username=login)
-        ).first()
+        # Ищем пользователя по телефону (индекс phone_e164) или username
+        user = None
+        phone_e164 = normalize_phone(login)
+        if phone_e164:
+            user = User.objects.filter(phone_e164=phone_e164).first()
+        if user is None:
+            user = User.objects.filter(username=login).first()
+        if user is None:
+            # Номера, которые не нормализуются, и старые дубликаты без
+            # phone_e164 ищем как раньше - по точному совпадению phone
+            user = User.objects.filter(phone=login, phone_e164__isnull=True).first()
 
         if user is None:
             raise serializers.ValidationError('Пользователь не найден')
@@ -56,6 +75,9 @@ class UserSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'date_joined', 'last_login']
 
+    def validate_phone(self, value):
+        return validate_unique_phone(value, self.instance)
+
     def create(self, validated_data):
         password = validated_data.pop('password')
         user = User(**validated_data)
@@ -81,6 +103,9 @@ class RegisterSerializer(serializers.ModelSerializer):
         model = User
         fields = ['username', 'full_name', 'email', 'phone', 'password', 'password_confirm']
 
+    def validate_phone(self, value):
+        return validate_unique_phone(value)
+
     def validate(self, data):
         if data['password'] != data['password_confirm']:
             raise serializers.ValidationError("Пароли не совпадают")
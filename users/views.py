@@ -5,6 +5,7 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from .models import User
 from .serializers import UserSerializer, RegisterSerializer
+from .authentication import invalidate_user
 
 
 class RegisterView(generics.CreateAPIView):
@@ -36,6 +37,7 @@ def logout_view(request):
     try:
         refresh_token = request.data["refresh_token"]
         token = RefreshToken(refresh_token)
+        invalidate_user(request.user.pk)
         token.blacklist()
         return Response({"message": "Успешный выход"}, status=status.HTTP_205_RESET_CONTENT)
     except Exception as e:
@@ -47,4 +49,6 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
-        return self.request.user
+        # request.user собран из кэша аутентификации (часть полей) -
+        # профилю нужна полная строка
+        return User.objects.get(pk=self.request.user.pk)